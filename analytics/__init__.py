@@ -0,0 +1 @@
+"""Shared data layer and analytics engines for the nofx decision/prediction logs."""
@@ -0,0 +1,400 @@
+"""Deduplicated, dictionary-compressed archive for prompts and CoT traces.
+
+``input_prompt`` and ``cot_trace`` dominate the size of every decision file,
+and consecutive 3-minute cycles repeat most of them: the rules, the section
+headers, and every paragraph whose numbers did not move. The archive splits
+each text into content-defined chunks (the blank-line separated paragraphs
+that ``buildUserPrompt``/``market.Format`` emit) and stores every distinct
+chunk once, compressed with zlib against a shared preset dictionary sampled
+from the first archived texts. A record is then a list of chunk ids.
+
+Everything lives in ``<trader dir>/.prompt_archive/`` (the Go logger skips
+directories) in append-only files:
+
+* ``chunks.bin``  compressed chunk bodies, back to back;
+* ``chunks.idx``  ``(offset, length)`` per chunk id;
+* ``digests.bin`` 16-byte BLAKE2b digest per chunk id, for deduplication;
+* ``refs.bin``    chunk ids of all archived texts, back to back;
+* ``records.jsonl`` one line per archived decision file with its ref ranges;
+* ``dict.bin``    the preset dictionary.
+
+By default archiving only copies the texts into the archive and leaves the
+decision files untouched. With ``strip=True`` (``--strip``) it also removes
+them from old decision files (atomically rewritten, with ``archived_fields``
+listing what was moved). ``decision_logs.read_record`` puts them back
+transparently, but nothing outside this package does. The Go API
+(``GetLatestRecords``, i.e. the web UI's prompt/CoT panels) and the root
+``analyze_*.py``/``view_ai_reasoning.py`` scripts read the JSON directly and
+would see empty texts, so only strip files those readers no longer need.
+Restoring one record reads a few chunks through ``mmap`` and takes well
+under a millisecond.
+
+Usage::
+
+    python -m analytics.archive --trader binance_live_qwen --older-than 1d
+    python -m analytics.archive --trader binance_live_qwen --older-than 30d --strip
+    python -m analytics.archive --trader binance_live_qwen --show decision_20251101_120300_cycle42.json
+    python -m analytics.archive --trader binance_live_qwen --restore
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .decision_logs import ARCHIVE_MARKER, DEFAULT_ROOT, iter_decision_files, parse_filename, trader_dir
+
+ARCHIVE_DIRNAME = ".prompt_archive"
+ARCHIVED_FIELDS = ("input_prompt", "cot_trace")
+# zlib uses at most a 32 KiB window, so a longer preset dictionary is wasted.
+DICT_SIZE = 32 * 1024
+COMPRESS_LEVEL = 9
+
+_CHUNK_INDEX = np.dtype([("offset", "<u8"), ("length", "<u4")])
+_REF = np.dtype("<u4")
+_SPLIT = re.compile(r"(?<=\n\n)")
+
+
+def split_chunks(text: str) -> List[str]:
+    """Content-defined chunks: paragraphs, each keeping its trailing blank line."""
+    return [chunk for chunk in _SPLIT.split(text) if chunk]
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def build_dictionary(texts: Iterable[str], size: int = DICT_SIZE) -> bytes:
+    """Preset dictionary from the chunks that recur most (weighted by length)."""
+    counts = Counter(chunk for text in texts for chunk in split_chunks(text))
+    ranked = sorted(counts, key=lambda chunk: counts[chunk] * len(chunk), reverse=True)
+    picked: List[bytes] = []
+    used = 0
+    for chunk in ranked:
+        data = chunk.encode("utf-8")
+        if used + len(data) > size:
+            continue
+        picked.append(data)
+        used += len(data)
+    # zlib matches nearer the end of the dictionary more cheaply: most common last.
+    return b"".join(reversed(picked))
+
+
+class PromptArchive:
+    """One trader's archive directory, opened for reading and appending."""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.zdict = b""
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.by_cycle: Dict[int, List[str]] = {}
+        self._digests: Dict[bytes, int] = {}
+        self._index = np.zeros(0, dtype=_CHUNK_INDEX)
+        self._refs = np.zeros(0, dtype=_REF)
+        self._data: mmap.mmap | None = None
+        self._size = -1
+        self.reload()
+
+    def _path(self, name: str) -> Path:
+        return self.directory / name
+
+    @property
+    def exists(self) -> bool:
+        return self._path("records.jsonl").exists()
+
+    def reload(self) -> None:
+        """(Re)read the index files; cheap no-op when nothing was appended."""
+        records_path = self._path("records.jsonl")
+        size = records_path.stat().st_size if records_path.exists() else 0
+        if size == self._size:
+            return
+        self._size = size
+        if not size:
+            return
+        self.zdict = self._path("dict.bin").read_bytes()
+        self._index = np.fromfile(self._path("chunks.idx"), dtype=_CHUNK_INDEX)
+        self._refs = np.fromfile(self._path("refs.bin"), dtype=_REF)
+        digests = self._path("digests.bin").read_bytes()
+        count = min(len(self._index), len(digests) // 16)
+        self._index = self._index[:count]
+        self._digests = {digests[i * 16 : (i + 1) * 16]: i for i in range(count)}
+        self.records, self.by_cycle = {}, {}
+        with open(records_path, encoding="utf-8") as fh:
+            for line in fh:
+                if not line.endswith("\n"):
+                    break  # torn last line from an interrupted append
+                entry = json.loads(line)
+                self.records[entry["file"]] = entry
+                self.by_cycle.setdefault(entry["cycle"], []).append(entry["file"])
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        if self._path("chunks.bin").stat().st_size:
+            with open(self._path("chunks.bin"), "rb") as fh:
+                self._data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # -- reading -----------------------------------------------------------
+
+    def _chunk(self, chunk_id: int) -> bytes:
+        offset, length = self._index[chunk_id]
+        decompressor = zlib.decompressobj(zdict=self.zdict)
+        return decompressor.decompress(self._data[offset : offset + length])
+
+    def text(self, file_name: str, field: str) -> str | None:
+        entry = self.records.get(file_name)
+        if entry is None or field not in entry["fields"]:
+            return None
+        start, count = entry["fields"][field]
+        return b"".join(self._chunk(int(i)) for i in self._refs[start : start + count]).decode("utf-8")
+
+    def restore(self, record: Dict[str, Any], file_name: str) -> Dict[str, Any]:
+        """Fill ``record``'s archived fields back in (in place) and drop the marker."""
+        fields = record.pop(ARCHIVE_MARKER, None) or ()
+        for field in fields:
+            value = self.text(file_name, field)
+            if value is not None:
+                record[field] = value
+        return record
+
+    # -- writing -----------------------------------------------------------
+
+    def _repair(self) -> None:
+        """Trim digests/index entries left unpaired by an interrupted append."""
+        count = len(self._digests)
+        for name, size in (("digests.bin", 16), ("chunks.idx", _CHUNK_INDEX.itemsize)):
+            path = self._path(name)
+            if path.exists() and path.stat().st_size > count * size:
+                os.truncate(path, count * size)
+
+    def append(self, entries: List[Tuple[str, int, Dict[str, str]]]) -> Tuple[int, int]:
+        """Archive ``(file_name, cycle, {field: text})`` entries; returns ``(raw, stored)`` bytes."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._repair()
+        if not self.zdict:
+            self.zdict = build_dictionary(text for _, _, fields in entries for text in fields.values())
+            self._path("dict.bin").write_bytes(self.zdict)
+
+        data_size = self._path("chunks.bin").stat().st_size if self._path("chunks.bin").exists() else 0
+        new_data: List[bytes] = []
+        new_index: List[Tuple[int, int]] = []
+        new_digests: List[bytes] = []
+        refs: List[int] = []
+        lines: List[str] = []
+        refs_path = self._path("refs.bin")
+        # Refs of an interrupted append stay in the file unreferenced; new ones go after them.
+        ref_start = (refs_path.stat().st_size if refs_path.exists() else 0) // _REF.itemsize
+        raw = stored = 0
+        for file_name, cycle, fields in entries:
+            spans = {}
+            for field, text in fields.items():
+                start = ref_start + len(refs)
+                for chunk in split_chunks(text):
+                    body = chunk.encode("utf-8")
+                    raw += len(body)
+                    key = _digest(body)
+                    chunk_id = self._digests.get(key)
+                    if chunk_id is None:
+                        compressor = zlib.compressobj(COMPRESS_LEVEL, zdict=self.zdict)
+                        packed = compressor.compress(body) + compressor.flush()
+                        chunk_id = len(self._digests)
+                        self._digests[key] = chunk_id
+                        new_data.append(packed)
+                        new_index.append((data_size, len(packed)))
+                        new_digests.append(key)
+                        data_size += len(packed)
+                        stored += len(packed)
+                    refs.append(chunk_id)
+                spans[field] = [start, ref_start + len(refs) - start]
+            lines.append(json.dumps({"file": file_name, "cycle": cycle, "fields": spans}, ensure_ascii=False) + "\n")
+
+        # Chunk data before its index, and records last: a crash leaves only unreferenced tails.
+        with open(self._path("chunks.bin"), "ab") as fh:
+            fh.write(b"".join(new_data))
+        with open(self._path("digests.bin"), "ab") as fh:
+            fh.write(b"".join(new_digests))
+        with open(self._path("chunks.idx"), "ab") as fh:
+            fh.write(np.array(new_index, dtype=_CHUNK_INDEX).tobytes())
+        with open(refs_path, "ab") as fh:
+            fh.write(np.array(refs, dtype=_REF).tobytes())
+        with open(self._path("records.jsonl"), "a", encoding="utf-8") as fh:
+            fh.write("".join(lines))
+            fh.flush()
+            os.fsync(fh.fileno())
+        stored += 4 * len(refs)
+        self.reload()
+        return raw, stored
+
+
+_OPEN: Dict[Path, PromptArchive] = {}
+
+
+def archive_for(log_dir: str | Path) -> PromptArchive:
+    """Process-wide cached archive of a trader directory, refreshed when it grew."""
+    path = Path(log_dir) / ARCHIVE_DIRNAME
+    archive = _OPEN.get(path)
+    if archive is None:
+        archive = _OPEN[path] = PromptArchive(path)
+    else:
+        archive.reload()
+    return archive
+
+
+def _write_json(path: Path, record: Dict[str, Any]) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(record, fh, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def archive_directory(log_dir: str | Path, older_than: timedelta = timedelta(days=1), batch: int = 500,
+                      dry_run: bool = False, strip: bool = False) -> Tuple[int, int, int]:
+    """Copy prompts/CoT of files older than ``older_than`` into the archive; ``(files, raw, stored)``.
+
+    With ``strip`` the texts are also removed from the files (see the module
+    docstring for who can no longer read them).
+    """
+    log_dir = Path(log_dir)
+    archive = archive_for(log_dir)
+    cutoff = (datetime.now() - older_than).strftime("%Y%m%d_%H%M%S")
+    files = total_raw = total_stored = 0
+    pending: List[Tuple[Path, Dict[str, Any]]] = []
+
+    def flush() -> None:
+        nonlocal files, total_raw, total_stored
+        if not pending:
+            return
+        entries = [
+            (path.name, int(record.get("cycle_number", 0) or 0),
+             {field: record[field] for field in ARCHIVED_FIELDS if record.get(field)})
+            for path, record in pending
+        ]
+        if dry_run:
+            total_raw += sum(len(text.encode("utf-8")) for _, _, fields in entries for text in fields.values())
+        else:
+            raw, stored = archive.append(entries)
+            total_raw, total_stored = total_raw + raw, total_stored + stored
+            for (path, record), (_, _, fields) in zip(pending, entries if strip else []):
+                for field in fields:
+                    del record[field]
+                record[ARCHIVE_MARKER] = list(fields)
+                _write_json(path, record)
+        files += len(pending)
+        pending.clear()
+
+    for path in iter_decision_files(log_dir, include_segments=False):
+        if parse_filename(path.name)[0] >= cutoff:
+            continue
+        try:
+            with open(path, "rb") as fh:
+                record = json.loads(fh.read())
+        except (OSError, ValueError):
+            continue
+        if ARCHIVE_MARKER in record or not any(record.get(field) for field in ARCHIVED_FIELDS):
+            continue
+        known = archive.records.get(path.name)
+        if known is not None:
+            if not strip:
+                continue
+            # Archived without stripping, or restored: the texts are already in the archive.
+            if not dry_run:
+                for field in known["fields"]:
+                    record.pop(field, None)
+                record[ARCHIVE_MARKER] = list(known["fields"])
+                _write_json(path, record)
+            files += 1
+            continue
+        pending.append((path, record))
+        if len(pending) >= batch:
+            flush()
+    flush()
+    return files, total_raw, total_stored
+
+
+def restore_directory(log_dir: str | Path) -> int:
+    """Write archived texts back into their decision files (the archive itself is kept)."""
+    archive = archive_for(log_dir)
+    restored = 0
+    for path in iter_decision_files(log_dir, include_segments=False):
+        with open(path, "rb") as fh:
+            record = json.loads(fh.read())
+        if ARCHIVE_MARKER not in record:
+            continue
+        _write_json(path, archive.restore(record, path.name))
+        restored += 1
+    return restored
+
+
+def _human(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive prompts and CoT traces of old decision files.")
+    parser.add_argument("--trader", required=True, help="Trader id under decision_logs/.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--older-than", default="1d", help="Only archive files older than this (default 1d).")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived.")
+    parser.add_argument("--strip", action="store_true",
+                        help="Also remove the texts from the JSON files; the Go API/web UI and the root "
+                             "analyze_*.py scripts then see empty prompts/CoT for those files.")
+    parser.add_argument("--show", default=None, help="Print the archived prompt of a file name or cycle number.")
+    parser.add_argument("--restore", action="store_true", help="Put archived texts back into the JSON files.")
+    args = parser.parse_args()
+
+    log_dir = trader_dir(args.trader, args.root)
+    print("=" * 80)
+    print(f"🗜️  提示词归档: {args.trader}")
+    print("=" * 80)
+
+    if args.show:
+        archive = archive_for(log_dir)
+        names = archive.by_cycle.get(int(args.show), []) if args.show.isdigit() else [args.show]
+        if not names or names[-1] not in archive.records:
+            print(f"⏳ 归档中没有 {args.show}")
+            return
+        started = time.perf_counter()
+        prompt = archive.text(names[-1], "input_prompt") or ""
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"📄 {names[-1]} ({len(prompt)} 字符, 解压 {elapsed:.3f}ms)\n")
+        print(prompt)
+        return
+
+    if args.restore:
+        print(f"♻️  已恢复 {restore_directory(log_dir)} 个文件")
+        return
+
+    import pandas as pd
+
+    files, raw, stored = archive_directory(log_dir, pd.Timedelta(args.older_than).to_pytimedelta(),
+                                           dry_run=args.dry_run, strip=args.strip)
+    if args.dry_run:
+        print(f"🔍 将归档 {files} 个文件, 文本共 {_human(raw)}")
+        return
+    if not files:
+        print("⏳ 没有需要归档的文件")
+        return
+    if not stored:
+        print(f"✅ 已归档 {files} 个文件 (文本已在归档中)")
+        return
+    ratio = raw / stored
+    print(f"✅ 已归档 {files} 个文件: 文本 {_human(raw)} → {_human(stored)} (压缩比 {ratio:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Monte-Carlo block bootstrap of the trade ledger for risk-of-ruin estimates.
+
+``analyze_local_logs.find_optimal_parameters`` and ``sharpe_analysis.py``
+measure the one equity path that actually happened. Here the per-trade
+returns of :func:`analytics.trades.round_trips` are resampled into many
+alternative trade sequences, in circular blocks of consecutive trades so
+streaks (autocorrelation) survive, and every path is compounded at a chosen
+leverage and margin fraction:
+
+* each trade risks ``margin_fraction`` of equity as margin and earns its
+  return on margin; a trade can lose at most its margin (liquidation);
+* ruin is equity falling to ``1 - ruin_pct`` of the start;
+* time to recovery is the longest stretch of trades spent below a previous
+  equity peak (paths still under water at the end are counted apart).
+
+Paths are simulated in batches as ``(paths, trades)`` NumPy arrays, so 100k
+paths of a few hundred trades take seconds.
+
+Usage::
+
+    python -m analytics.bootstrap --trader binance_live_qwen
+    python -m analytics.bootstrap --trader binance_live_qwen --leverage 3 5 10 --paths 100000 --block 5
+    python -m analytics.bootstrap --trader binance_live_qwen --margin-pct 20 --ruin-pct 30 --horizon 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .decision_logs import DEFAULT_ROOT, load_tables, trader_dir
+from .trades import round_trips
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+BATCH_ELEMENTS = 20_000_000  # paths x trades per batch (~160MB per float64 array)
+
+
+def trade_returns(trades: pd.DataFrame, leverage: float | None = None) -> np.ndarray:
+    """Return on margin of each trade in entry order, rescaled to ``leverage`` when given.
+
+    Losses are capped at -1: an isolated position cannot lose more than its margin.
+    """
+    trades = trades.sort_values("entry_time")
+    returns = trades["pnl_pct"].to_numpy(dtype=float) / 100
+    if leverage is not None:
+        logged = trades["leverage"].where(trades["leverage"] > 0, 1.0).to_numpy(dtype=float)
+        returns = returns / logged * leverage
+    return np.maximum(returns[np.isfinite(returns)], -1.0)
+
+
+def margin_fraction(trades: pd.DataFrame, cycles: pd.DataFrame) -> float:
+    """Median share of account equity committed as margin per trade, from the live ledger."""
+    balance = cycles[["timestamp", "total_balance"]].dropna().sort_values("timestamp")
+    balance = balance[balance["total_balance"] > 0]
+    if trades.empty or balance.empty:
+        return float("nan")
+    entries = trades[["entry_time", "entry_price", "quantity", "leverage"]].dropna().sort_values("entry_time")
+    merged = pd.merge_asof(entries, balance, left_on="entry_time", right_on="timestamp", direction="backward")
+    leverage = merged["leverage"].where(merged["leverage"] > 0, 1.0)
+    share = merged["quantity"] * merged["entry_price"] / leverage / merged["total_balance"]
+    return float(share[np.isfinite(share)].clip(0, 1).median())
+
+
+def default_block(n_trades: int) -> int:
+    """Block length ~ n^(1/3), the usual rate for block bootstraps."""
+    return max(1, int(round(n_trades ** (1 / 3))))
+
+
+def block_indices(rng: np.random.Generator, n: int, paths: int, horizon: int, block: int) -> np.ndarray:
+    """``(paths, horizon)`` ledger indices from circular blocks of ``block`` consecutive trades."""
+    blocks = -(-horizon // block)
+    starts = rng.integers(0, n, size=(paths, blocks, 1))
+    return ((starts + np.arange(block)) % n).reshape(paths, blocks * block)[:, :horizon]
+
+
+@dataclass
+class BootstrapResult:
+    """Per-path outcomes; fractions of the starting equity, durations in trades."""
+
+    max_drawdown: np.ndarray
+    final_return: np.ndarray
+    underwater: np.ndarray  # longest run of trades below a prior peak
+    ended_underwater: np.ndarray
+    ruined: np.ndarray
+    horizon: int
+    block: int
+    margin_fraction: float
+
+    @property
+    def paths(self) -> int:
+        return len(self.max_drawdown)
+
+    @property
+    def risk_of_ruin(self) -> float:
+        return float(self.ruined.mean())
+
+    def quantiles(self, quantiles: Sequence[float] = QUANTILES) -> pd.DataFrame:
+        recovered = self.underwater[~self.ended_underwater]
+        rows = {
+            "max_drawdown_pct": np.quantile(self.max_drawdown, quantiles) * 100,
+            "final_return_pct": np.quantile(self.final_return, quantiles) * 100,
+            "underwater_trades": np.quantile(self.underwater, quantiles),
+            "recovery_trades": (np.quantile(recovered, quantiles) if len(recovered)
+                                else np.full(len(quantiles), np.nan)),
+        }
+        return pd.DataFrame(rows, index=[f"p{q * 100:g}" for q in quantiles]).T
+
+
+def _simulate_batch(log_steps: np.ndarray, ruin_level: float) -> Dict[str, np.ndarray]:
+    paths, horizon = log_steps.shape
+    # Work in log equity: one cumsum, no per-element exp/log on the batch.
+    log_equity = np.cumsum(log_steps, axis=1)
+    log_peak = np.maximum(np.maximum.accumulate(log_equity, axis=1), 0.0)
+    at_peak = log_equity >= log_peak
+    # Index of the latest peak at each step; -1 stands for the starting equity.
+    last_peak = np.maximum.accumulate(np.where(at_peak, np.arange(horizon), -1), axis=1)
+    run = np.arange(horizon) - last_peak
+    run[at_peak] = 0
+    return {
+        "max_drawdown": 1 - np.exp((log_equity - log_peak).min(axis=1)),
+        "final_return": np.expm1(log_equity[:, -1]),
+        "underwater": run.max(axis=1),
+        "ended_underwater": ~at_peak[:, -1],
+        "ruined": log_equity.min(axis=1) <= np.log(ruin_level) if ruin_level > 0 else np.zeros(paths, bool),
+    }
+
+
+def simulate(returns: np.ndarray, fraction: float, paths: int = 100_000, horizon: int | None = None,
+             block: int | None = None, ruin_pct: float = 50.0, seed: int | None = None) -> BootstrapResult:
+    """Block-bootstrap ``paths`` equity paths of ``horizon`` trades (default: the ledger length)."""
+    returns = np.asarray(returns, dtype=float)
+    if len(returns) == 0:
+        raise ValueError("no trades to resample")
+    horizon = horizon or len(returns)
+    block = min(block or default_block(len(returns)), len(returns))
+    rng = np.random.default_rng(seed)
+    # A full margin loss at fraction 1 would zero the account; keep the log finite.
+    log_steps = np.log1p(np.maximum(returns * fraction, -1 + 1e-12))
+    ruin_level = 1 - ruin_pct / 100
+
+    batch = max(1, BATCH_ELEMENTS // horizon)
+    parts: Dict[str, list] = {}
+    for start in range(0, paths, batch):
+        count = min(batch, paths - start)
+        steps = log_steps[block_indices(rng, len(returns), count, horizon, block)]
+        for key, value in _simulate_batch(steps, ruin_level).items():
+            parts.setdefault(key, []).append(value)
+    return BootstrapResult(
+        **{key: np.concatenate(values) for key, values in parts.items()},
+        horizon=horizon,
+        block=block,
+        margin_fraction=fraction,
+    )
+
+
+def realised(returns: np.ndarray, fraction: float, ruin_pct: float = 50.0) -> Dict[str, float]:
+    """The same statistics on the ledger's actual order, for comparison."""
+    steps = np.log1p(np.maximum(np.asarray(returns, dtype=float) * fraction, -1 + 1e-12))[None, :]
+    return {key: float(value[0]) for key, value in _simulate_batch(steps, 1 - ruin_pct / 100).items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Block-bootstrap the trade ledger into Monte-Carlo equity paths.")
+    parser.add_argument("--trader", required=True, help="Trader id under decision_logs/.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--since", default=None, help="Only files from YYYYMMDD_HHMMSS on.")
+    parser.add_argument("--paths", type=int, default=100_000, help="Simulated paths (default 100000).")
+    parser.add_argument("--horizon", type=int, default=None, help="Trades per path (default: ledger length).")
+    parser.add_argument("--block", type=int, default=None, help="Block length in trades (default n^(1/3)).")
+    parser.add_argument("--leverage", type=float, nargs="+", default=None,
+                        help="Leverage(s) to simulate (default: each trade's logged leverage).")
+    parser.add_argument("--margin-pct", type=float, default=None,
+                        help="Equity %% used as margin per trade (default: median from the logs).")
+    parser.add_argument("--ruin-pct", type=float, default=50.0, help="Loss %% counted as ruin (default 50).")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed.")
+    args = parser.parse_args()
+
+    tables = load_tables(trader_dir(args.trader, args.root), since=args.since)
+    trades = round_trips(tables["actions"])
+    print("=" * 80)
+    print(f"🎲 交易序列蒙特卡洛 (区块自助法): {args.trader}")
+    print("=" * 80)
+    if len(trades) < 2:
+        print("⏳ 已平仓交易不足, 无法模拟")
+        return
+
+    fraction = args.margin_pct / 100 if args.margin_pct is not None else margin_fraction(trades, tables["cycles"])
+    if not np.isfinite(fraction) or fraction <= 0:
+        print("⚠️  无法从日志推算保证金占比, 请用 --margin-pct 指定")
+        return
+    span_days = (trades["exit_time"].max() - trades["entry_time"].min()).total_seconds() / 86400
+    per_day = len(trades) / span_days if span_days > 0 else float("nan")
+    print(f"📒 {len(trades)} 笔交易, 约 {per_day:.1f} 笔/天, 每笔保证金占净值 {fraction * 100:.1f}%, "
+          f"破产线: 亏损 {args.ruin_pct:g}%")
+
+    pd.set_option("display.width", 200)
+    overview = []
+    for leverage in args.leverage or [None]:
+        label = "日志杠杆" if leverage is None else f"{leverage:g}x"
+        returns = trade_returns(trades, leverage)
+        started = time.perf_counter()
+        result = simulate(returns, fraction, args.paths, args.horizon, args.block, args.ruin_pct, args.seed)
+        elapsed = time.perf_counter() - started
+        actual = realised(returns, fraction, args.ruin_pct)
+
+        print(f"\n⚙️  杠杆 {label}: {result.paths} 条路径 x {result.horizon} 笔, 区块 {result.block}, {elapsed:.1f}s")
+        print(result.quantiles().to_string(float_format=lambda v: f"{v:.2f}"))
+        print(f"  实际路径: 最大回撤 {actual['max_drawdown'] * 100:.2f}%, 收益 {actual['final_return'] * 100:+.2f}%, "
+              f"最长水下 {actual['underwater']:.0f} 笔")
+        print(f"  💀 破产概率: {result.risk_of_ruin * 100:.2f}%   "
+              f"亏损概率: {(result.final_return < 0).mean() * 100:.1f}%   "
+              f"期末处于回撤中: {result.ended_underwater.mean() * 100:.1f}%")
+        if np.isfinite(per_day):
+            print(f"  ⏱️  中位最长水下 ≈ {np.median(result.underwater) / per_day:.1f} 天")
+        overview.append({
+            "leverage": label,
+            "risk_of_ruin_pct": result.risk_of_ruin * 100,
+            "median_dd_pct": np.median(result.max_drawdown) * 100,
+            "p95_dd_pct": np.quantile(result.max_drawdown, 0.95) * 100,
+            "median_return_pct": np.median(result.final_return) * 100,
+        })
+
+    if len(overview) > 1:
+        print("\n📊 杠杆对比:")
+        print(pd.DataFrame(overview).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Probability calibration of the AI's evaluated predictions.
+
+Treats each prediction's ``probability`` as the model's confidence that its
+direction call is right and ``is_correct`` as the outcome. Produces binned
+reliability curves, Brier score, log loss and expected calibration error,
+overall and broken down by symbol, timeframe and confidence label, each with
+bootstrap confidence intervals.
+
+The bootstrap resamples counts over the distinct (probability, outcome)
+pairs rather than individual predictions, so its cost does not grow with the
+number of predictions.
+
+Usage::
+
+    python -m analytics.calibration
+    python -m analytics.calibration --side-table prediction_evaluations.csv --bins 10 --json calibration.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from .predictions import load_predictions
+
+EPS = 1e-6
+BREAKDOWNS = ("symbol", "timeframe", "confidence")
+
+
+def loss_terms(probability, outcome) -> tuple[np.ndarray, np.ndarray]:
+    """Per-prediction Brier and log-loss contributions."""
+    p = np.clip(np.asarray(probability, dtype=float), EPS, 1 - EPS)
+    y = np.asarray(outcome, dtype=float)
+    brier = (p - y) ** 2
+    log_loss = -(y * np.log(p) + (1 - y) * np.log(1 - p))
+    return brier, log_loss
+
+
+def reliability_curve(probability, outcome, n_bins: int = 10) -> pd.DataFrame:
+    """Equal-width reliability bins: count, mean forecast and observed hit rate per bin."""
+    p = np.asarray(probability, dtype=float)
+    y = np.asarray(outcome, dtype=float)
+    edges = np.linspace(0.0, 1.0, n_bins + 1)
+    index = np.clip(np.digitize(p, edges[1:-1], right=False), 0, n_bins - 1)
+
+    count = np.bincount(index, minlength=n_bins)
+    sum_p = np.bincount(index, weights=p, minlength=n_bins)
+    sum_y = np.bincount(index, weights=y, minlength=n_bins)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_p = np.where(count > 0, sum_p / count, np.nan)
+        hit_rate = np.where(count > 0, sum_y / count, np.nan)
+
+    return pd.DataFrame(
+        {
+            "bin_low": edges[:-1],
+            "bin_high": edges[1:],
+            "count": count,
+            "mean_probability": mean_p,
+            "hit_rate": hit_rate,
+            "gap": hit_rate - mean_p,
+        }
+    )
+
+
+def expected_calibration_error(curve: pd.DataFrame) -> float:
+    filled = curve[curve["count"] > 0]
+    if filled.empty:
+        return float("nan")
+    weights = filled["count"] / filled["count"].sum()
+    return float((weights * filled["gap"].abs()).sum())
+
+
+def bootstrap_means(
+    columns: np.ndarray,
+    n_boot: int = 1000,
+    alpha: float = 0.05,
+    seed: int = 0,
+) -> np.ndarray:
+    """Percentile CIs of the column means of ``columns`` (shape ``(n, k)``).
+
+    Identical rows are collapsed first and each replicate draws multinomial
+    counts over the distinct rows, which is the same resampling as drawing
+    ``n`` rows with replacement. Predictions carry two-decimal probabilities
+    and a 0/1 outcome, so the cost is ``n_boot`` times a few hundred rows at
+    most, whatever ``n`` is.
+
+    Returns an array of shape ``(k, 2)`` with the lower and upper bounds.
+    """
+    columns = np.asarray(columns, dtype=float)
+    if columns.ndim == 1:
+        columns = columns[:, None]
+    n, k = columns.shape
+    if n == 0 or n_boot <= 0:
+        return np.full((k, 2), np.nan)
+
+    rows, counts = np.unique(columns, axis=0, return_counts=True)
+    rng = np.random.default_rng(seed)
+    draws = rng.multinomial(n, counts / n, size=n_boot)
+    estimates = (draws @ rows) / n
+
+    lower, upper = np.quantile(estimates, [alpha / 2, 1 - alpha / 2], axis=0)
+    return np.stack([lower, upper], axis=1)
+
+
+def calibration_summary(
+    df: pd.DataFrame,
+    n_bins: int = 10,
+    n_boot: int = 1000,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Scores, reliability curve and CIs for one set of evaluated predictions."""
+    p = df["probability"].to_numpy(dtype=float)
+    y = df["is_correct"].to_numpy(dtype=float)
+    brier, log_loss = loss_terms(p, y)
+    curve = reliability_curve(p, y, n_bins)
+
+    ci = bootstrap_means(np.column_stack([brier, log_loss, y, p]), n_boot=n_boot, seed=seed)
+    return {
+        "count": int(len(df)),
+        "hit_rate": float(y.mean()) if len(y) else float("nan"),
+        "mean_probability": float(p.mean()) if len(p) else float("nan"),
+        "brier": float(brier.mean()) if len(brier) else float("nan"),
+        "log_loss": float(log_loss.mean()) if len(log_loss) else float("nan"),
+        "ece": expected_calibration_error(curve),
+        "ci95": {
+            "brier": ci[0].tolist(),
+            "log_loss": ci[1].tolist(),
+            "hit_rate": ci[2].tolist(),
+            "mean_probability": ci[3].tolist(),
+        },
+        "reliability": curve,
+    }
+
+
+def breakdown_table(df: pd.DataFrame, by: str, n_boot: int = 1000, seed: int = 0) -> pd.DataFrame:
+    """Per-group count, hit rate, mean probability, Brier and log loss with Brier CIs."""
+    brier, log_loss = loss_terms(df["probability"], df["is_correct"])
+    frame = pd.DataFrame(
+        {
+            by: df[by].to_numpy(),
+            "probability": df["probability"].to_numpy(dtype=float),
+            "correct": df["is_correct"].to_numpy(dtype=float),
+            "brier": brier,
+            "log_loss": log_loss,
+        }
+    )
+    table = frame.groupby(by).agg(
+        count=("correct", "size"),
+        hit_rate=("correct", "mean"),
+        mean_probability=("probability", "mean"),
+        brier=("brier", "mean"),
+        log_loss=("log_loss", "mean"),
+    )
+    table["overconfidence"] = table["mean_probability"] - table["hit_rate"]
+
+    bounds = {
+        key: bootstrap_means(group["brier"].to_numpy(), n_boot=n_boot, seed=seed)[0]
+        for key, group in frame.groupby(by)
+    }
+    table["brier_ci_low"] = [bounds[key][0] for key in table.index]
+    table["brier_ci_high"] = [bounds[key][1] for key in table.index]
+    return table.sort_values("count", ascending=False)
+
+
+def load_evaluated(pred_dir: str = "prediction_logs", side_table: str | None = None) -> pd.DataFrame:
+    """Evaluated predictions from a side table (see ``analytics.predictions``) or the log files."""
+    if side_table:
+        df = pd.read_csv(side_table)
+        # Side tables written before the confidence column existed.
+        if "confidence" not in df.columns:
+            df["confidence"] = ""
+    else:
+        df = load_predictions(pred_dir)
+        df = df[df["evaluated"].astype(bool)]
+    df = df[df["probability"].notna()].copy()
+    df["is_correct"] = df["is_correct"].astype(bool)
+    for column in BREAKDOWNS:
+        df[column] = df[column].fillna("").astype(str)
+    return df
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calibration report for evaluated AI predictions.")
+    parser.add_argument("--dir", default="prediction_logs", help="Prediction log directory.")
+    parser.add_argument("--side-table", default=None, help="Read evaluations from this CSV instead.")
+    parser.add_argument("--bins", type=int, default=10, help="Reliability bins (default 10).")
+    parser.add_argument("--bootstrap", type=int, default=1000, help="Bootstrap replicates (default 1000).")
+    parser.add_argument("--json", default=None, help="Also write the full report to this path.")
+    args = parser.parse_args()
+
+    df = load_evaluated(args.dir, args.side_table)
+    print("=" * 70)
+    print(f"🎯 AI预测校准分析 (已评估 {len(df)} 条)")
+    print("=" * 70)
+    if df.empty:
+        print("⏳ 暂无已评估的预测，请先运行 python -m analytics.predictions")
+        return
+
+    summary = calibration_summary(df, n_bins=args.bins, n_boot=args.bootstrap)
+    ci = summary["ci95"]
+    print(f"\n  方向命中率: {summary['hit_rate']:.3f}  (95% CI {ci['hit_rate'][0]:.3f}-{ci['hit_rate'][1]:.3f})")
+    print(f"  平均概率:   {summary['mean_probability']:.3f}")
+    print(f"  Brier:      {summary['brier']:.4f}  (95% CI {ci['brier'][0]:.4f}-{ci['brier'][1]:.4f})")
+    print(f"  Log loss:   {summary['log_loss']:.4f}  (95% CI {ci['log_loss'][0]:.4f}-{ci['log_loss'][1]:.4f})")
+    print(f"  ECE:        {summary['ece']:.4f}")
+
+    print("\n📈 可靠性曲线:")
+    for row in summary["reliability"].itertuples():
+        if row.count == 0:
+            continue
+        bar = "█" * int(row.hit_rate * 20)
+        print(f"  {row.bin_low:.1f}-{row.bin_high:.1f}: n={row.count:6d}  预测 {row.mean_probability:.3f}"
+              f"  实际 {row.hit_rate:.3f} {bar}")
+
+    report: Dict[str, Any] = {key: value for key, value in summary.items() if key != "reliability"}
+    report["reliability"] = summary["reliability"].to_dict(orient="records")
+    for by in BREAKDOWNS:
+        table = breakdown_table(df, by, n_boot=args.bootstrap)
+        print(f"\n📊 按 {by} 分组:")
+        print(table.round(4).to_string())
+        report[f"by_{by}"] = table.reset_index().to_dict(orient="records")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, ensure_ascii=False, indent=2, default=float)
+        print(f"\n💾 报告已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""Shared loader for the Go decision logger's ``decision_logs`` tree.
+
+The Go side writes one ``decision_YYYYMMDD_HHMMSS_cycleN.json`` per cycle
+into ``decision_logs/<trader_id>/`` (see ``logger/decision_logger.go``).
+Everything that reads those files goes through this module so traders,
+files and records are discovered and parsed one way.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_ROOT = "decision_logs"
+DECISION_GLOB = "decision_*.json"
+# Hidden subdirectory holding packed segments of closed periods (see analytics.segments).
+SEGMENT_DIRNAME = ".segments"
+# Set on records whose prompt/CoT were moved into the archive (see analytics.archive).
+ARCHIVE_MARKER = "archived_fields"
+
+_FILENAME_RE = re.compile(r"^decision_(\d{8})_(\d{6})_cycle(\d+)\.json$")
+
+
+def is_decision_file(name: str) -> bool:
+    return _FILENAME_RE.match(name) is not None
+
+
+def parse_filename(name: str) -> tuple[str, int] | None:
+    """``(YYYYMMDD_HHMMSS, cycle_number)`` from a decision file name, or ``None``."""
+    match = _FILENAME_RE.match(name)
+    if match is None:
+        return None
+    return f"{match.group(1)}_{match.group(2)}", int(match.group(3))
+
+
+def list_traders(root: str | Path = DEFAULT_ROOT) -> List[str]:
+    """Trader ids with a log directory under ``root``, sorted."""
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    return sorted(entry.name for entry in root.iterdir() if entry.is_dir() and not entry.name.startswith("."))
+
+
+def trader_dir(trader_id: str, root: str | Path = DEFAULT_ROOT) -> Path:
+    return Path(root) / trader_id
+
+
+def iter_decision_files(directory: str | Path, include_segments: bool = True) -> List[Path]:
+    """Decision files in ``directory`` in chronological (file name) order.
+
+    Files packed into the directory's segments (see ``analytics.segments``)
+    are listed too, as entries with the same ``name``/``parent`` and a
+    ``read_bytes()``; a file that is both loose and packed is listed once.
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    files = [path for path in directory.glob(DECISION_GLOB) if is_decision_file(path.name)]
+    if include_segments and (directory / SEGMENT_DIRNAME).is_dir():
+        from .segments import segment_entries
+
+        loose = {path.name for path in files}
+        files.extend(entry for entry in segment_entries(directory) if entry.name not in loose)
+    return sorted(files, key=lambda path: path.name)
+
+
+def locate(directory: str | Path, name: str) -> Path | None:
+    """The loose file or segment entry called ``name`` in ``directory``."""
+    path = Path(directory) / name
+    if path.exists():
+        return path
+    if not (Path(directory) / SEGMENT_DIRNAME).is_dir():
+        return None
+    from .segments import find_entry
+
+    return find_entry(directory, name)
+
+
+def find_cycle(directory: str | Path, cycle: int) -> List[Path]:
+    """Loose files and segment entries of cycle ``cycle``, in file name order."""
+    directory = Path(directory)
+    files = [path for path in directory.glob(f"decision_*_cycle{cycle}.json") if is_decision_file(path.name)]
+    if (directory / SEGMENT_DIRNAME).is_dir():
+        from .segments import entries_for_cycle
+
+        loose = {path.name for path in files}
+        files.extend(entry for entry in entries_for_cycle(directory, cycle) if entry.name not in loose)
+    return sorted(files, key=lambda path: path.name)
+
+
+def records_between(directory: str | Path, start: "pd.Timestamp", end: "pd.Timestamp") -> List[Dict[str, Any]]:
+    """Records whose ``timestamp`` lies in ``[start, end)`` (UTC), in time order.
+
+    Packed records are picked from the segment index by timestamp; loose files
+    are pre-filtered by the time in their name (local time, so with a day of
+    slack) before being opened.
+    """
+    import pandas as pd
+
+    from .timeutil import parse_timestamps, to_epoch_ms
+
+    directory = Path(directory)
+    start, end = (stamp.tz_localize("UTC") if stamp.tzinfo is None else stamp.tz_convert("UTC")
+                  for stamp in (pd.Timestamp(start), pd.Timestamp(end)))
+    low = (start - pd.Timedelta(days=1)).strftime("%Y%m%d_%H%M%S")
+    high = (end + pd.Timedelta(days=1)).strftime("%Y%m%d_%H%M%S")
+
+    paths: List[Path] = [path for path in iter_decision_files(directory, include_segments=False)
+                         if low <= parse_filename(path.name)[0] < high]
+    if (directory / SEGMENT_DIRNAME).is_dir():
+        from .segments import entries_between
+
+        loose = {path.name for path in paths}
+        start_ms, end_ms = to_epoch_ms(pd.Series([start, end])).tolist()
+        paths.extend(entry for entry in entries_between(directory, start_ms, end_ms) if entry.name not in loose)
+
+    records = []
+    for path in paths:
+        try:
+            records.append(read_record(path))
+        except (OSError, ValueError) as exc:
+            print(f"⚠️  读取失败 {path.name}: {exc}")
+    stamps = parse_timestamps([record.get("timestamp") for record in records])
+    inside = [row for row in stamps.sort_values().index if start <= stamps[row] < end]
+    return [records[row] for row in inside]
+
+
+def read_record(path: str | Path) -> Dict[str, Any]:
+    """Parse one decision file or segment entry. Raises ``OSError``/``ValueError`` on unreadable files.
+
+    Texts moved into the trader's prompt archive are put back transparently.
+    """
+    path = Path(path) if isinstance(path, str) else path
+    record = json.loads(path.read_bytes())
+    if ARCHIVE_MARKER in record:
+        from .archive import archive_for
+
+        archive_for(path.parent).restore(record, path.name)
+    return record
+
+
+def iter_records(directory: str | Path, since: str | None = None) -> Iterator[Dict[str, Any]]:
+    """Yield decision records in order, skipping unreadable files.
+
+    ``since`` is a ``YYYYMMDD_HHMMSS`` prefix compared against the file name,
+    so older files are skipped without being opened.
+    """
+    for path in iter_decision_files(directory):
+        if since is not None:
+            parsed = parse_filename(path.name)
+            if parsed is not None and parsed[0] < since:
+                continue
+        try:
+            yield read_record(path)
+        except (OSError, ValueError) as exc:
+            print(f"⚠️  读取失败 {path.name}: {exc}")
+
+
+def iter_new_records(directory: str | Path, last_key: str) -> Iterator[Tuple[Path, str, Dict[str, Any]]]:
+    """``(path, file key, record)`` for the readable files newer than ``last_key``, in order.
+
+    For incremental consumers that keep the key of the last file they took.
+    An unreadable file followed by a readable one is skipped with a warning,
+    so the caller's key moves past it; only a trailing run of unreadable
+    files (possibly still being written) is held back for the next call.
+    """
+    unreadable: List[tuple] = []
+    for path in iter_decision_files(directory):
+        key = parse_filename(path.name)[0]
+        if key <= last_key:
+            continue
+        try:
+            record = read_record(path)
+        except (OSError, ValueError) as exc:
+            unreadable.append((path.name, exc))
+            continue
+        for name, exc in unreadable:
+            print(f"⚠️  读取失败 {name}: {exc}, 已跳过")
+        unreadable = []
+        yield path, key, record
+    for name, _ in unreadable:
+        print(f"⏳ {name} 暂时无法读取, 下次更新再试")
+
+
+# ---------------------------------------------------------------------------
+# Columnar tables
+# ---------------------------------------------------------------------------
+
+CYCLE_COLUMNS = [
+    "timestamp",
+    "cycle_number",
+    "total_balance",
+    "available_balance",
+    "unrealized_profit",
+    "margin_used_pct",
+    "position_count",
+    "n_decisions",
+    "success",
+]
+
+ACTION_COLUMNS = [
+    "timestamp",
+    "cycle_number",
+    "action",
+    "symbol",
+    "quantity",
+    "leverage",
+    "price",
+    "order_id",
+    "success",
+    "error",
+]
+
+POSITION_COLUMNS = [
+    "symbol",
+    "side",
+    "timestamp",
+    "cycle_number",
+    "position_amt",
+    "entry_price",
+    "mark_price",
+    "unrealized_profit",
+    "leverage",
+    "liquidation_price",
+]
+
+
+def _cycle_row(record: Dict[str, Any]) -> tuple:
+    account = record.get("account_state") or {}
+    return (
+        record.get("timestamp"),
+        record.get("cycle_number", 0),
+        account.get("total_balance"),
+        account.get("available_balance"),
+        account.get("total_unrealized_profit"),
+        account.get("margin_used_pct"),
+        account.get("position_count", 0),
+        len(record.get("decisions") or []),
+        bool(record.get("success", False)),
+    )
+
+
+def _action_rows(record: Dict[str, Any]) -> Iterator[tuple]:
+    for decision in record.get("decisions") or []:
+        timestamp = decision.get("timestamp")
+        # Go serialises an unset time.Time as year 1.
+        if not timestamp or timestamp.startswith("0001-"):
+            timestamp = record.get("timestamp")
+        yield (
+            timestamp,
+            record.get("cycle_number", 0),
+            decision.get("action", ""),
+            decision.get("symbol", ""),
+            decision.get("quantity"),
+            decision.get("leverage"),
+            decision.get("price"),
+            decision.get("order_id"),
+            bool(decision.get("success", False)),
+            decision.get("error", ""),
+        )
+
+
+def _position_rows(record: Dict[str, Any]) -> Iterator[tuple]:
+    for pos in record.get("positions") or []:
+        yield (
+            pos.get("symbol", ""),
+            pos.get("side", ""),
+            record.get("timestamp"),
+            record.get("cycle_number", 0),
+            pos.get("position_amt"),
+            pos.get("entry_price"),
+            pos.get("mark_price"),
+            pos.get("unrealized_profit"),
+            pos.get("leverage"),
+            pos.get("liquidation_price"),
+        )
+
+
+class TableCollector:
+    """Accumulates the :func:`load_tables` rows record by record.
+
+    Lets a caller that already walks the records (see ``analytics.reports``)
+    build the same tables without a second pass.
+    """
+
+    def __init__(self) -> None:
+        self.cycles: List[tuple] = []
+        self.actions: List[tuple] = []
+        self.positions: List[tuple] = []
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self.cycles.append(_cycle_row(record))
+        self.actions.extend(_action_rows(record))
+        self.positions.extend(_position_rows(record))
+
+    def tables(self) -> Dict[str, "pd.DataFrame"]:
+        return _build_tables(self.cycles, self.actions, self.positions)
+
+
+def load_tables(directory: str | Path, since: str | None = None) -> Dict[str, "pd.DataFrame"]:
+    """Cycle, action and position tables for one trader directory.
+
+    Records are parsed one at a time and only the numeric/short fields are
+    kept, so prompts and CoT traces never accumulate in memory. ``positions``
+    is long-format (one row per held position per cycle) and indexed by
+    ``(symbol, side, timestamp)``.
+    """
+    collector = TableCollector()
+    for record in iter_records(directory, since=since):
+        collector.add(record)
+    return collector.tables()
+
+
+def _build_tables(cycles: List[tuple], actions: List[tuple], positions: List[tuple]) -> Dict[str, "pd.DataFrame"]:
+    import pandas as pd
+
+    from .timeutil import parse_timestamps
+
+    cycle_df = pd.DataFrame(cycles, columns=CYCLE_COLUMNS)
+    cycle_df["timestamp"] = parse_timestamps(cycle_df["timestamp"])
+    for column in ("total_balance", "available_balance", "unrealized_profit", "margin_used_pct"):
+        cycle_df[column] = pd.to_numeric(cycle_df[column], errors="coerce")
+
+    action_df = pd.DataFrame(actions, columns=ACTION_COLUMNS)
+    action_df["timestamp"] = parse_timestamps(action_df["timestamp"])
+    for column in ("quantity", "leverage", "price"):
+        action_df[column] = pd.to_numeric(action_df[column], errors="coerce")
+
+    position_df = pd.DataFrame(positions, columns=POSITION_COLUMNS)
+    position_df["timestamp"] = parse_timestamps(position_df["timestamp"])
+    for column in POSITION_COLUMNS[4:]:
+        position_df[column] = pd.to_numeric(position_df[column], errors="coerce")
+    position_df = position_df.set_index(["symbol", "side", "timestamp"]).sort_index()
+    return {"cycles": cycle_df, "actions": action_df, "positions": position_df}
@@ -0,0 +1,339 @@
+"""Streaming behaviour-drift detector over decision cycles.
+
+Instead of comparing two hardcoded slices (``analyze_recent_behavior.py``)
+or re-counting keywords over recent files (``analyze_ai_patterns.py``), each
+cycle is folded once into fixed-memory sketches at two time scales:
+
+* action mix, confidence buckets and leverage buckets go into exponentially
+  decayed histograms (a fast one with a short half-life, a slow baseline);
+* CoT keywords (the same 2-5 character Chinese runs ``analyze_ai_patterns``
+  counts) go into decayed count-min sketches, with a bounded candidate set
+  of the currently most frequent keywords.
+
+After every cycle the fast distributions are tested against the slow ones
+(chi-square with a Wilson-Hilferty p-value for the histograms, a Poisson
+z-score per keyword) and a shift is reported when it first becomes
+significant. The detector state can be pickled, so a later run continues
+from the last processed file without re-reading history.
+
+Usage::
+
+    python -m analytics.drift --trader binance_live_qwen --state drift_qwen.pkl
+    python -m analytics.drift --trader binance_live_qwen --state drift_qwen.pkl --follow
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import pickle
+import re
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from .decision_logs import DEFAULT_ROOT, iter_new_records, trader_dir
+
+FAST_HALF_LIFE = 20  # cycles, about an hour at the 3-minute default
+SLOW_HALF_LIFE = 480  # cycles, about a day
+WARMUP_CYCLES = 100
+KEYWORD_RE = re.compile(r"[一-鿿]{2,5}")
+
+LEVERAGE_BUCKETS = [(0, 0, "none"), (1, 3, "1-3x"), (4, 5, "4-5x"), (6, 10, "6-10x"), (11, 20, "11-20x")]
+CONFIDENCE_BUCKETS = [(0, 49, "<50"), (50, 69, "50-69"), (70, 79, "70-79"), (80, 89, "80-89")]
+
+
+def leverage_bucket(value: Any) -> str:
+    try:
+        lev = float(value or 0)
+    except (TypeError, ValueError):
+        return "none"
+    for low, high, label in LEVERAGE_BUCKETS:
+        if low <= lev <= high:
+            return label
+    return ">20x"
+
+
+def confidence_bucket(value: Any) -> str | None:
+    try:
+        conf = float(value)
+    except (TypeError, ValueError):
+        return None
+    for low, high, label in CONFIDENCE_BUCKETS:
+        if low <= conf <= high:
+            return label
+    return "90+"
+
+
+def chi2_sf(stat: float, dof: int) -> float:
+    """Chi-square survival function via the Wilson-Hilferty normal approximation."""
+    if dof <= 0:
+        return 1.0
+    if stat <= 0:
+        return 1.0
+    scale = 2.0 / (9.0 * dof)
+    z = ((stat / dof) ** (1.0 / 3.0) - (1.0 - scale)) / math.sqrt(scale)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+class DecayedHistogram:
+    """Category weights that decay by ``0.5 ** (1 / half_life)`` every cycle."""
+
+    def __init__(self, half_life: float):
+        self.decay = 0.5 ** (1.0 / half_life)
+        self.counts: Dict[str, float] = {}
+
+    def step(self, items: Iterable[str]) -> None:
+        for key in self.counts:
+            self.counts[key] *= self.decay
+        for item in items:
+            self.counts[item] = self.counts.get(item, 0.0) + 1.0
+
+    @property
+    def total(self) -> float:
+        return sum(self.counts.values())
+
+
+class DecayedCountMin:
+    """Count-min sketch whose counters decay every cycle (fixed ``depth x width`` memory)."""
+
+    def __init__(self, half_life: float, width: int = 4096, depth: int = 4):
+        self.decay = np.float32(0.5 ** (1.0 / half_life))
+        self.width = width
+        self.table = np.zeros((depth, width), dtype=np.float32)
+        self.total = 0.0
+
+    def _cells(self, token: str) -> np.ndarray:
+        data = token.encode("utf-8")
+        return np.array([zlib.crc32(data, seed) % self.width for seed in range(len(self.table))])
+
+    def step(self, tokens: Iterable[str]) -> None:
+        self.table *= self.decay
+        self.total *= float(self.decay)
+        rows = np.arange(len(self.table))
+        for token in tokens:
+            self.table[rows, self._cells(token)] += 1.0
+            self.total += 1.0
+
+    def estimate(self, token: str) -> float:
+        return float(self.table[np.arange(len(self.table)), self._cells(token)].min())
+
+
+@dataclass
+class DriftEvent:
+    cycle_number: int
+    timestamp: str
+    feature: str
+    detail: str
+    p_value: float
+
+
+class DriftDetector:
+    """Fast-vs-slow comparison of categorical features and CoT keywords, one cycle at a time."""
+
+    FEATURES = ("action", "confidence", "leverage")
+
+    def __init__(
+        self,
+        fast_half_life: float = FAST_HALF_LIFE,
+        slow_half_life: float = SLOW_HALF_LIFE,
+        alpha: float = 1e-3,
+        keyword_z: float = 6.0,
+        max_keywords: int = 300,
+        warmup: int = WARMUP_CYCLES,
+    ):
+        self.fast = {name: DecayedHistogram(fast_half_life) for name in self.FEATURES}
+        self.slow = {name: DecayedHistogram(slow_half_life) for name in self.FEATURES}
+        self.fast_words = DecayedCountMin(fast_half_life)
+        self.slow_words = DecayedCountMin(slow_half_life)
+        self.candidates: Dict[str, float] = {}
+        self.max_keywords = max_keywords
+        self.alpha = alpha
+        self.keyword_z = keyword_z
+        self.warmup = warmup
+        self.cycles = 0
+        self.last_file_key = ""
+        self._active: set[str] = set()
+
+    # -- ingestion ---------------------------------------------------------
+
+    @staticmethod
+    def observations(record: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Per-feature observations of one cycle, from the AI's full decision list when available."""
+        decisions = None
+        try:
+            parsed = json.loads(record.get("decision_json") or "null")
+            if isinstance(parsed, list):
+                decisions = [d for d in parsed if isinstance(d, dict)]
+        except ValueError:
+            pass
+        if not decisions:
+            decisions = record.get("decisions") or []
+
+        actions, confidence, leverage = [], [], []
+        for decision in decisions:
+            action = decision.get("action", "")
+            actions.append(action or "unknown")
+            bucket = confidence_bucket(decision.get("confidence"))
+            if bucket is not None:
+                confidence.append(bucket)
+            if action.startswith("open_"):
+                leverage.append(leverage_bucket(decision.get("leverage")))
+        if not actions:
+            actions.append("none")
+        return {"action": actions, "confidence": confidence, "leverage": leverage}
+
+    def update(self, record: Dict[str, Any]) -> List[DriftEvent]:
+        """Fold one cycle in and return the shifts that became significant with it."""
+        self.cycles += 1
+        for name, items in self.observations(record).items():
+            self.fast[name].step(items)
+            self.slow[name].step(items)
+
+        words = set(KEYWORD_RE.findall(record.get("cot_trace") or ""))
+        self.fast_words.step(words)
+        self.slow_words.step(words)
+        self._track_candidates(words)
+
+        if self.cycles < self.warmup:
+            return []
+        cycle = int(record.get("cycle_number", 0) or 0)
+        stamp = record.get("timestamp", "")
+        events = [e for e in (self._test_feature(name, cycle, stamp) for name in self.FEATURES) if e]
+        events.extend(self._test_keywords(cycle, stamp))
+        return events
+
+    def _track_candidates(self, words: Iterable[str]) -> None:
+        for word in words:
+            self.candidates[word] = self.fast_words.estimate(word)
+        if len(self.candidates) > self.max_keywords:
+            for word in list(self.candidates):
+                self.candidates[word] = self.fast_words.estimate(word)
+            keep = sorted(self.candidates, key=self.candidates.get, reverse=True)[: self.max_keywords]
+            self.candidates = {word: self.candidates[word] for word in keep}
+
+    # -- tests -------------------------------------------------------------
+
+    def _test_feature(self, name: str, cycle: int, stamp: str) -> DriftEvent | None:
+        fast, slow = self.fast[name].counts, self.slow[name].counts
+        n_fast, n_slow = sum(fast.values()), sum(slow.values())
+        if n_fast < 5 or n_slow <= 0:
+            return None
+        keys = sorted(set(fast) | set(slow))
+        smoothing = 0.5
+        denominator = n_slow + smoothing * len(keys)
+        stat = 0.0
+        shifts = []
+        for key in keys:
+            expected = (slow.get(key, 0.0) + smoothing) / denominator * n_fast
+            observed = fast.get(key, 0.0)
+            stat += (observed - expected) ** 2 / expected
+            shifts.append((observed / n_fast - expected / n_fast, key))
+        p_value = chi2_sf(stat, len(keys) - 1)
+        drifting, cleared = p_value < self.alpha, p_value > math.sqrt(self.alpha)
+        return self._edge(name, drifting, cleared, cycle, stamp, _describe_shifts(shifts), p_value)
+
+    def _test_keywords(self, cycle: int, stamp: str) -> List[DriftEvent]:
+        ratio = self.fast_words.total / self.slow_words.total if self.slow_words.total else 0.0
+        events = []
+        for word in self.candidates:
+            fast = self.fast_words.estimate(word)
+            expected = self.slow_words.estimate(word) * ratio
+            z = (fast - expected) / math.sqrt(expected + 1.0)
+            p_value = 0.5 * math.erfc(z / math.sqrt(2))
+            detail = f"近期权重 {fast:.1f} vs 基线预期 {expected:.1f} (z={z:.1f})"
+            drifting, cleared = z > self.keyword_z and fast >= 3, z < self.keyword_z / 2
+            event = self._edge(f"keyword:{word}", drifting, cleared, cycle, stamp, detail, p_value)
+            if event:
+                events.append(event)
+        return events
+
+    def _edge(self, feature: str, drifting: bool, cleared: bool, cycle: int, stamp: str, detail: str,
+              p_value: float) -> DriftEvent | None:
+        """Report a feature when it enters the drifting state; it re-arms only once clearly back to normal."""
+        if drifting and feature not in self._active:
+            self._active.add(feature)
+            return DriftEvent(cycle, stamp, feature, detail, p_value)
+        if cleared:
+            self._active.discard(feature)
+        return None
+
+    # -- persistence -------------------------------------------------------
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(self, fh)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "DriftDetector":
+        with open(path, "rb") as fh:
+            return pickle.load(fh)
+
+
+def _describe_shifts(shifts: List[tuple]) -> str:
+    shifts.sort(key=lambda item: abs(item[0]), reverse=True)
+    return ", ".join(f"{key} {delta * 100:+.0f}pp" for delta, key in shifts[:3])
+
+
+def process_new_files(detector: DriftDetector, directory: Path) -> List[DriftEvent]:
+    """Feed every decision file newer than the detector's last one (see ``iter_new_records``)."""
+    events = []
+    for _, key, record in iter_new_records(directory, detector.last_file_key):
+        events.extend(detector.update(record))
+        detector.last_file_key = key
+    return events
+
+
+def _print_events(events: List[DriftEvent]) -> None:
+    for event in events:
+        icon = "🔤" if event.feature.startswith("keyword:") else "⚠️ "
+        print(f"{icon} cycle #{event.cycle_number} {event.timestamp[:19]} | {event.feature}: {event.detail}"
+              f" (p={event.p_value:.1e})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Flag behaviour drift cycle by cycle with decayed sketches.")
+    parser.add_argument("--trader", required=True, help="Trader id under decision_logs/.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--state", default=None, help="Pickle file to resume from and save to.")
+    parser.add_argument("--fast-half-life", type=float, default=FAST_HALF_LIFE, help="Cycles (default 20).")
+    parser.add_argument("--slow-half-life", type=float, default=SLOW_HALF_LIFE, help="Cycles (default 480).")
+    parser.add_argument("--alpha", type=float, default=1e-3, help="Significance level for the mix tests.")
+    parser.add_argument("--follow", action="store_true", help="Keep watching for new cycles.")
+    parser.add_argument("--poll-interval", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if args.state and Path(args.state).exists():
+        detector = DriftDetector.load(args.state)
+        print(f"📂 从 {args.state} 恢复 (已处理 {detector.cycles} 个周期, 截至 {detector.last_file_key})")
+    else:
+        detector = DriftDetector(args.fast_half_life, args.slow_half_life, alpha=args.alpha)
+
+    directory = trader_dir(args.trader, args.root)
+    print("=" * 80)
+    print(f"📡 行为漂移检测: {args.trader}")
+    print("=" * 80)
+    try:
+        while True:
+            before = detector.cycles
+            _print_events(process_new_files(detector, directory))
+            if args.state and detector.cycles != before:
+                detector.save(args.state)
+            if not args.follow:
+                break
+            time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        print("\n🛑 已停止")
+    print(f"✅ 共处理 {detector.cycles} 个周期")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Execution-quality analytics: failure taxonomy, latency and slippage.
+
+Every ``decisions[].error``, every ``execution_log`` line without a matching
+decision, and every cycle-level ``error_message`` is classified by one
+compiled matcher (:data:`FAILURE_MATCHER`): one alternation of every
+category's pattern, run over the string in a single left-to-right pass. Of
+the categories found, the earliest in :data:`FAILURE_TAXONOMY` wins, wherever
+it occurs in the message. Wrapped Go errors
+such as ``硬约束拦截: ...`` are therefore classified by their outermost
+cause.
+
+Latency is the time from an action's start to the start of the next action
+in the same cycle (or, for the last action, until the cycle was logged),
+since the Go logger stamps each action before it executes and the record
+after all of them. Slippage is measured two ways, in basis points, positive
+when adverse:
+
+* opens: the entry price the exchange reports in the next cycle's position
+  snapshot against the market price the order was sized at;
+* closes: the price the close was sent at against the cycle's mark price
+  for that position.
+
+Usage::
+
+    python -m analytics.execution --trader binance_live_qwen
+    python -m analytics.execution --trader binance_live_qwen --tz Asia/Shanghai --csv execution.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .decision_logs import DEFAULT_ROOT, iter_records, trader_dir
+from .timeutil import parse_timestamps
+
+# Priority order matters: the first category whose pattern occurs anywhere wins.
+FAILURE_TAXONOMY: List[Tuple[str, str]] = [
+    ("risk_rejection", r"硬约束拦截|拒绝开仓|风控|风险检查|止损倍数|冷却期|risk check"),
+    ("margin", r"-2019|Margin is insufficient|保证金不足|保证金使用率|insufficient (?:margin|balance)"),
+    ("precision", r"-1111|-1013|-4003|Precision is over|LOT_SIZE|精度|quantity less than"),
+    ("min_notional", r"-4164|MIN_NOTIONAL|notional must be"),
+    ("rate_limit", r"-1003|-1015|\b429\b|\b418\b|Too many requests|rate limit|请求过于频繁"),
+    ("immediate_trigger", r"-2021|would immediately trigger"),
+    ("position_state", r"-2022|ReduceOnly|已有多仓|已有空仓|没有.{0,6}持仓|no position"),
+    ("network", r"timeout|timed out|connection reset|connection refused|\bEOF\b|dial tcp|no such host|超时"),
+    ("ai_decision", r"AI决策|解析.{0,6}失败|\bJSON"),
+    ("exchange_query", r"获取.{0,8}失败"),
+]
+
+FAILURE_MATCHER = re.compile(
+    # Zero-width branches, so a long low-priority match cannot swallow a higher-priority one inside it.
+    "|".join(f"(?=(?P<{name}>{pattern}))" for name, pattern in FAILURE_TAXONOMY),
+    re.IGNORECASE,
+)
+_PRIORITY = {name: rank for rank, (name, _) in enumerate(FAILURE_TAXONOMY)}
+
+_EXEC_LINE = re.compile(r"^(?P<ok>✓|❌)\s*(?P<symbol>\S+)\s+(?P<action>\S+)\s+(?:成功|失败:\s*(?P<error>[\s\S]*))$")
+
+_BUY_ACTIONS = {"open_long", "close_short"}
+ATTEMPT_COLUMNS = [
+    "timestamp",
+    "cycle_number",
+    "source",
+    "symbol",
+    "action",
+    "success",
+    "category",
+    "error",
+    "price",
+    "reference_price",
+    "slippage_bp",
+    "latency_ms",
+]
+
+
+def classify(message: str | None) -> str:
+    """Failure category for one error message (``other`` when nothing matches)."""
+    if not message:
+        return "other"
+    best = len(FAILURE_TAXONOMY)
+    for match in FAILURE_MATCHER.finditer(message):
+        best = min(best, _PRIORITY[match.lastgroup])
+        if best == 0:
+            break
+    return FAILURE_TAXONOMY[best][0] if best < len(FAILURE_TAXONOMY) else "other"
+
+
+def _cycle_attempts(record: Dict[str, Any]) -> Iterator[tuple]:
+    cycle = record.get("cycle_number", 0)
+    logged_at = record.get("timestamp")
+    marks = {(p.get("symbol"), p.get("side")): p.get("mark_price") for p in record.get("positions") or []}
+
+    decisions = [d for d in record.get("decisions") or [] if d.get("action") not in ("hold", "wait")]
+    seen = set()
+    for index, decision in enumerate(decisions):
+        action = decision.get("action", "")
+        symbol = decision.get("symbol", "")
+        seen.add((symbol, action))
+        started = decision.get("timestamp")
+        if not started or started.startswith("0001-"):
+            started = None
+        finished = decisions[index + 1].get("timestamp") if index + 1 < len(decisions) else logged_at
+        reference = marks.get((symbol, action.split("_", 1)[-1])) if action.startswith("close_") else None
+        error = decision.get("error") or ""
+        success = bool(decision.get("success", False))
+        yield (started or logged_at, cycle, "decision", symbol, action, success,
+               None if success else classify(error), error, decision.get("price"), reference,
+               (started, finished))
+
+    for line in record.get("execution_log") or []:
+        match = _EXEC_LINE.match(line.strip())
+        if match is None or match.group("ok") == "✓":
+            continue
+        if (match.group("symbol"), match.group("action")) in seen:
+            continue
+        error = match.group("error") or ""
+        yield (logged_at, cycle, "execution_log", match.group("symbol"), match.group("action"), False,
+               classify(error), error, None, None, (None, None))
+
+    if not record.get("success", True) and record.get("error_message"):
+        message = record["error_message"]
+        yield (logged_at, cycle, "cycle", "", "", False, classify(message), message, None, None, (None, None))
+
+
+class AttemptCollector:
+    """Accumulates the :func:`load_attempts` rows record by record."""
+
+    def __init__(self) -> None:
+        self.rows: List[tuple] = []
+        self.spans: List[tuple] = []
+        self.entries: List[tuple] = []
+
+    def add(self, record: Dict[str, Any]) -> None:
+        for row in _cycle_attempts(record):
+            self.rows.append(row[:-1])
+            self.spans.append(row[-1])
+        for pos in record.get("positions") or []:
+            self.entries.append((pos.get("symbol"), pos.get("side"), record.get("timestamp"), pos.get("entry_price")))
+
+    def table(self) -> pd.DataFrame:
+        return _build_attempts(self.rows, self.spans, self.entries)
+
+
+def load_attempts(directory: str, since: str | None = None) -> pd.DataFrame:
+    """One row per execution attempt or failure, with category, latency and slippage."""
+    collector = AttemptCollector()
+    for record in iter_records(directory, since=since):
+        collector.add(record)
+    return collector.table()
+
+
+def _build_attempts(rows: List[tuple], spans: List[tuple], entries: List[tuple]) -> pd.DataFrame:
+    # slippage_bp and latency_ms are derived below.
+    attempts = pd.DataFrame(rows, columns=ATTEMPT_COLUMNS[:-2])
+    attempts["timestamp"] = parse_timestamps(attempts["timestamp"])
+    for column in ("price", "reference_price"):
+        attempts[column] = pd.to_numeric(attempts[column], errors="coerce")
+
+    span = pd.DataFrame(spans, columns=["started", "finished"])
+    latency = parse_timestamps(span["finished"]) - parse_timestamps(span["started"])
+    latency_ms = latency.dt.total_seconds().to_numpy() * 1000
+    attempts["latency_ms"] = np.where(latency_ms >= 0, latency_ms, np.nan)
+
+    # Opens: the first position snapshot after the open carries the real fill.
+    opens = attempts["success"] & attempts["action"].str.startswith("open_")
+    if opens.any() and entries:
+        snapshots = pd.DataFrame(entries, columns=["symbol", "side", "seen_at", "entry_price"])
+        snapshots["seen_at"] = parse_timestamps(snapshots["seen_at"])
+        snapshots["side"] = snapshots["side"].astype(str)
+        snapshots = snapshots.dropna(subset=["seen_at"]).sort_values("seen_at")
+        pending = attempts[opens].assign(side=lambda df: df["action"].str.split("_").str[1].astype(str))
+        pending = pending.dropna(subset=["timestamp"]).reset_index().sort_values("timestamp")
+        matched = pd.merge_asof(
+            pending[["index", "symbol", "side", "timestamp"]],
+            snapshots,
+            left_on="timestamp",
+            right_on="seen_at",
+            by=["symbol", "side"],
+            direction="forward",
+            allow_exact_matches=False,
+            tolerance=pd.Timedelta(minutes=15),
+        ).dropna(subset=["entry_price"])
+        attempts.loc[matched["index"].to_numpy(), "reference_price"] = attempts.loc[
+            matched["index"].to_numpy(), "price"
+        ].to_numpy()
+        attempts.loc[matched["index"].to_numpy(), "price"] = matched["entry_price"].to_numpy()
+
+    buy = np.where(attempts["action"].isin(_BUY_ACTIONS), 1.0, -1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slip = (attempts["price"] - attempts["reference_price"]) / attempts["reference_price"] * 1e4 * buy
+    attempts["slippage_bp"] = slip.where(attempts["success"] & (attempts["reference_price"] > 0))
+    return attempts
+
+
+def failure_rates(attempts: pd.DataFrame, by: str | pd.Series) -> pd.DataFrame:
+    """Attempts, failures, failure rate, latency and slippage grouped by ``by``."""
+    orders = attempts[attempts["source"] == "decision"]
+    return orders.groupby(by).agg(
+        attempts=("success", "size"),
+        failures=("success", lambda s: int((~s).sum())),
+        failure_pct=("success", lambda s: float((~s).mean() * 100)),
+        latency_p50_ms=("latency_ms", "median"),
+        latency_p95_ms=("latency_ms", lambda s: s.quantile(0.95)),
+        slippage_avg_bp=("slippage_bp", "mean"),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Execution failure taxonomy, latency and slippage.")
+    parser.add_argument("--trader", required=True, help="Trader id under decision_logs/.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--since", default=None, help="Only files from YYYYMMDD_HHMMSS on.")
+    parser.add_argument("--tz", default="Asia/Shanghai", help="Time zone for the per-hour table.")
+    parser.add_argument("--csv", default=None, help="Also write every attempt to this CSV.")
+    args = parser.parse_args()
+
+    attempts = load_attempts(str(trader_dir(args.trader, args.root)), since=args.since)
+    orders = attempts[attempts["source"] == "decision"]
+    failed = attempts[~attempts["success"]]
+    print("=" * 80)
+    print(f"⚙️  执行质量分析: {args.trader} ({len(orders)} 次下单, {len(failed)} 条失败记录)")
+    print("=" * 80)
+    if attempts.empty:
+        print("⏳ 没有执行记录")
+        return
+
+    pd.set_option("display.width", 200)
+    print("\n❌ 失败分类:")
+    taxonomy = failed.groupby(["category", "source"]).size().unstack(fill_value=0)
+    print(taxonomy.to_string())
+    for category, group in failed.groupby("category"):
+        print(f"  {category:18s} 例: {group['error'].iloc[-1][:100]}")
+
+    print("\n📊 按币种:")
+    print(failure_rates(attempts, "symbol").round(2).to_string())
+    hours = orders["timestamp"].dt.tz_convert(args.tz).dt.hour.rename("hour")
+    print(f"\n🕐 按小时 ({args.tz}):")
+    print(failure_rates(attempts.loc[orders.index], hours).round(2).to_string())
+
+    slippage = orders.dropna(subset=["slippage_bp"])
+    if not slippage.empty:
+        print("\n📉 滑点 (bp, 正数为不利):")
+        print(slippage.groupby("action")["slippage_bp"].describe(percentiles=[0.5, 0.95]).round(2).to_string())
+
+    if args.csv:
+        attempts.to_csv(args.csv, index=False)
+        print(f"\n💾 已写入 {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Per-symbol market features parsed out of ``input_prompt``, stored once.
+
+``decision/engine.go`` (``buildUserPrompt``) renders every symbol it shows
+the model through ``market.Format``: current price/EMA20/MACD/RSI7, open
+interest, funding, 3-minute series and 4h context (EMA20/50/200, ATR3/14,
+volume). Held positions add a line with entry, mark, PnL, leverage, margin
+and liquidation price, and BTC gets a 1h/4h change line.
+
+``extract_features`` turns one prompt into ``(symbol, feature, value)``
+rows; ``FeatureStore`` parses each decision file exactly once and appends
+the rows to numbered ``.npz`` parts as a long, typed table::
+
+    timestamp  cycle_number  symbol  feature  value
+
+so conditioning on entry conditions (``analyze_open_conditions.py``) or
+checking ATR (``check_atr.py``) becomes a column read. For a series only the
+latest element is kept; earlier ones are the previous cycles' values.
+
+Usage::
+
+    python -m analytics.features --trader binance_live_qwen
+    python -m analytics.features --trader binance_live_qwen --symbol SOLUSDT --csv sol_features.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .decision_logs import DEFAULT_ROOT, iter_new_records, trader_dir
+from .timeutil import parse_timestamps, to_epoch_ms
+
+DEFAULT_STORE_DIR = "feature_store"
+# Merge parts once there are this many, so loading stays a handful of reads.
+MAX_PARTS = 32
+
+_EPOCH = pd.Timestamp(0, tz="UTC")
+
+_NUM = r"([-+]?(?:\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|NaN|Inf))"
+_DASH = "[-‑]"
+
+# Feature ids are positions in this tuple; only ever append to it.
+FEATURES: Tuple[str, ...] = (
+    "price",
+    "ema20",
+    "macd",
+    "rsi7",
+    "open_interest",
+    "funding_rate",
+    "rsi14",
+    "ema20_4h",
+    "ema50_4h",
+    "ema200_4h",
+    "atr3_4h",
+    "atr14_4h",
+    "volume_4h",
+    "avg_volume_4h",
+    "macd_4h",
+    "rsi14_4h",
+    "position_side",
+    "entry_price",
+    "mark_price",
+    "pnl_pct",
+    "leverage",
+    "margin",
+    "liquidation_price",
+    "change_1h",
+    "change_4h",
+)
+FEATURE_IDS = {name: index for index, name in enumerate(FEATURES)}
+
+# (pattern, feature names for its groups) inside one market.Format block.
+_INTRADAY = [
+    (re.compile(rf"current_price = {_NUM}, current_ema20 = {_NUM}, current_macd = {_NUM}, "
+                rf"current_rsi \(7 period\) = {_NUM}"), ("price", "ema20", "macd", "rsi7")),
+    (re.compile(rf"Open Interest \(Latest\): {_NUM}"), ("open_interest",)),
+    (re.compile(rf"Funding Rate: {_NUM}"), ("funding_rate",)),
+]
+_LONGER = [
+    (re.compile(rf"20{_DASH}Period EMA: {_NUM} vs\. 50{_DASH}Period EMA: {_NUM} vs\. 200{_DASH}Period EMA: {_NUM}"),
+     ("ema20_4h", "ema50_4h", "ema200_4h")),
+    (re.compile(rf"3{_DASH}Period ATR: {_NUM} vs\. 14{_DASH}Period ATR: {_NUM}"), ("atr3_4h", "atr14_4h")),
+    (re.compile(rf"Current Volume: {_NUM} vs\. Average Volume: {_NUM}"), ("volume_4h", "avg_volume_4h")),
+]
+# Series whose latest element is kept: (pattern, feature in the intraday part, feature in the 4h part).
+_SERIES = [
+    (re.compile(rf"RSI indicators \(14{_DASH}Period\): \[([^\]]*)\]"), "rsi14", "rsi14_4h"),
+    (re.compile(r"MACD indicators: \[([^\]]*)\]"), None, "macd_4h"),
+]
+_LONGER_MARKER = re.compile(rf"Longer{_DASH}term context")
+
+_HEADER = re.compile(
+    r"^(?:### \d+\. (?P<candidate>[A-Z0-9]+)(?: \(.*\))?"
+    r"|\d+\. (?P<held>[A-Z0-9]+) (?P<side>LONG|SHORT) \| (?P<position>.*))$",
+    re.MULTILINE,
+)
+_POSITION = re.compile(
+    rf"入场价{_NUM} 当前价{_NUM} \| 盈亏{_NUM}% \| 杠杆{_NUM}x \| 保证金{_NUM} \| 强平价{_NUM}"
+)
+_POSITION_FEATURES = ("entry_price", "mark_price", "pnl_pct", "leverage", "margin", "liquidation_price")
+_BTC = re.compile(rf"\*\*BTC\*\*: {_NUM} \(1h: {_NUM}%, 4h: {_NUM}%\)")
+
+
+def _last(series: str) -> float | None:
+    items = series.rsplit(",", 1)
+    try:
+        return float(items[-1])
+    except ValueError:
+        return None
+
+
+def _format_block(text: str) -> Iterator[Tuple[str, float]]:
+    marker = _LONGER_MARKER.search(text)
+    intraday, longer = (text[: marker.start()], text[marker.start() :]) if marker else (text, "")
+    for part, patterns in ((intraday, _INTRADAY), (longer, _LONGER)):
+        for pattern, names in patterns:
+            match = pattern.search(part)
+            if match:
+                yield from zip(names, map(float, match.groups()))
+    for pattern, intraday_name, longer_name in _SERIES:
+        for part, name in ((intraday, intraday_name), (longer, longer_name)):
+            match = pattern.search(part) if name else None
+            if match:
+                value = _last(match.group(1))
+                if value is not None:
+                    yield name, value
+
+
+def extract_features(prompt: str) -> List[Tuple[str, str, float]]:
+    """``(symbol, feature, value)`` for every metric in one prompt; first occurrence wins."""
+    rows: Dict[Tuple[str, str], float] = {}
+    headers = list(_HEADER.finditer(prompt))
+    for index, header in enumerate(headers):
+        end = headers[index + 1].start() if index + 1 < len(headers) else len(prompt)
+        symbol = header.group("candidate") or header.group("held")
+        if header.group("held"):
+            rows.setdefault((symbol, "position_side"), 1.0 if header.group("side") == "LONG" else -1.0)
+            match = _POSITION.search(header.group("position"))
+            if match:
+                for name, value in zip(_POSITION_FEATURES, map(float, match.groups())):
+                    rows.setdefault((symbol, name), value)
+        for name, value in _format_block(prompt[header.end() : end]):
+            rows.setdefault((symbol, name), value)
+
+    match = _BTC.search(prompt)
+    if match:
+        price, change_1h, change_4h = map(float, match.groups())
+        rows.setdefault(("BTCUSDT", "price"), price)
+        rows.setdefault(("BTCUSDT", "change_1h"), change_1h)
+        rows.setdefault(("BTCUSDT", "change_4h"), change_4h)
+    return [(symbol, name, value) for (symbol, name), value in rows.items()]
+
+
+class FeatureStore:
+    """Append-only ``.npz`` parts of parsed prompt features for one trader."""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.state_path = self.directory / "state.json"
+        state: Dict[str, Any] = {}
+        if self.state_path.exists():
+            state = json.loads(self.state_path.read_text())
+        self.symbols: List[str] = state.get("symbols", [])
+        self.last_file_key: str = state.get("last_file_key", "")
+        self.parts: int = state.get("parts", 0)
+        self._symbol_ids = {symbol: index for index, symbol in enumerate(self.symbols)}
+
+    def _symbol_id(self, symbol: str) -> int:
+        if symbol not in self._symbol_ids:
+            self._symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return self._symbol_ids[symbol]
+
+    def _part_path(self, number: int) -> Path:
+        return self.directory / f"part_{number:05d}.npz"
+
+    def _save_state(self) -> None:
+        state = {"symbols": self.symbols, "last_file_key": self.last_file_key, "parts": self.parts}
+        tmp_path = self.state_path.with_name("state.json.tmp")
+        tmp_path.write_text(json.dumps(state, ensure_ascii=False))
+        tmp_path.replace(self.state_path)
+
+    def update(self, log_dir: str | Path) -> int:
+        """Parse decision files newer than the last stored one; returns how many were added."""
+        columns: Dict[str, List] = {"cycle": [], "symbol": [], "feature": [], "value": []}
+        stamps: List[str | None] = []
+        rows_per_file: List[int] = []
+        added = 0
+        last_key = self.last_file_key
+        for _, key, record in iter_new_records(log_dir, self.last_file_key):
+            cycle = int(record.get("cycle_number", 0) or 0)
+            rows = extract_features(record.get("input_prompt") or "")
+            stamps.append(record.get("timestamp"))
+            rows_per_file.append(len(rows))
+            for symbol, name, value in rows:
+                columns["cycle"].append(cycle)
+                columns["symbol"].append(self._symbol_id(symbol))
+                columns["feature"].append(FEATURE_IDS[name])
+                columns["value"].append(value)
+            last_key = key
+            added += 1
+        if not added:
+            return 0
+
+        times = parse_timestamps(stamps)
+        time_ms = to_epoch_ms(times.fillna(_EPOCH)).to_numpy()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            self._part_path(self.parts),
+            time_ms=np.repeat(time_ms, rows_per_file),
+            cycle=np.asarray(columns["cycle"], dtype=np.int32),
+            symbol=np.asarray(columns["symbol"], dtype=np.int16),
+            feature=np.asarray(columns["feature"], dtype=np.int16),
+            value=np.asarray(columns["value"], dtype=np.float64),
+        )
+        self.parts += 1
+        self.last_file_key = last_key
+        self._save_state()
+        if self.parts >= MAX_PARTS:
+            self.compact()
+        return added
+
+    def _read_parts(self) -> Dict[str, np.ndarray]:
+        arrays: Dict[str, List[np.ndarray]] = {}
+        for number in range(self.parts):
+            with np.load(self._part_path(number)) as part:
+                for name in part.files:
+                    arrays.setdefault(name, []).append(part[name])
+        return {name: np.concatenate(chunks) for name, chunks in arrays.items()}
+
+    def compact(self) -> None:
+        """Rewrite all parts as one."""
+        if self.parts <= 1:
+            return
+        merged = self._read_parts()
+        tmp_path = self.directory / "merged.npz"
+        np.savez(tmp_path, **merged)
+        old_parts = self.parts
+        tmp_path.replace(self._part_path(0))
+        self.parts = 1
+        self._save_state()
+        for number in range(1, old_parts):
+            self._part_path(number).unlink(missing_ok=True)
+
+    def load(self) -> pd.DataFrame:
+        """The long table with categorical ``symbol``/``feature`` columns."""
+        arrays = self._read_parts()
+        if not arrays:
+            return pd.DataFrame(
+                {
+                    "timestamp": pd.Series(dtype="datetime64[ms, UTC]"),
+                    "cycle_number": pd.Series(dtype=np.int32),
+                    "symbol": pd.Categorical([], categories=self.symbols),
+                    "feature": pd.Categorical([], categories=list(FEATURES)),
+                    "value": pd.Series(dtype=np.float64),
+                }
+            )
+        return pd.DataFrame(
+            {
+                "timestamp": pd.to_datetime(arrays["time_ms"], unit="ms", utc=True),
+                "cycle_number": arrays["cycle"],
+                "symbol": pd.Categorical.from_codes(arrays["symbol"], categories=self.symbols),
+                "feature": pd.Categorical.from_codes(arrays["feature"], categories=list(FEATURES)),
+                "value": arrays["value"],
+            }
+        )
+
+
+def open_store(trader: str, root: str | Path = DEFAULT_ROOT, store_dir: str | Path = DEFAULT_STORE_DIR,
+               update: bool = True) -> Tuple[FeatureStore, int]:
+    """The trader's store under ``store_dir``, brought up to date unless ``update`` is false."""
+    store = FeatureStore(Path(store_dir) / trader)
+    added = store.update(trader_dir(trader, root)) if update else 0
+    return store, added
+
+
+def wide_features(table: pd.DataFrame, symbol: str | None = None) -> pd.DataFrame:
+    """One row per ``(timestamp, symbol)`` and one column per feature."""
+    if symbol is not None:
+        table = table[table["symbol"] == symbol]
+    wide = table.pivot_table(
+        index=["timestamp", "symbol"], columns="feature", values="value", aggfunc="first", observed=True
+    )
+    wide.columns = wide.columns.astype(str)
+    wide.columns.name = None
+    return wide
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parse per-symbol market features out of decision prompts.")
+    parser.add_argument("--trader", required=True, help="Trader id under decision_logs/.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR, help="Where feature tables are kept.")
+    parser.add_argument("--symbol", default=None, help="Only show/export this symbol.")
+    parser.add_argument("--csv", default=None, help="Also write the wide (timestamp, symbol) table to this CSV.")
+    args = parser.parse_args()
+
+    store, added = open_store(args.trader, args.root, args.store_dir)
+    table = store.load()
+    print("=" * 80)
+    print(f"🧾 提示词特征: {args.trader} (本次解析 {added} 个周期, 共 {len(table)} 条特征值, "
+          f"{table['cycle_number'].nunique()} 个周期, {len(store.symbols)} 个币种)")
+    print("=" * 80)
+    if table.empty:
+        print("⏳ 没有可解析的提示词")
+        return
+
+    pd.set_option("display.width", 200)
+    coverage = table.groupby(["feature", "symbol"], observed=True).size().unstack(fill_value=0)
+    if args.symbol:
+        coverage = coverage[[args.symbol]] if args.symbol in coverage.columns else coverage.iloc[:, :0]
+    print("\n📊 各特征覆盖的周期数:")
+    print(coverage.to_string())
+
+    wide = wide_features(table, args.symbol)
+    print("\n🕐 最新值:")
+    latest = wide.groupby(level="symbol", observed=True).tail(1)
+    print(latest.T.to_string(float_format=lambda v: "nan" if math.isnan(v) else f"{v:.6g}"))
+
+    if args.csv:
+        wide.to_csv(args.csv)
+        print(f"\n💾 已写入 {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
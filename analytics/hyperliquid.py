@@ -0,0 +1,244 @@
+"""Pooled, cached client for the Hyperliquid ``/info`` endpoint.
+
+``check_hyperliquid_account.py`` and ``get_hyperliquid_funds.py`` each open a
+new connection per ``requests.post`` and query mainnet and testnet one after
+the other. :class:`InfoClient` keeps one keep-alive ``requests.Session`` per
+process with a connection pool per host, issues many queries concurrently
+from ``asyncio`` (blocking calls run on a thread pool sized to the
+connection pool), and caches responses for a short per-type TTL. Identical
+queries that are in flight at the same time share one request, so checking
+several wallets on both networks costs about one round trip.
+
+``analytics.hyperliquid_mock`` serves canned responses locally; point the
+client at it with ``--mainnet-url`` / ``--testnet-url``.
+
+Usage::
+
+    python -m analytics.hyperliquid --address 0xe9524b0a282d10e5dfce16dcda5600f61182a304
+    python -m analytics.hyperliquid --address 0xabc... --address 0xdef... --type clearinghouseState --type openOrders
+    python -m analytics.hyperliquid --address 0xabc... --mainnet-url http://127.0.0.1:8765/info --testnet-url http://127.0.0.1:8765/info
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import pandas as pd
+
+INFO_URLS = {
+    "mainnet": "https://api.hyperliquid.xyz/info",
+    "testnet": "https://api.hyperliquid-testnet.xyz/info",
+}
+
+# Seconds a response stays fresh, by query type.
+DEFAULT_TTL = {
+    "allMids": 2.0,
+    "clearinghouseState": 5.0,
+    "spotClearinghouseState": 5.0,
+    "openOrders": 5.0,
+    "frontendOpenOrders": 5.0,
+    "userFills": 30.0,
+    "meta": 300.0,
+    "spotMeta": 300.0,
+}
+FALLBACK_TTL = 5.0
+
+
+@dataclass(frozen=True)
+class Query:
+    """One ``/info`` request: network, query type, optional user and extra fields."""
+
+    network: str
+    type: str
+    user: str | None = None
+    extra: Tuple[Tuple[str, Any], ...] = ()
+
+    def payload(self) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"type": self.type}
+        if self.user is not None:
+            payload["user"] = self.user
+        payload.update(self.extra)
+        return payload
+
+
+class TTLCache:
+    """Thread-safe ``key -> value`` cache whose entries expire after a per-entry TTL."""
+
+    def __init__(self) -> None:
+        self._entries: Dict[Any, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            return True, entry[1]
+
+    def put(self, key: Any, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class InfoClient:
+    """Keep-alive, cached, concurrent client for one or more ``/info`` endpoints.
+
+    ``post`` is a plain blocking call; ``fetch``/``fetch_many`` are the async
+    versions and ``query_many`` runs ``fetch_many`` from synchronous code.
+    """
+
+    def __init__(self, urls: Dict[str, str] | None = None, pool_size: int = 16, timeout: float = 10.0,
+                 ttl: Dict[str, float] | None = None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.urls = dict(INFO_URLS, **(urls or {}))
+        self.timeout = timeout
+        self.ttl = dict(DEFAULT_TTL, **(ttl or {}))
+        self.cache = TTLCache()
+        self.requests_sent = 0
+        self._count_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.urls), pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="hl-info")
+        self._inflight: Dict[Any, asyncio.Future] = {}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+    def __enter__(self) -> "InfoClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _key(self, query: Query) -> Tuple[str, str]:
+        return self.urls[query.network], json.dumps(query.payload(), sort_keys=True)
+
+    def _send(self, query: Query) -> Any:
+        url, body = self._key(query)
+        with self._count_lock:
+            self.requests_sent += 1
+        response = self.session.post(url, data=body, headers={"Content-Type": "application/json"},
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        self.cache.put((url, body), data, self.ttl.get(query.type, FALLBACK_TTL))
+        return data
+
+    def post(self, query: Query) -> Any:
+        """Blocking query, served from the cache while fresh."""
+        hit, data = self.cache.get(self._key(query))
+        return data if hit else self._send(query)
+
+    async def fetch(self, query: Query) -> Any:
+        key = self._key(query)
+        hit, data = self.cache.get(key)
+        if hit:
+            return data
+        pending = self._inflight.get(key)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = self._inflight[key] = asyncio.ensure_future(
+                loop.run_in_executor(self._executor, self._send, query)
+            )
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def fetch_many(self, queries: Sequence[Query]) -> List[Any]:
+        """Results in query order; a failed query yields its exception instead of raising."""
+        return await asyncio.gather(*(self.fetch(query) for query in queries), return_exceptions=True)
+
+    def query_many(self, queries: Sequence[Query]) -> List[Any]:
+        return asyncio.run(self.fetch_many(queries))
+
+    def clearinghouse_state(self, user: str, network: str = "mainnet") -> Dict[str, Any]:
+        return self.post(Query(network, "clearinghouseState", user))
+
+
+def account_queries(addresses: Iterable[str], networks: Iterable[str] = ("mainnet", "testnet"),
+                    types: Iterable[str] = ("clearinghouseState",)) -> List[Query]:
+    return [Query(network, kind, address) for address in addresses for network in networks for kind in types]
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def account_table(queries: Sequence[Query], results: Sequence[Any]) -> pd.DataFrame:
+    """One row per ``clearinghouseState`` query: equity, margin, withdrawable and positions."""
+    rows = []
+    for query, result in zip(queries, results):
+        if query.type != "clearinghouseState":
+            continue
+        row = {"address": query.user, "network": query.network}
+        if isinstance(result, Exception):
+            row["error"] = str(result)
+        else:
+            summary = (result or {}).get("marginSummary", {})
+            row.update(
+                account_value=_float(summary.get("accountValue")),
+                margin_used=_float(summary.get("totalMarginUsed")),
+                withdrawable=_float((result or {}).get("withdrawable")),
+                positions=len((result or {}).get("assetPositions", [])),
+            )
+        rows.append(row)
+    columns = ["address", "network", "account_value", "margin_used", "withdrawable", "positions", "error"]
+    return pd.DataFrame(rows).reindex(columns=columns)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query Hyperliquid /info for many addresses concurrently.")
+    parser.add_argument("--address", action="append", required=True, help="Wallet address (repeatable).")
+    parser.add_argument("--network", action="append", choices=sorted(INFO_URLS), help="Network(s) (default both).")
+    parser.add_argument("--type", action="append", help="Query type(s) (default clearinghouseState).")
+    parser.add_argument("--mainnet-url", default=None, help="Override the mainnet /info URL (e.g. the mock server).")
+    parser.add_argument("--testnet-url", default=None, help="Override the testnet /info URL.")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds.")
+    args = parser.parse_args()
+
+    urls = {name: url for name, url in (("mainnet", args.mainnet_url), ("testnet", args.testnet_url)) if url}
+    queries = account_queries(args.address, args.network or sorted(INFO_URLS), args.type or ["clearinghouseState"])
+    with InfoClient(urls, pool_size=max(4, len(queries)), timeout=args.timeout) as client:
+        started = time.perf_counter()
+        results = client.query_many(queries)
+        elapsed = time.perf_counter() - started
+
+    print("=" * 80)
+    print(f"🔍 Hyperliquid 账户查询: {len(args.address)} 个地址, {len(queries)} 个请求, {elapsed * 1000:.0f}ms")
+    print("=" * 80)
+    pd.set_option("display.width", 200)
+    table = account_table(queries, results)
+    if not table.empty:
+        print(table.dropna(axis=1, how="all").to_string(index=False))
+    for query, result in zip(queries, results):
+        if query.type == "clearinghouseState":
+            continue
+        status = f"❌ {result}" if isinstance(result, Exception) else json.dumps(result, ensure_ascii=False)[:160]
+        print(f"\n📄 {query.network} {query.type} {query.user or ''}: {status}")
+
+
+if __name__ == "__main__":
+    main()
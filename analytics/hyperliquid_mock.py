@@ -0,0 +1,157 @@
+"""Local stand-in for the Hyperliquid ``/info`` endpoint.
+
+Answers the query types :mod:`analytics.hyperliquid` uses with deterministic
+canned data (each address gets a stable pseudo-random account), after an
+optional artificial latency. It speaks HTTP/1.1 keep-alive and counts
+requests and TCP connections, so connection reuse and request batching can
+be checked without touching the real API.
+
+Usage::
+
+    python -m analytics.hyperliquid_mock --port 8765 --latency 0.2
+
+or from Python::
+
+    with MockInfoServer(latency=0.2) as server:
+        client = InfoClient({"mainnet": server.url, "testnet": server.url})
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict
+
+
+def _seed(user: str) -> int:
+    return zlib.crc32(user.lower().encode())
+
+
+def clearinghouse_state(user: str) -> Dict[str, Any]:
+    seed = _seed(user)
+    value = seed % 100_000 / 10
+    positions = []
+    if seed % 3:
+        size = (seed % 7 + 1) / 100
+        positions.append({"type": "oneWay", "position": {
+            "coin": "BTC", "szi": f"{size if seed % 2 else -size}", "entryPx": "97000.0",
+            "positionValue": f"{size * 97000:.2f}", "unrealizedPnl": "0.0",
+            "leverage": {"type": "cross", "value": 5},
+        }})
+    margin = sum(float(p["position"]["positionValue"]) for p in positions) / 5
+    return {
+        "marginSummary": {"accountValue": f"{value:.2f}", "totalNtlPos": f"{margin * 5:.2f}",
+                          "totalRawUsd": f"{value:.2f}", "totalMarginUsed": f"{margin:.2f}"},
+        "withdrawable": f"{max(value - margin, 0):.2f}",
+        "assetPositions": positions,
+        "time": int(time.time() * 1000),
+    }
+
+
+RESPONDERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "clearinghouseState": lambda body: clearinghouse_state(body.get("user", "")),
+    "spotClearinghouseState": lambda body: {"balances": [
+        {"coin": "USDC", "total": f"{_seed(body.get('user', '')) % 1000:.1f}", "hold": "0.0"}
+    ]},
+    "openOrders": lambda body: [],
+    "frontendOpenOrders": lambda body: [],
+    "userFills": lambda body: [],
+    "allMids": lambda body: {"BTC": "97000.0", "ETH": "3400.0", "SOL": "180.0"},
+    "meta": lambda body: {"universe": [{"name": "BTC", "szDecimals": 5, "maxLeverage": 40},
+                                       {"name": "ETH", "szDecimals": 4, "maxLeverage": 25},
+                                       {"name": "SOL", "szDecimals": 2, "maxLeverage": 20}]},
+}
+
+
+class MockInfoServer:
+    """Threaded ``/info`` server on ``127.0.0.1``; use as a context manager."""
+
+    def __init__(self, port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/info"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                    responder = RESPONDERS.get(body.get("type"))
+                except ValueError:
+                    responder = None
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if self.path != "/info" or responder is None:
+                    self._reply(422, b"Failed to deserialize the JSON body into the target type")
+                    return
+                self._reply(200, json.dumps(responder(body)).encode(), "application/json")
+
+            def _reply(self, status: int, payload: bytes, content_type: str = "text/plain") -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "MockInfoServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockInfoServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a mock Hyperliquid /info endpoint locally.")
+    parser.add_argument("--port", type=int, default=8765, help="Port on 127.0.0.1 (default 8765).")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each reply.")
+    args = parser.parse_args()
+
+    server = MockInfoServer(args.port, args.latency)
+    print(f"🧪 Hyperliquid mock /info 已启动: {server.url} (延迟 {args.latency}s)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n👋 已停止, 共 {server.requests} 个请求, {server.connections} 个连接")
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Local on-disk cache of Binance futures klines.
+
+Each ``(interval, symbol)`` pair is stored as one sorted NumPy structured
+array under ``kline_cache/<interval>/<SYMBOL>.npy``. :meth:`KlineCache.ensure_range`
+only downloads the parts of a requested range that lie outside what is
+already cached, so repeated analyses hit the network at most once per symbol.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+BINANCE_KLINES_URL = "https://fapi.binance.com/fapi/v1/klines"
+MAX_LIMIT = 1500
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 180_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+}
+
+KLINE_DTYPE = np.dtype(
+    [
+        ("open_time", "i8"),
+        ("open", "f8"),
+        ("high", "f8"),
+        ("low", "f8"),
+        ("close", "f8"),
+        ("volume", "f8"),
+    ]
+)
+
+
+class KlineCache:
+    """Read-through cache of klines for one interval.
+
+    With ``offline=True`` nothing is downloaded and ranges are served from
+    whatever is already on disk.
+    """
+
+    def __init__(self, root: str | Path = "kline_cache", interval: str = "1m", offline: bool = False):
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"unsupported interval {interval!r}, expected one of {sorted(INTERVAL_MS)}")
+        self.root = Path(root)
+        self.interval = interval
+        self.interval_ms = INTERVAL_MS[interval]
+        self.offline = offline
+        self._memory: Dict[str, np.ndarray] = {}
+        self._session = None
+
+    def path(self, symbol: str) -> Path:
+        return self.root / self.interval / f"{symbol.upper()}.npy"
+
+    def load(self, symbol: str) -> np.ndarray:
+        """All cached klines for ``symbol`` (empty array when nothing is cached)."""
+        symbol = symbol.upper()
+        if symbol not in self._memory:
+            path = self.path(symbol)
+            self._memory[symbol] = np.load(path) if path.exists() else np.empty(0, dtype=KLINE_DTYPE)
+        return self._memory[symbol]
+
+    def ensure_range(self, symbol: str, start_ms: int, end_ms: int) -> np.ndarray:
+        """Make sure ``[start_ms, end_ms]`` is cached, downloading only the missing edges."""
+        symbol = symbol.upper()
+        cached = self.load(symbol)
+        if self.offline:
+            return cached
+
+        missing = []
+        if len(cached) == 0:
+            missing.append((start_ms, end_ms))
+        else:
+            first, last = int(cached["open_time"][0]), int(cached["open_time"][-1])
+            if start_ms < first:
+                missing.append((start_ms, first - 1))
+            # Never ask for candles that have not closed yet.
+            horizon = min(end_ms, _now_ms() - self.interval_ms)
+            if horizon > last + self.interval_ms:
+                missing.append((last + self.interval_ms, horizon))
+
+        if not missing:
+            return cached
+
+        fetched = [self._download(symbol, lo, hi) for lo, hi in missing]
+        merged = np.concatenate([cached, *fetched])
+        merged = np.sort(merged, order="open_time")
+        _, unique_idx = np.unique(merged["open_time"], return_index=True)
+        merged = merged[unique_idx]
+        self._save(symbol, merged)
+        return merged
+
+    def get_range(self, symbol: str, start_ms: int, end_ms: int) -> np.ndarray:
+        """Klines whose open time lies in ``[start_ms, end_ms]``."""
+        klines = self.ensure_range(symbol, start_ms, end_ms)
+        times = klines["open_time"]
+        lo = np.searchsorted(times, start_ms, side="left")
+        hi = np.searchsorted(times, end_ms, side="right")
+        return klines[lo:hi]
+
+    def _save(self, symbol: str, klines: np.ndarray) -> None:
+        path = self.path(symbol)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as fh:
+            np.save(fh, klines)
+        os.replace(tmp_path, path)
+        self._memory[symbol] = klines
+
+    def _download(self, symbol: str, start_ms: int, end_ms: int) -> np.ndarray:
+        import requests
+
+        if self._session is None:
+            self._session = requests.Session()
+
+        rows = []
+        cursor = start_ms
+        while cursor <= end_ms:
+            response = self._session.get(
+                BINANCE_KLINES_URL,
+                params={
+                    "symbol": symbol,
+                    "interval": self.interval,
+                    "startTime": cursor,
+                    "endTime": end_ms,
+                    "limit": MAX_LIMIT,
+                },
+                timeout=10,
+            )
+            response.raise_for_status()
+            batch = response.json()
+            if not batch:
+                break
+            rows.extend(
+                (int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]))
+                for k in batch
+            )
+            cursor = int(batch[-1][0]) + self.interval_ms
+            if len(batch) < MAX_LIMIT:
+                break
+            time.sleep(0.1)  # stay well inside Binance's weight limits
+
+        return np.array(rows, dtype=KLINE_DTYPE)
+
+
+class RangeExtrema:
+    """O(1) max/min queries over arbitrary index ranges of one series.
+
+    Sparse tables are built once (``O(n log n)``) so the high/low of thousands
+    of overlapping windows can be answered with a handful of array ops.
+    """
+
+    def __init__(self, highs: np.ndarray, lows: np.ndarray):
+        self._max = _sparse_table(np.asarray(highs, dtype=float), np.maximum)
+        self._min = _sparse_table(np.asarray(lows, dtype=float), np.minimum)
+
+    def query(self, start: np.ndarray, stop: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Max of highs and min of lows over ``[start, stop)`` for each pair (``stop > start``)."""
+        start = np.asarray(start, dtype=np.int64)
+        stop = np.asarray(stop, dtype=np.int64)
+        length = np.maximum(stop - start, 1)
+        level = np.floor(np.log2(length)).astype(np.int64)
+        right = stop - (1 << level)
+        high = np.maximum(self._max[level, start], self._max[level, right])
+        low = np.minimum(self._min[level, start], self._min[level, right])
+        return high, low
+
+
+def _sparse_table(values: np.ndarray, op) -> np.ndarray:
+    n = len(values)
+    levels = max(1, int(np.floor(np.log2(n))) + 1) if n else 1
+    table = np.empty((levels, max(n, 1)), dtype=float)
+    if n == 0:
+        return table
+    table[0] = values
+    for level in range(1, levels):
+        span = 1 << (level - 1)
+        table[level, : n - span] = op(table[level - 1, : n - span], table[level - 1, span:n])
+        table[level, n - span :] = table[level - 1, n - span :]
+    return table
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
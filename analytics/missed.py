@@ -0,0 +1,191 @@
+"""Missed-opportunity scanner over the whole prediction history.
+
+``analyze_missed_opportunities.py`` regex-scrapes BTC prices out of
+``cot_trace``. This module starts from the structured prediction table
+instead: every directional prediction that no trader acted on (no open in the
+predicted direction on that symbol within ``entry_window`` of the
+prediction) is joined to the realised path over its own timeframe from the
+kline cache, for all symbols at once (the same windows as
+:func:`analytics.predictions.evaluate_predictions`).
+
+Each missed prediction gets the forgone move (best excursion in the
+predicted direction) and the realised end-of-timeframe move, plus the market
+regime at prediction time using the orchestrator's rule engine thresholds on
+BTC 4h klines: C when ATR14 < 1% of price, A1 when price > EMA50 > EMA200,
+A2 when price < EMA50 < EMA200, otherwise B.
+
+Usage::
+
+    python -m analytics.missed
+    python -m analytics.missed --trader binance_live_qwen --entry-window 1h --top 30 --csv missed.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from .decision_logs import DEFAULT_ROOT, list_traders, load_tables, trader_dir
+from .klines import KlineCache
+from .predictions import evaluate_predictions, load_predictions
+from .timeutil import to_epoch_ms
+
+DEFAULT_ENTRY_WINDOW = pd.Timedelta(minutes=30)
+REGIME_SYMBOL = "BTCUSDT"
+REGIME_INTERVAL = "4h"
+# Bars of 4h history needed before EMA200 is meaningful.
+REGIME_WARMUP_BARS = 210
+
+DIRECTION_ACTION = {"up": "open_long", "down": "open_short"}
+
+
+def load_opens(root: str = DEFAULT_ROOT, traders: Iterable[str] | None = None) -> pd.DataFrame:
+    """Successful opens of the selected traders (default: all) as ``symbol, timestamp, action``."""
+    frames = []
+    for trader in traders or list_traders(root):
+        actions = load_tables(trader_dir(trader, root))["actions"]
+        opens = actions[actions["success"] & actions["action"].str.startswith("open_")]
+        frames.append(opens[["symbol", "timestamp", "action"]].assign(trader=trader))
+    if not frames:
+        return pd.DataFrame(columns=["symbol", "timestamp", "action", "trader"])
+    return pd.concat(frames, ignore_index=True).dropna(subset=["timestamp"])
+
+
+def mark_entries(predictions: pd.DataFrame, opens: pd.DataFrame, window: pd.Timedelta = DEFAULT_ENTRY_WINDOW) -> pd.Series:
+    """Whether each prediction was followed by an open in its direction within ``window``."""
+    entered = pd.Series(False, index=predictions.index)
+    for direction, action in DIRECTION_ACTION.items():
+        preds = predictions[predictions["direction"] == direction].dropna(subset=["timestamp"])
+        acts = opens[opens["action"] == action]
+        if preds.empty or acts.empty:
+            continue
+        matched = pd.merge_asof(
+            preds[["symbol", "timestamp"]].reset_index().sort_values("timestamp"),
+            acts[["symbol", "timestamp"]].rename(columns={"timestamp": "opened_at"}).sort_values("opened_at"),
+            left_on="timestamp",
+            right_on="opened_at",
+            by="symbol",
+            direction="forward",
+            tolerance=window,
+        )
+        entered.loc[matched.loc[matched["opened_at"].notna(), "index"]] = True
+    return entered
+
+
+def regime_at(times: pd.Series, cache: KlineCache, symbol: str = REGIME_SYMBOL) -> pd.Series:
+    """Rule-engine regime (A1/A2/B/C) from the last closed 4h bar before each time."""
+    times_ms = to_epoch_ms(times).to_numpy()
+    warmup = REGIME_WARMUP_BARS * cache.interval_ms
+    klines = cache.get_range(symbol, int(times_ms.min()) - warmup, int(times_ms.max()))
+    regime = pd.Series("unknown", index=times.index, dtype=object)
+    if len(klines) == 0:
+        return regime
+
+    close = pd.Series(klines["close"])
+    high, low = klines["high"], klines["low"]
+    previous = np.concatenate([[np.nan], klines["close"][:-1]])
+    true_range = np.nanmax(np.vstack([high - low, np.abs(high - previous), np.abs(low - previous)]), axis=0)
+    atr_pct = pd.Series(true_range).rolling(14, min_periods=14).mean().to_numpy() / klines["close"] * 100
+    ema50 = close.ewm(span=50, adjust=False, min_periods=50).mean().to_numpy()
+    ema200 = close.ewm(span=200, adjust=False, min_periods=200).mean().to_numpy()
+
+    # Last bar that has fully closed at prediction time.
+    bar = np.searchsorted(klines["open_time"], times_ms - cache.interval_ms, side="right") - 1
+    valid = bar >= 0
+    bar = np.maximum(bar, 0)
+    price, e50, e200, atr = klines["close"][bar], ema50[bar], ema200[bar], atr_pct[bar]
+    known = valid & ~np.isnan(e200) & ~np.isnan(atr)
+    labels = np.select(
+        [atr < 1.0, (price > e50) & (e50 > e200), (price < e50) & (e50 < e200)],
+        ["C", "A1", "A2"],
+        default="B",
+    )
+    regime[known] = labels[known]
+    return regime
+
+
+def scan_missed(
+    predictions: pd.DataFrame,
+    opens: pd.DataFrame,
+    cache: KlineCache,
+    regime_cache: KlineCache | None = None,
+    entry_window: pd.Timedelta = DEFAULT_ENTRY_WINDOW,
+) -> pd.DataFrame:
+    """Matured directional predictions without an entry, with forgone and realised moves."""
+    directional = predictions[predictions["direction"].isin(list(DIRECTION_ACTION))].copy()
+    directional["entered"] = mark_entries(directional, opens, entry_window)
+    missed = directional[~directional["entered"]]
+    if missed.empty:
+        return missed
+
+    paths = evaluate_predictions(missed, cache, reevaluate=True)
+    if paths.empty:
+        return paths
+    sign = np.where(paths["direction"] == "up", 1.0, -1.0)
+    entry = paths["entry_price"].to_numpy(dtype=float)
+    best = np.where(sign > 0, paths["actual_high"], paths["actual_low"])
+    paths["forgone_pct"] = np.maximum((best - entry) / entry * sign * 100, 0.0)
+    paths["realised_pct"] = paths["actual_move"] * sign
+    if regime_cache is not None:
+        paths["regime"] = regime_at(paths["timestamp"], regime_cache)
+    else:
+        paths["regime"] = "unknown"
+    return paths.sort_values("forgone_pct", ascending=False)
+
+
+def breakdown(missed: pd.DataFrame, by: str) -> pd.DataFrame:
+    return missed.groupby(by).agg(
+        missed=("forgone_pct", "size"),
+        avg_forgone_pct=("forgone_pct", "mean"),
+        total_forgone_pct=("forgone_pct", "sum"),
+        avg_realised_pct=("realised_pct", "mean"),
+        hit_rate=("is_correct", "mean"),
+        avg_probability=("probability", "mean"),
+    ).sort_values("total_forgone_pct", ascending=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rank the largest moves the AI predicted but never traded.")
+    parser.add_argument("--pred-dir", default="prediction_logs", help="Prediction log directory.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--trader", action="append", help="Only count opens of these traders (default all).")
+    parser.add_argument("--entry-window", default="30min", help="How soon after a prediction an open counts.")
+    parser.add_argument("--cache-dir", default="kline_cache", help="Kline cache directory.")
+    parser.add_argument("--interval", default="1m", help="Kline interval for the price paths (default 1m).")
+    parser.add_argument("--offline", action="store_true", help="Use cached klines only, never download.")
+    parser.add_argument("--top", type=int, default=20, help="How many missed predictions to list.")
+    parser.add_argument("--csv", default=None, help="Also write every missed prediction to this CSV.")
+    args = parser.parse_args()
+
+    predictions = load_predictions(args.pred_dir)
+    opens = load_opens(args.root, args.trader)
+    cache = KlineCache(args.cache_dir, interval=args.interval, offline=args.offline)
+    regime_cache = KlineCache(args.cache_dir, interval=REGIME_INTERVAL, offline=args.offline)
+    missed = scan_missed(predictions, opens, cache, regime_cache, pd.Timedelta(args.entry_window))
+
+    print("=" * 80)
+    print(f"🔍 错失机会扫描: {len(predictions)} 条预测, {len(opens)} 次开仓, {len(missed)} 条未入场的到期预测")
+    print("=" * 80)
+    if missed.empty:
+        print("⏳ 没有可评估的未入场预测")
+        return
+
+    pd.set_option("display.width", 200)
+    columns = ["timestamp", "symbol", "direction", "probability", "confidence", "timeframe", "regime",
+               "expected_move", "forgone_pct", "realised_pct"]
+    print(f"\n💸 错失最大的 {args.top} 次机会:")
+    print(missed.head(args.top)[columns].to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    for by, label in (("symbol", "币种"), ("regime", "市场体制"), ("confidence", "置信度")):
+        print(f"\n📊 按{label}:")
+        print(breakdown(missed, by).round(3).to_string())
+
+    if args.csv:
+        missed.to_csv(args.csv, index=False)
+        print(f"\n💾 已写入 {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
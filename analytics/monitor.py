@@ -0,0 +1,445 @@
+"""Long-running exposure monitor for ``decision_logs``.
+
+Replaces re-running ``monitor_balance.py`` / ``show_current_pnl.py`` over the
+whole log directory: existing files are read once at start-up, after which
+each new cycle file is applied to per-trader aggregates as it appears
+(long/short notional, unrealized PnL, margin, open/close counts). The
+current snapshot is kept pre-serialised in memory and served by a small
+local HTTP endpoint, so a status check never touches the log directory.
+
+New files are picked up with Linux inotify (through ``ctypes``, no extra
+dependency); where inotify is unavailable the directory is polled instead.
+
+Usage::
+
+    python -m analytics.monitor --port 8787
+    python -m analytics.monitor --trader binance_live_qwen --since 2025-10-31T11:42:00 --poll
+    curl -s localhost:8787/snapshot
+"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from .decision_logs import DEFAULT_ROOT, is_decision_file, iter_decision_files, list_traders, parse_filename, read_record
+
+DEFAULT_PORT = 8787
+DEFAULT_POLL_SECONDS = 5.0
+# Reads of a file that stays unparseable before it is given up on.
+MAX_PENDING_RETRIES = 20
+
+
+@dataclass
+class TraderState:
+    """Aggregates for one trader, updated one cycle file at a time."""
+
+    trader_id: str
+    file_key: str = ""
+    cycle_number: int = 0
+    timestamp: str = ""
+    success: bool = True
+    total_balance: float = 0.0
+    available_balance: float = 0.0
+    unrealized_profit: float = 0.0
+    margin_used_pct: float = 0.0
+    position_count: int = 0
+    long_notional: float = 0.0
+    short_notional: float = 0.0
+    long_unrealized: float = 0.0
+    short_unrealized: float = 0.0
+    long_margin: float = 0.0
+    short_margin: float = 0.0
+    positions: List[Dict[str, Any]] = field(default_factory=list)
+    cycles_seen: int = 0
+    failed_cycles: int = 0
+    open_long: int = 0
+    open_short: int = 0
+    close_long: int = 0
+    close_short: int = 0
+
+    def apply(self, record: Dict[str, Any], file_key: str, count_decisions: bool = True) -> None:
+        """Fold one cycle into the aggregates.
+
+        Decision counters accumulate; the exposure snapshot only moves forward,
+        so a late or out-of-order file never overwrites a newer cycle.
+        """
+        if count_decisions:
+            self.cycles_seen += 1
+            if not record.get("success", True):
+                self.failed_cycles += 1
+            for decision in record.get("decisions") or []:
+                if not decision.get("success", False):
+                    continue
+                action = decision.get("action", "")
+                if action in ("open_long", "open_short", "close_long", "close_short"):
+                    setattr(self, action, getattr(self, action) + 1)
+
+        if file_key < self.file_key:
+            return
+        self.file_key = file_key
+        self.cycle_number = int(record.get("cycle_number", 0) or 0)
+        self.timestamp = record.get("timestamp", "")
+        self.success = bool(record.get("success", True))
+
+        account = record.get("account_state") or {}
+        self.total_balance = float(account.get("total_balance", 0) or 0)
+        self.available_balance = float(account.get("available_balance", 0) or 0)
+        self.unrealized_profit = float(account.get("total_unrealized_profit", 0) or 0)
+        self.margin_used_pct = float(account.get("margin_used_pct", 0) or 0)
+        self.position_count = int(account.get("position_count", 0) or 0)
+
+        totals = {"long": [0.0, 0.0, 0.0], "short": [0.0, 0.0, 0.0]}
+        positions = []
+        for pos in record.get("positions") or []:
+            side = pos.get("side", "")
+            mark = float(pos.get("mark_price", 0) or 0)
+            notional = abs(float(pos.get("position_amt", 0) or 0)) * mark
+            leverage = float(pos.get("leverage", 0) or 0)
+            pnl = float(pos.get("unrealized_profit", 0) or 0)
+            margin = notional / leverage if leverage > 0 else 0.0
+            if side in totals:
+                bucket = totals[side]
+                bucket[0] += notional
+                bucket[1] += pnl
+                bucket[2] += margin
+            positions.append(
+                {
+                    "symbol": pos.get("symbol", ""),
+                    "side": side,
+                    "notional": notional,
+                    "unrealized_profit": pnl,
+                    "leverage": leverage,
+                    "mark_price": mark,
+                    "liquidation_price": float(pos.get("liquidation_price", 0) or 0),
+                }
+            )
+        self.long_notional, self.long_unrealized, self.long_margin = totals["long"]
+        self.short_notional, self.short_unrealized, self.short_margin = totals["short"]
+        self.positions = positions
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        opens = self.open_long + self.open_short
+        gross = self.long_notional + self.short_notional
+        data["net_notional"] = self.long_notional - self.short_notional
+        data["gross_notional"] = gross
+        data["gross_leverage"] = gross / self.total_balance if self.total_balance > 0 else 0.0
+        data["open_short_pct"] = self.open_short / opens * 100 if opens else None
+        return data
+
+
+class ExposureMonitor:
+    """Holds every trader's :class:`TraderState` and the serialised snapshot."""
+
+    def __init__(self, root: str | Path = DEFAULT_ROOT, traders: Iterable[str] | None = None, since: str | None = None):
+        self.root = Path(root)
+        self.only = set(traders) if traders else None
+        # Decision counters start at this file-name key (YYYYMMDD_HHMMSS).
+        self.since = since
+        self.states: Dict[str, TraderState] = {}
+        # Newest file key applied per trader; the Go logger writes files in order,
+        # so anything at or below it has been handled.
+        self._newest: Dict[str, str] = {}
+        # Unparseable files (usually still being written) -> failed reads so far.
+        self._pending: Dict[Path, int] = {}
+        self._lock = threading.Lock()
+        self._snapshot = b"{}"
+        self._per_trader: Dict[str, bytes] = {}
+
+    def traders(self) -> List[str]:
+        return [t for t in list_traders(self.root) if self.only is None or t in self.only]
+
+    def bootstrap(self) -> None:
+        """Read what is already on disk: files since ``since`` plus each trader's latest."""
+        for trader in self.traders():
+            files = iter_decision_files(self.root / trader)
+            if self.since is not None:
+                keep = [p for p in files if (parse_filename(p.name) or ("",))[0] >= self.since]
+                if files and (not keep or keep[-1] != files[-1]):
+                    keep.append(files[-1])
+                # Older files are never opened; the newest key covers them.
+                files = keep
+            self._ingest(files, publish=False)
+        self._publish()
+
+    def ingest(self, paths: Iterable[Path]) -> int:
+        return self._ingest(paths, publish=True)
+
+    def retry_pending(self) -> int:
+        """Files that were still being written (or unparseable) at the last attempt."""
+        if not self._pending:
+            return 0
+        return self._ingest(list(self._pending), publish=True)
+
+    def _ingest(self, paths: Iterable[Path], publish: bool) -> int:
+        applied = 0
+        paths = [Path(path) if isinstance(path, str) else path for path in paths]
+        # Oldest first, so the per-trader newest key only ever moves forward.
+        for path in sorted(paths, key=lambda path: path.name):
+            if not is_decision_file(path.name):
+                continue
+            trader = path.parent.name
+            file_key = (parse_filename(path.name) or ("",))[0]
+            if file_key <= self._newest.get(trader, "") and path not in self._pending:
+                continue
+            if self.only is not None and trader not in self.only:
+                continue
+            try:
+                record = read_record(path)
+            except FileNotFoundError:
+                self._pending.pop(path, None)
+                continue
+            except (OSError, ValueError) as exc:
+                # Go writes files in place; a partial file is retried later, a broken one not forever.
+                attempts = self._pending.get(path, 0) + 1
+                if attempts < MAX_PENDING_RETRIES:
+                    self._pending[path] = attempts
+                    continue
+                print(f"⚠️  放弃读取 {path.name}: {exc}")
+                self._pending.pop(path, None)
+                self._advance(trader, file_key)
+                continue
+            self._pending.pop(path, None)
+            self._advance(trader, file_key)
+
+            count = self.since is None or file_key >= self.since
+            with self._lock:
+                state = self.states.setdefault(trader, TraderState(trader))
+                state.apply(record, file_key, count_decisions=count)
+            applied += 1
+        if applied and publish:
+            self._publish()
+        return applied
+
+    def _advance(self, trader: str, file_key: str) -> None:
+        if file_key <= self._newest.get(trader, ""):
+            return
+        self._newest[trader] = file_key
+        # A newer file was written, so older unreadable ones are not partial writes.
+        for stale in [p for p in self._pending if p.parent.name == trader and parse_filename(p.name)[0] < file_key]:
+            del self._pending[stale]
+
+    def _publish(self) -> None:
+        with self._lock:
+            traders = {trader: state.to_dict() for trader, state in sorted(self.states.items())}
+        totals = {
+            key: sum(t[key] for t in traders.values())
+            for key in ("total_balance", "unrealized_profit", "long_notional", "short_notional",
+                        "long_margin", "short_margin", "open_long", "open_short")
+        }
+        snapshot = {
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "totals": totals,
+            "traders": traders,
+        }
+        per_trader = {trader: json.dumps(data, ensure_ascii=False).encode("utf-8") for trader, data in traders.items()}
+        encoded = json.dumps(snapshot, ensure_ascii=False).encode("utf-8")
+        # Swap references atomically; readers never see a half-built snapshot.
+        self._per_trader = per_trader
+        self._snapshot = encoded
+
+    def snapshot_bytes(self, trader: str | None = None) -> bytes | None:
+        if trader is None:
+            return self._snapshot
+        return self._per_trader.get(trader)
+
+
+# ---------------------------------------------------------------------------
+# File watching
+# ---------------------------------------------------------------------------
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal inotify binding: add watches and read ``(wd, mask, name)`` events."""
+
+    def __init__(self) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify not supported on this platform")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, Path] = {}
+
+    def add_watch(self, path: Path, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.watches[wd] = Path(path)
+        return wd
+
+    def read(self, timeout: float) -> List[tuple[Path, int, str]]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0").decode("utf-8", "replace")
+            offset += length
+            events.append((self.watches.get(wd, Path()), mask, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def watch_inotify(monitor: ExposureMonitor, stop: threading.Event, retry_seconds: float = 1.0) -> None:
+    notify = Inotify()
+    try:
+        notify.add_watch(monitor.root, IN_CREATE | IN_MOVED_TO)
+        for trader in monitor.traders():
+            notify.add_watch(monitor.root / trader, IN_CLOSE_WRITE | IN_MOVED_TO)
+
+        while not stop.is_set():
+            events = notify.read(retry_seconds)
+            changed: List[Path] = []
+            for directory, mask, name in events:
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped: fall back to one full listing.
+                    for trader in monitor.traders():
+                        changed.extend(iter_decision_files(monitor.root / trader))
+                elif directory == monitor.root and mask & IN_ISDIR:
+                    if monitor.only is None or name in monitor.only:
+                        notify.add_watch(monitor.root / name, IN_CLOSE_WRITE | IN_MOVED_TO)
+                        changed.extend(iter_decision_files(monitor.root / name))
+                elif name:
+                    changed.append(directory / name)
+            if changed:
+                monitor.ingest(changed)
+            monitor.retry_pending()
+    finally:
+        notify.close()
+
+
+def watch_polling(monitor: ExposureMonitor, stop: threading.Event, interval: float = DEFAULT_POLL_SECONDS) -> None:
+    while not stop.wait(interval):
+        changed = []
+        for trader in monitor.traders():
+            directory = monitor.root / trader
+            try:
+                with os.scandir(directory) as entries:
+                    changed.extend(directory / entry.name for entry in entries if is_decision_file(entry.name))
+            except OSError:
+                continue
+        monitor.ingest(changed)
+        monitor.retry_pending()
+
+
+# ---------------------------------------------------------------------------
+# HTTP endpoint
+# ---------------------------------------------------------------------------
+
+
+def make_server(monitor: ExposureMonitor, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path in ("", "/snapshot"):
+                body = monitor.snapshot_bytes()
+            elif path.startswith("/snapshot/"):
+                body = monitor.snapshot_bytes(path[len("/snapshot/") :])
+            elif path == "/healthz":
+                body = b'{"ok": true}'
+            else:
+                body = None
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def _since_key(value: str | None) -> str | None:
+    """``2025-10-31T11:42:00`` (as accepted by monitor_balance.py) to a file-name key."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed.strftime("%Y%m%d_%H%M%S")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve live long/short exposure aggregates from decision_logs.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--trader", action="append", help="Trader id to watch (repeatable, default all).")
+    parser.add_argument("--since", default=None, help="Only count decisions from this time, e.g. 2025-10-31T11:42:00.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--poll", action="store_true", help="Poll the directories instead of using inotify.")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_SECONDS)
+    args = parser.parse_args()
+
+    monitor = ExposureMonitor(args.root, traders=args.trader, since=_since_key(args.since))
+    started = time.perf_counter()
+    monitor.bootstrap()
+    print(f"📂 已加载 {len(monitor.states)} 个交易员 ({time.perf_counter() - started:.2f}s)")
+
+    server = make_server(monitor, args.host, args.port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🌐 快照地址: http://{args.host}:{args.port}/snapshot")
+
+    use_inotify = not args.poll
+    if use_inotify:
+        try:
+            Inotify().close()
+        except OSError as exc:
+            print(f"⚠️  inotify 不可用: {exc}")
+            use_inotify = False
+
+    stop = threading.Event()
+    try:
+        if use_inotify:
+            print("👀 使用 inotify 监听新决策文件")
+            watch_inotify(monitor, stop)
+        else:
+            print(f"🔁 使用轮询模式 (每 {args.poll_interval:g}s)")
+            watch_polling(monitor, stop, args.poll_interval)
+    except KeyboardInterrupt:
+        print("\n🛑 已停止")
+    finally:
+        stop.set()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
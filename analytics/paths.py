@@ -0,0 +1,280 @@
+"""Price-path analytics for round-trip trades.
+
+``analyze_close_behavior.py`` and ``analyze_what_if_hold.py`` only see each
+trade's entry and exit. Here every trade from :func:`analytics.trades.round_trips`
+is joined to the price path between open and close: either cached 1m klines
+(:class:`analytics.klines.KlineCache`) or the per-cycle mark prices from the
+positions table. From the path come max adverse/favourable excursion, time to
+the peak, giveback from the peak, and the result under alternative exits:
+
+* a fixed stop ``atr_mult`` ATRs from entry (ATR measured before entry);
+* a trailing stop ``trail_pct`` below the best price seen so far;
+* a time stop closing at the last bar before ``time_stop`` minutes.
+
+Trades are processed as padded ``(trades, bars)`` matrices, grouped by
+length so the padding stays within a fixed cell budget.
+
+Usage::
+
+    python -m analytics.paths --trader binance_live_qwen
+    python -m analytics.paths --trader binance_live_qwen --source marks --atr-mult 1.5 --trail-pct 0.8 --time-stop 90
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from typing import Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+from .decision_logs import DEFAULT_ROOT, load_tables, trader_dir
+from .klines import KlineCache
+from .timeutil import to_epoch_ms
+from .trades import round_trips
+
+DEFAULT_ATR_PERIOD = 14
+DEFAULT_ATR_MULT = 2.0
+DEFAULT_TRAIL_PCT = 1.0
+DEFAULT_TIME_STOP_MINUTES = 60.0
+# Upper bound on padded matrix cells per chunk (~8 float64 arrays of this size live at once).
+CELL_BUDGET = 2_000_000
+
+
+@dataclass
+class SymbolPath:
+    """Bars for one symbol: open times (ms), high, low, close and ATR per bar."""
+
+    times: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    atr: np.ndarray
+
+
+class PriceSource:
+    """Per-symbol bar arrays plus the bar length used to convert minutes to bars."""
+
+    def __init__(self, paths: Dict[str, SymbolPath], interval_ms: int):
+        self.paths = paths
+        self.interval_ms = interval_ms
+
+    @classmethod
+    def from_klines(
+        cls, cache: KlineCache, trades: pd.DataFrame, atr_period: int = DEFAULT_ATR_PERIOD
+    ) -> "PriceSource":
+        paths = {}
+        warmup = (atr_period + 1) * cache.interval_ms
+        for symbol, group in trades.groupby("symbol"):
+            start = int(to_epoch_ms(group["entry_time"]).min()) - warmup
+            end = int(to_epoch_ms(group["exit_time"]).max())
+            klines = cache.get_range(symbol, start, end)
+            paths[symbol] = _symbol_path(klines["open_time"], klines["high"], klines["low"], klines["close"], atr_period)
+        return cls(paths, cache.interval_ms)
+
+    @classmethod
+    def from_marks(cls, positions: pd.DataFrame, atr_period: int = DEFAULT_ATR_PERIOD) -> "PriceSource":
+        """Mark prices from the positions table; each cycle is a bar with high = low = close."""
+        flat = positions.reset_index()[["symbol", "timestamp", "mark_price"]].dropna()
+        flat = flat.drop_duplicates(subset=["symbol", "timestamp"]).sort_values(["symbol", "timestamp"])
+        paths = {}
+        spacing = []
+        for symbol, group in flat.groupby("symbol"):
+            times = to_epoch_ms(group["timestamp"]).to_numpy()
+            mark = group["mark_price"].to_numpy(dtype=float)
+            paths[symbol] = _symbol_path(times, mark, mark, mark, atr_period)
+            if len(times) > 1:
+                spacing.append(np.median(np.diff(times)))
+        interval_ms = int(np.median(spacing)) if spacing else 180_000
+        return cls(paths, interval_ms)
+
+
+def _symbol_path(times, high, low, close, atr_period: int) -> SymbolPath:
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    previous = np.concatenate([[np.nan], close[:-1]])
+    true_range = np.nanmax(np.vstack([high - low, np.abs(high - previous), np.abs(low - previous)]), axis=0)
+    atr = pd.Series(true_range).rolling(atr_period, min_periods=atr_period).mean().to_numpy()
+    return SymbolPath(np.asarray(times, dtype=np.int64), high, low, close, atr)
+
+
+def _chunks(lengths: np.ndarray, budget: int = CELL_BUDGET) -> Iterator[np.ndarray]:
+    """Trade indices grouped (shortest first) so ``rows * longest`` stays under ``budget``."""
+    order = np.argsort(lengths, kind="stable")
+    start = 0
+    while start < len(order):
+        stop = start + 1
+        while stop < len(order) and (stop - start + 1) * max(1, lengths[order[stop]]) <= budget:
+            stop += 1
+        yield order[start:stop]
+        start = stop
+
+
+def trade_paths(
+    trades: pd.DataFrame,
+    source: PriceSource,
+    atr_mult: float = DEFAULT_ATR_MULT,
+    trail_pct: float = DEFAULT_TRAIL_PCT,
+    time_stop_minutes: float = DEFAULT_TIME_STOP_MINUTES,
+) -> pd.DataFrame:
+    """``trades`` with path metrics and alternative-exit results (all moves in % of entry price)."""
+    out = trades.reset_index(drop=True).copy()
+    n = len(out)
+    columns = {
+        name: np.full(n, np.nan)
+        for name in ("bars", "mae_pct", "mfe_pct", "minutes_to_mfe", "atr_pct", "atr_stop_pct",
+                     "trail_stop_pct", "time_stop_pct")
+    }
+    sign_all = np.where(out["side"] == "short", -1.0, 1.0)
+    entry_all = out["entry_price"].to_numpy(dtype=float)
+    out["actual_pct"] = (out["exit_price"].to_numpy(dtype=float) - entry_all) / entry_all * sign_all * 100
+    time_stop_bars = max(1, int(round(time_stop_minutes * 60_000 / source.interval_ms)))
+
+    for symbol, group in out.groupby("symbol"):
+        path = source.paths.get(symbol)
+        if path is None or len(path.times) == 0:
+            continue
+        rows = group.index.to_numpy()
+        lo = np.searchsorted(path.times, to_epoch_ms(group["entry_time"]).to_numpy(), side="left")
+        hi = np.searchsorted(path.times, to_epoch_ms(group["exit_time"]).to_numpy(), side="right")
+        lengths = np.maximum(hi - lo, 0)
+
+        for part in _chunks(lengths):
+            idx = rows[part]
+            _evaluate_chunk(
+                path, lo[part], lengths[part], sign_all[idx], entry_all[idx],
+                out["actual_pct"].to_numpy()[idx], atr_mult, trail_pct, time_stop_bars,
+                source.interval_ms, columns, idx,
+            )
+
+    for name, values in columns.items():
+        out[name] = values
+    actual = out["actual_pct"]
+    for name in ("atr_stop_pct", "trail_stop_pct", "time_stop_pct"):
+        # Trades without a path (or without ATR history) keep their real exit.
+        out[name] = out[name].fillna(actual)
+    out["giveback_pct"] = out["mfe_pct"] - actual
+    notional = out["entry_price"] * out["quantity"]
+    for name in ("actual", "atr_stop", "trail_stop", "time_stop"):
+        out[f"{name}_usdt"] = out[f"{name}_pct"] / 100 * notional
+    return out
+
+
+def _evaluate_chunk(path, lo, lengths, sign, entry, actual, atr_mult, trail_pct, time_stop_bars,
+                    interval_ms, columns, idx) -> None:
+    width = int(lengths.max()) if len(lengths) else 0
+    if width == 0:
+        return
+    offsets = np.arange(width)
+    valid = offsets[None, :] < lengths[:, None]
+    cells = np.minimum(lo[:, None] + offsets[None, :], len(path.times) - 1)
+
+    long = sign[:, None] > 0
+    best_price = np.where(long, path.high[cells], path.low[cells])
+    worst_price = np.where(long, path.low[cells], path.high[cells])
+    favourable = np.where(valid, (best_price - entry[:, None]) / entry[:, None] * sign[:, None] * 100, -np.inf)
+    adverse = np.where(valid, (worst_price - entry[:, None]) / entry[:, None] * sign[:, None] * 100, np.inf)
+    close_pct = (path.close[cells] - entry[:, None]) / entry[:, None] * sign[:, None] * 100
+
+    has_path = lengths > 0
+    rows = np.arange(len(lo))
+    peak_bar = favourable.argmax(axis=1)
+    columns["bars"][idx] = lengths
+    columns["mae_pct"][idx] = np.where(has_path, np.minimum(adverse.min(axis=1), 0.0), np.nan)
+    columns["mfe_pct"][idx] = np.where(has_path, np.maximum(favourable.max(axis=1), 0.0), np.nan)
+    columns["minutes_to_mfe"][idx] = np.where(has_path, (peak_bar + 1) * interval_ms / 60_000, np.nan)
+
+    # Fixed stop atr_mult ATRs away, ATR taken from the last bar before entry.
+    atr_before = np.where(lo > 0, path.atr[np.maximum(lo - 1, 0)], np.nan)
+    atr_pct = atr_before / entry * 100
+    columns["atr_pct"][idx] = atr_pct
+    stop_level = -atr_mult * atr_pct
+    hit = adverse <= stop_level[:, None]
+    stopped = hit.any(axis=1) & np.isfinite(stop_level)
+    columns["atr_stop_pct"][idx] = np.where(stopped, stop_level, np.where(has_path & np.isfinite(stop_level), actual, np.nan))
+
+    # Trailing stop: the level trails the best move of the previous bars, so
+    # a bar's own high never raises the stop it is tested against.
+    running_best = np.maximum.accumulate(np.maximum(favourable, 0.0), axis=1)
+    prior_best = np.concatenate([np.zeros((len(lo), 1)), running_best[:, :-1]], axis=1)
+    trail_level = prior_best - trail_pct
+    trail_hit = adverse <= trail_level
+    trailed = trail_hit.any(axis=1)
+    first_trail = trail_hit.argmax(axis=1)
+    columns["trail_stop_pct"][idx] = np.where(trailed, trail_level[rows, first_trail], np.where(has_path, actual, np.nan))
+
+    # Time stop: close of the last bar inside the allowed holding time.
+    timed_out = lengths > time_stop_bars
+    columns["time_stop_pct"][idx] = np.where(
+        timed_out, close_pct[rows, np.minimum(time_stop_bars, width) - 1], np.where(has_path, actual, np.nan)
+    )
+
+
+def exit_summary(paths: pd.DataFrame) -> pd.DataFrame:
+    """Actual vs alternative exits: average move, win rate and total USDT."""
+    rows = []
+    for name, label in (("actual", "实际平仓"), ("atr_stop", "ATR固定止损"), ("trail_stop", "移动止损"),
+                        ("time_stop", "时间止损")):
+        pct = paths[f"{name}_pct"]
+        rows.append(
+            {
+                "exit": label,
+                "avg_pct": pct.mean(),
+                "win_rate": (pct > 0).mean() * 100,
+                "total_usdt": paths[f"{name}_usdt"].sum(),
+                "changed_trades": int((~np.isclose(pct, paths["actual_pct"])).sum()),
+            }
+        )
+    return pd.DataFrame(rows).set_index("exit")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MAE/MFE and alternative exits for every round-trip trade.")
+    parser.add_argument("--trader", required=True, help="Trader id under decision_logs/.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--source", choices=("klines", "marks"), default="klines",
+                        help="Price path: cached klines or per-cycle mark prices (default klines).")
+    parser.add_argument("--cache-dir", default="kline_cache", help="Kline cache directory.")
+    parser.add_argument("--interval", default="1m", help="Kline interval (default 1m).")
+    parser.add_argument("--offline", action="store_true", help="Use cached klines only, never download.")
+    parser.add_argument("--atr-period", type=int, default=DEFAULT_ATR_PERIOD)
+    parser.add_argument("--atr-mult", type=float, default=DEFAULT_ATR_MULT)
+    parser.add_argument("--trail-pct", type=float, default=DEFAULT_TRAIL_PCT, help="Trailing distance in price %%.")
+    parser.add_argument("--time-stop", type=float, default=DEFAULT_TIME_STOP_MINUTES, help="Time stop in minutes.")
+    parser.add_argument("--csv", default=None, help="Also write the per-trade table to this CSV.")
+    args = parser.parse_args()
+
+    tables = load_tables(trader_dir(args.trader, args.root))
+    trades = round_trips(tables["actions"])
+    print("=" * 80)
+    print(f"🛤️  交易路径分析: {args.trader} ({len(trades)} 笔完整交易, 价格来源 {args.source})")
+    print("=" * 80)
+    if trades.empty:
+        print("⏳ 没有完整的开平仓交易")
+        return
+
+    if args.source == "klines":
+        cache = KlineCache(args.cache_dir, interval=args.interval, offline=args.offline)
+        source = PriceSource.from_klines(cache, trades, args.atr_period)
+    else:
+        source = PriceSource.from_marks(tables["positions"], args.atr_period)
+    paths = trade_paths(trades, source, args.atr_mult, args.trail_pct, args.time_stop)
+
+    pd.set_option("display.width", 200)
+    covered = paths["bars"].notna() & (paths["bars"] > 0)
+    print(f"\n📈 有价格路径的交易: {int(covered.sum())}/{len(paths)}")
+    print(f"  平均MAE {paths['mae_pct'].mean():+.3f}% | 平均MFE {paths['mfe_pct'].mean():+.3f}%"
+          f" | 平均回吐 {paths['giveback_pct'].mean():.3f}% | 到达峰值平均 {paths['minutes_to_mfe'].mean():.1f} 分钟")
+
+    print(f"\n🔀 替代平仓方式 (ATR×{args.atr_mult:g}, 移动止损 {args.trail_pct:g}%, 时间止损 {args.time_stop:g} 分钟):")
+    print(exit_summary(paths).round(3).to_string())
+
+    if args.csv:
+        paths.to_csv(args.csv, index=False)
+        print(f"\n💾 已写入 {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Position lifecycles and excursions from the long-format positions table.
+
+``decision_logs.load_tables`` stores one row per held position per cycle,
+indexed by ``(symbol, side, timestamp)``. Here consecutive rows of the same
+symbol and side are split into holding episodes (a new episode starts when
+the entry price changes or the position disappears for longer than
+``max_gap``), and each episode's max adverse/favourable excursion is taken
+with a single group-by, replacing the cycle-by-cycle ``{symbol: side}``
+bookkeeping in ``analyze_24h_performance.py`` and ``track_trades_outcome.py``.
+
+Usage::
+
+    python -m analytics.positions --trader binance_live_qwen
+    python -m analytics.positions --trader binance_live_qwen --csv episodes.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from .decision_logs import DEFAULT_ROOT, load_tables, trader_dir
+
+# Three missed 3-minute cycles (a 12-minute gap) still count as the same holding.
+DEFAULT_MAX_GAP = pd.Timedelta(minutes=13)
+
+
+def label_episodes(positions: pd.DataFrame, max_gap: pd.Timedelta = DEFAULT_MAX_GAP) -> pd.DataFrame:
+    """Flat copy of ``positions`` with an ``episode`` id and per-row excursion columns.
+
+    ``move_pct`` is the price move from entry in the position's favour;
+    ``roe_pct`` is the same move on margin (times leverage).
+    """
+    flat = positions.reset_index().sort_values(["symbol", "side", "timestamp"], kind="stable")
+    flat = flat.reset_index(drop=True)
+    if flat.empty:
+        for column in ("episode", "move_pct", "roe_pct"):
+            flat[column] = pd.Series(dtype=float)
+        return flat
+
+    same_key = (flat["symbol"] == flat["symbol"].shift()) & (flat["side"] == flat["side"].shift())
+    gap = flat["timestamp"].diff() > max_gap
+    previous_entry = flat["entry_price"].shift()
+    entry_changed = ~np.isclose(flat["entry_price"], previous_entry, rtol=1e-9, atol=0.0)
+    flat["episode"] = (~same_key | gap | entry_changed).cumsum() - 1
+
+    sign = np.where(flat["side"] == "short", -1.0, 1.0)
+    flat["move_pct"] = (flat["mark_price"] - flat["entry_price"]) / flat["entry_price"] * sign * 100
+    flat["roe_pct"] = flat["move_pct"] * flat["leverage"].where(flat["leverage"] > 0, 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        flat["liq_distance_pct"] = np.where(
+            flat["liquidation_price"] > 0,
+            (flat["mark_price"] - flat["liquidation_price"]).abs() / flat["mark_price"] * 100,
+            np.nan,
+        )
+    return flat
+
+
+def position_episodes(positions: pd.DataFrame, max_gap: pd.Timedelta = DEFAULT_MAX_GAP) -> pd.DataFrame:
+    """One row per holding episode with lifecycle, MAE/MFE, giveback and time to peak."""
+    flat = label_episodes(positions, max_gap)
+    if flat.empty:
+        return pd.DataFrame()
+
+    grouped = flat.groupby("episode", sort=True)
+    episodes = grouped.agg(
+        symbol=("symbol", "first"),
+        side=("side", "first"),
+        opened=("timestamp", "first"),
+        last_seen=("timestamp", "last"),
+        cycles=("timestamp", "size"),
+        entry_price=("entry_price", "first"),
+        leverage=("leverage", "last"),
+        position_amt=("position_amt", "last"),
+        mae_pct=("move_pct", "min"),
+        mfe_pct=("move_pct", "max"),
+        final_pct=("move_pct", "last"),
+        mae_usdt=("unrealized_profit", "min"),
+        mfe_usdt=("unrealized_profit", "max"),
+        final_usdt=("unrealized_profit", "last"),
+        min_liq_distance_pct=("liq_distance_pct", "min"),
+    )
+    # Excursions are measured from entry, so a trade that never went against
+    # (or for) the position has MAE (or MFE) of zero rather than its best/worst mark.
+    episodes["mae_pct"] = episodes["mae_pct"].clip(upper=0.0)
+    episodes["mfe_pct"] = episodes["mfe_pct"].clip(lower=0.0)
+    episodes["giveback_pct"] = episodes["mfe_pct"] - episodes["final_pct"]
+    episodes["held_minutes"] = (episodes["last_seen"] - episodes["opened"]).dt.total_seconds() / 60
+
+    peak_rows = flat.loc[grouped["move_pct"].idxmax(), ["episode", "timestamp"]].set_index("episode")["timestamp"]
+    trough_rows = flat.loc[grouped["move_pct"].idxmin(), ["episode", "timestamp"]].set_index("episode")["timestamp"]
+    episodes["minutes_to_mfe"] = (peak_rows - episodes["opened"]).dt.total_seconds() / 60
+    episodes["minutes_to_mae"] = (trough_rows - episodes["opened"]).dt.total_seconds() / 60
+    return episodes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Position lifecycles with MAE/MFE from decision_logs positions.")
+    parser.add_argument("--trader", required=True, help="Trader id under decision_logs/.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--max-gap", default="13min", help="Gap that ends a holding episode (default 13min).")
+    parser.add_argument("--csv", default=None, help="Also write the episode table to this CSV.")
+    args = parser.parse_args()
+
+    positions = load_tables(trader_dir(args.trader, args.root))["positions"]
+    episodes = position_episodes(positions, pd.Timedelta(args.max_gap))
+    print("=" * 80)
+    print(f"📦 持仓生命周期: {args.trader} ({len(positions)} 条持仓快照, {len(episodes)} 段持仓)")
+    print("=" * 80)
+    if episodes.empty:
+        print("⏳ 没有持仓快照")
+        return
+
+    pd.set_option("display.width", 200)
+    summary = episodes.groupby(["symbol", "side"]).agg(
+        episodes=("cycles", "size"),
+        avg_held_minutes=("held_minutes", "mean"),
+        avg_mae_pct=("mae_pct", "mean"),
+        avg_mfe_pct=("mfe_pct", "mean"),
+        avg_final_pct=("final_pct", "mean"),
+        avg_giveback_pct=("giveback_pct", "mean"),
+        final_usdt=("final_usdt", "sum"),
+    )
+    print("\n📊 按币种/方向汇总:")
+    print(summary.round(3).to_string())
+
+    print("\n💸 回吐最多的持仓 (MFE - 最终):")
+    columns = ["symbol", "side", "opened", "held_minutes", "mae_pct", "mfe_pct", "final_pct", "giveback_pct"]
+    print(episodes.nlargest(10, "giveback_pct")[columns].to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    if args.csv:
+        episodes.to_csv(args.csv)
+        print(f"\n💾 已写入 {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Batch evaluator for the Go prediction tracker's ``prediction_logs``.
+
+All prediction files are loaded into one table, grouped by symbol, and each
+symbol's kline range is pulled from :class:`analytics.klines.KlineCache`
+once. Actual move, high, low, correctness and accuracy for every matured
+prediction are then computed with array operations, using the same rules as
+``PredictionTracker.evaluateRecord`` in ``decision/tracker``.
+
+Usage::
+
+    python -m analytics.predictions --write-back
+    python -m analytics.predictions --offline --side-table prediction_evaluations.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .klines import KlineCache, RangeExtrema
+from .timeutil import parse_timestamps, to_epoch_ms
+
+PREDICTION_COLUMNS = [
+    "id",
+    "path",
+    "symbol",
+    "timestamp",
+    "target_time",
+    "direction",
+    "probability",
+    "expected_move",
+    "timeframe",
+    "confidence",
+    "risk_level",
+    "entry_price",
+    "evaluated",
+    "actual_move",
+    "actual_high",
+    "actual_low",
+    "is_correct",
+    "accuracy",
+]
+
+RESULT_COLUMNS = ["actual_move", "actual_high", "actual_low", "is_correct", "accuracy"]
+
+# Same tolerance as the Go tracker: neutral is correct when |move| < 1%.
+NEUTRAL_BAND_PCT = 1.0
+
+
+def load_predictions(pred_dir: str | Path = "prediction_logs") -> pd.DataFrame:
+    """Load every prediction record into a flat table (one row per file)."""
+    rows = []
+    for path in sorted(Path(pred_dir).glob("*.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                record = json.load(fh)
+        except (OSError, ValueError) as exc:
+            print(f"⚠️  读取失败 {path.name}: {exc}")
+            continue
+        prediction = record.get("prediction") or {}
+        rows.append(
+            {
+                "id": record.get("id", path.stem),
+                "path": str(path),
+                "symbol": record.get("symbol") or prediction.get("symbol", ""),
+                "timestamp": record.get("timestamp"),
+                "target_time": record.get("target_time"),
+                "direction": prediction.get("direction", ""),
+                "probability": prediction.get("probability"),
+                "expected_move": prediction.get("expected_move"),
+                "timeframe": prediction.get("timeframe", ""),
+                "confidence": prediction.get("confidence", ""),
+                "risk_level": prediction.get("risk_level", ""),
+                "entry_price": record.get("entry_price"),
+                "evaluated": bool(record.get("evaluated", False)),
+                "actual_move": record.get("actual_move", 0.0),
+                "actual_high": record.get("actual_high", 0.0),
+                "actual_low": record.get("actual_low", 0.0),
+                "is_correct": bool(record.get("is_correct", False)),
+                "accuracy": record.get("accuracy", 0.0),
+            }
+        )
+
+    df = pd.DataFrame(rows, columns=PREDICTION_COLUMNS)
+    df["timestamp"] = parse_timestamps(df["timestamp"])
+    df["target_time"] = parse_timestamps(df["target_time"])
+    for column in ("probability", "expected_move", "entry_price", *RESULT_COLUMNS[:3], "accuracy"):
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+    return df
+
+
+def score_predictions(direction, expected_move, actual_move) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorised ``is_correct`` and ``accuracy`` exactly as the Go tracker defines them."""
+    direction = np.asarray(direction, dtype=object)
+    expected_move = np.asarray(expected_move, dtype=float)
+    actual_move = np.asarray(actual_move, dtype=float)
+
+    is_correct = (
+        ((direction == "up") & (actual_move > 0))
+        | ((direction == "down") & (actual_move < 0))
+        | ((direction == "neutral") & (np.abs(actual_move) < NEUTRAL_BAND_PCT))
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deviation = np.abs(expected_move - actual_move) / np.abs(expected_move)
+    accuracy = np.where(expected_move != 0, 1.0 - np.minimum(deviation, 1.0), 0.5)
+    return is_correct, accuracy
+
+
+def evaluate_predictions(
+    df: pd.DataFrame,
+    cache: KlineCache,
+    now: pd.Timestamp | None = None,
+    reevaluate: bool = False,
+) -> pd.DataFrame:
+    """Evaluate every matured prediction and return those rows with results filled in.
+
+    A prediction is matured once ``target_time`` has passed. Rows whose kline
+    coverage does not reach the target time are left out rather than scored
+    on partial data.
+    """
+    now = now if now is not None else pd.Timestamp.now(tz="UTC")
+    pending = df["target_time"].notna() & (df["target_time"] <= now) & (df["entry_price"] > 0)
+    if not reevaluate:
+        pending &= ~df["evaluated"]
+    todo = df[pending]
+
+    evaluated = []
+    for symbol, group in todo.groupby("symbol", sort=False):
+        start_ms = to_epoch_ms(group["timestamp"]).to_numpy()
+        end_ms = to_epoch_ms(group["target_time"]).to_numpy()
+        klines = cache.ensure_range(symbol, int(start_ms.min()) - cache.interval_ms, int(end_ms.max()))
+        if len(klines) == 0:
+            continue
+
+        open_times = klines["open_time"]
+        # Same window as the Go tracker: candles that close after the
+        # prediction was made and open no later than the target time.
+        lo = np.searchsorted(open_times, start_ms - cache.interval_ms, side="right")
+        hi = np.searchsorted(open_times, end_ms, side="right")
+        covered = (hi > lo) & (hi > 0)
+        covered[covered] &= open_times[hi[covered] - 1] >= end_ms[covered] - cache.interval_ms
+        if not covered.any():
+            continue
+
+        lo, hi = lo[covered], hi[covered]
+        high, low = RangeExtrema(klines["high"], klines["low"]).query(lo, hi)
+        final_price = klines["close"][hi - 1]
+
+        rows = group[covered].copy()
+        entry = rows["entry_price"].to_numpy(dtype=float)
+        rows["actual_move"] = (final_price - entry) / entry * 100
+        rows["actual_high"] = high
+        rows["actual_low"] = low
+        rows["is_correct"], rows["accuracy"] = score_predictions(
+            rows["direction"], rows["expected_move"], rows["actual_move"]
+        )
+        rows["evaluated"] = True
+        evaluated.append(rows)
+
+    if not evaluated:
+        return df.iloc[0:0].copy()
+    return pd.concat(evaluated).sort_values("timestamp")
+
+
+def write_back(results: pd.DataFrame) -> int:
+    """Store results in the original prediction files, as the Go tracker would."""
+    evaluated_time = datetime.now(timezone.utc).astimezone().isoformat()
+    written = 0
+    for row in results.itertuples(index=False):
+        path = Path(row.path)
+        with open(path, "r", encoding="utf-8") as fh:
+            record = json.load(fh)
+        record.update(
+            {
+                "evaluated": True,
+                "actual_move": float(row.actual_move),
+                "actual_high": float(row.actual_high),
+                "actual_low": float(row.actual_low),
+                "is_correct": bool(row.is_correct),
+                "accuracy": float(row.accuracy),
+                "evaluated_time": evaluated_time,
+            }
+        )
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(record, fh, ensure_ascii=False, indent=2)
+        tmp_path.replace(path)
+        written += 1
+    return written
+
+
+def save_side_table(results: pd.DataFrame, path: str | Path) -> None:
+    """Merge ``results`` into a CSV side table keyed by prediction id."""
+    path = Path(path)
+    columns = ["id", "symbol", "timestamp", "target_time", "direction", "probability",
+               "expected_move", "timeframe", "confidence", "entry_price", *RESULT_COLUMNS]
+    table = results[columns]
+    if path.exists():
+        previous = pd.read_csv(path)
+        previous = previous[~previous["id"].isin(table["id"])]
+        table = pd.concat([previous, table], ignore_index=True)
+    table.to_csv(path, index=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Evaluate matured predictions in prediction_logs.")
+    parser.add_argument("--dir", default="prediction_logs", help="Prediction log directory.")
+    parser.add_argument("--cache-dir", default="kline_cache", help="Kline cache directory.")
+    parser.add_argument("--interval", default="1m", help="Kline interval used for evaluation (default 1m).")
+    parser.add_argument("--offline", action="store_true", help="Use cached klines only, never download.")
+    parser.add_argument("--reevaluate", action="store_true", help="Also re-score already evaluated predictions.")
+    parser.add_argument("--write-back", action="store_true", help="Update the prediction JSON files in place.")
+    parser.add_argument("--side-table", default=None, help="Write/merge results into this CSV instead.")
+    args = parser.parse_args()
+
+    df = load_predictions(args.dir)
+    print(f"📂 已加载 {len(df)} 条预测 ({int(df['evaluated'].sum())} 条已评估)")
+
+    cache = KlineCache(args.cache_dir, interval=args.interval, offline=args.offline)
+    results = evaluate_predictions(df, cache, reevaluate=args.reevaluate)
+    print(f"✅ 本次评估 {len(results)} 条到期预测")
+    if results.empty:
+        return
+
+    hit_rate = results["is_correct"].mean() * 100
+    print(f"🎯 方向准确率: {hit_rate:.1f}% | 平均准确度: {results['accuracy'].mean():.3f}")
+    for symbol, group in results.groupby("symbol"):
+        print(f"  {symbol:10s} n={len(group):4d}  准确率 {group['is_correct'].mean() * 100:5.1f}%"
+              f"  平均实际涨跌 {group['actual_move'].mean():+.2f}%")
+
+    if args.write_back:
+        print(f"💾 已写回 {write_back(results)} 个预测文件")
+    if args.side_table:
+        save_side_table(results, args.side_table)
+        print(f"💾 结果已写入 {args.side_table}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+"""Event-driven account replay of logged decisions over cached klines.
+
+``analyze_what_if_hold.py`` and ``analyze_filter_with_data.py`` answer
+"what if" questions with one-off price lookups. This module re-runs the
+whole account instead: every logged open/close decision is fed, in time
+order, into a simulated isolated-margin futures account that fills at the
+next 1m bar's open (plus slippage), pays taker fees and funding, and exits
+positions on stop-loss, take-profit, trailing stop, time stop or
+liquidation when the bars say so.
+
+It is event driven: cycles without an open/close cost nothing, and when a
+position opens its first exit trigger is located with one vectorised scan
+over the following bars and pushed onto an event heap. Decisions and
+triggers are then processed in time order, so a replay handles tens of
+thousands of cycles per second. Variants (sizing, fees, stop rules, minimum
+hold, ignoring the AI's closes) are fields of :class:`ReplayConfig`.
+
+Usage::
+
+    python -m analytics.replay --trader binance_live_qwen
+    python -m analytics.replay --trader binance_live_qwen --size-mult 0.5 --trail-pct 1.0 --min-hold 30
+    python -m analytics.replay --trader binance_live_qwen --ignore-closes --stop-loss-pct 2 --take-profit-pct 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .decision_logs import DEFAULT_ROOT, iter_records, load_tables, trader_dir
+from .klines import KlineCache
+from .timeutil import parse_timestamps, to_epoch_ms
+from .trades import TRADE_COLUMNS, max_drawdown_pct, round_trips, trade_summary
+
+BAR_MS = 60_000
+FUNDING_INTERVAL_MS = 8 * 3600 * 1000
+# Bars scanned per step when searching for an exit trigger (doubles each step).
+SCAN_BARS = 1024
+# Klines loaded past the last decision, so positions still open can exit.
+DEFAULT_HORIZON = pd.Timedelta(days=1)
+
+DECISION_COLUMNS = [
+    "timestamp",
+    "cycle_number",
+    "symbol",
+    "action",
+    "leverage",
+    "notional",
+    "stop_loss",
+    "take_profit",
+    "executed",
+]
+REPLAY_TRADE_COLUMNS = TRADE_COLUMNS + ["fees", "funding", "exit_reason"]
+
+
+@dataclass
+class ReplayConfig:
+    initial_balance: float = 1000.0
+    taker_fee: float = 0.0004
+    slippage_bp: float = 2.0
+    funding_rate: float = 0.0001  # per 8h; longs pay shorts when positive
+    maintenance_margin: float = 0.004
+    size_mult: float = 1.0
+    max_leverage: int | None = None
+    executed_only: bool = True  # only decisions that executed live
+    follow_closes: bool = True  # apply the AI's close decisions
+    use_ai_stops: bool = True  # AI stop_loss / take_profit prices
+    stop_loss_pct: float | None = None  # overrides the AI stop, % from entry
+    take_profit_pct: float | None = None
+    trailing_stop_pct: float | None = None
+    time_stop_minutes: float | None = None
+    min_hold_minutes: float = 0.0  # AI closes earlier than this are ignored
+
+
+@dataclass
+class Bars:
+    """1m bars of one symbol as flat arrays (open time in epoch ms)."""
+
+    times: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+    @classmethod
+    def from_klines(cls, klines: np.ndarray) -> "Bars":
+        return cls(
+            klines["open_time"].astype(np.int64),
+            klines["open"].astype(float),
+            klines["high"].astype(float),
+            klines["low"].astype(float),
+            klines["close"].astype(float),
+        )
+
+
+@dataclass
+class _Position:
+    id: int
+    symbol: str
+    side: str
+    quantity: float
+    entry_price: float
+    entry_ms: int
+    leverage: int
+    margin: float
+    fees: float
+    min_close_ms: int
+
+
+@dataclass
+class ReplayResult:
+    trades: pd.DataFrame
+    balance: pd.Series
+    rejected: Dict[str, int] = field(default_factory=dict)
+    config: ReplayConfig = field(default_factory=ReplayConfig)
+
+    def summary(self) -> Dict[str, Any]:
+        summary = trade_summary(self.trades)
+        final = float(self.balance.iloc[-1]) if len(self.balance) else self.config.initial_balance
+        summary.update(
+            final_balance=final,
+            return_pct=(final / self.config.initial_balance - 1) * 100,
+            max_drawdown_pct=max_drawdown_pct(self.balance.to_numpy()),
+            fees=float(self.trades["fees"].sum()) if len(self.trades) else 0.0,
+            funding=float(self.trades["funding"].sum()) if len(self.trades) else 0.0,
+            rejected=int(sum(self.rejected.values())),
+        )
+        return summary
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def load_decisions(directory: str, since: str | None = None) -> pd.DataFrame:
+    """Open/close decisions with the AI's size, leverage and stops, and whether each executed live.
+
+    Intents come from ``decision_json`` (which carries ``position_size_usd``,
+    ``stop_loss`` and ``take_profit``); cycles without it fall back to the
+    executed actions, sized as ``quantity * price``.
+    """
+    rows: List[tuple] = []
+    cycles = 0
+    for record in iter_records(directory, since=since):
+        cycles += 1
+        logged_at = record.get("timestamp")
+        cycle = record.get("cycle_number", 0)
+        actions = {}
+        for action in record.get("decisions") or []:
+            key = (action.get("symbol"), action.get("action"))
+            actions[key] = action
+        try:
+            intents = json.loads(record.get("decision_json") or "null")
+        except ValueError:
+            intents = None
+        if not isinstance(intents, list) or not intents:
+            intents = list(actions.values())
+
+        for intent in intents:
+            if not isinstance(intent, dict):
+                continue
+            name = intent.get("action", "")
+            if not name.startswith(("open_", "close_")):
+                continue
+            symbol = intent.get("symbol", "")
+            executed = actions.get((symbol, name))
+            stamp = (executed or {}).get("timestamp") or ""
+            if not stamp or stamp.startswith("0001-"):
+                stamp = logged_at
+            notional = _float(intent.get("position_size_usd"))
+            if not notional and executed:
+                notional = _float(executed.get("quantity")) * _float(executed.get("price"))
+            rows.append((
+                stamp,
+                cycle,
+                symbol,
+                name,
+                int(_float(intent.get("leverage") or (executed or {}).get("leverage")) or 1),
+                notional,
+                _float(intent.get("stop_loss")),
+                _float(intent.get("take_profit")),
+                bool(executed and executed.get("success")),
+            ))
+
+    decisions = pd.DataFrame(rows, columns=DECISION_COLUMNS)
+    decisions["timestamp"] = parse_timestamps(decisions["timestamp"])
+    decisions = decisions.dropna(subset=["timestamp"]).sort_values("timestamp", kind="stable")
+    decisions.attrs["cycles"] = cycles
+    return decisions.reset_index(drop=True)
+
+
+def load_market(cache: KlineCache, decisions: pd.DataFrame, horizon: pd.Timedelta = DEFAULT_HORIZON) -> Dict[str, Bars]:
+    """Bars per symbol from the first decision on that symbol until ``horizon`` after the last decision."""
+    market = {}
+    if decisions.empty:
+        return market
+    end = int(to_epoch_ms(pd.Series([decisions["timestamp"].max() + horizon])).iloc[0])
+    for symbol, group in decisions.groupby("symbol"):
+        start = int(to_epoch_ms(group["timestamp"]).min())
+        klines = cache.get_range(symbol, start, end)
+        if len(klines):
+            market[symbol] = Bars.from_klines(klines)
+    return market
+
+
+class Replay:
+    """Simulated isolated-margin account driven by decisions and bar-level exit triggers."""
+
+    def __init__(self, market: Dict[str, Bars], config: ReplayConfig | None = None):
+        self.market = market
+        self.config = config or ReplayConfig()
+
+    # -- exit triggers -----------------------------------------------------
+
+    def _stop_levels(self, side: str, entry: float, leverage: int, stop_loss: float, take_profit: float):
+        cfg = self.config
+        sign = 1.0 if side == "long" else -1.0
+        liquidation = entry * (1 - sign * (1.0 / leverage - cfg.maintenance_margin))
+        stop = take = np.nan
+        if cfg.stop_loss_pct is not None:
+            stop = entry * (1 - sign * cfg.stop_loss_pct / 100)
+        elif cfg.use_ai_stops and stop_loss > 0:
+            stop = stop_loss
+        if cfg.take_profit_pct is not None:
+            take = entry * (1 + sign * cfg.take_profit_pct / 100)
+        elif cfg.use_ai_stops and take_profit > 0:
+            take = take_profit
+        return liquidation, stop, take
+
+    def _first_exit(self, bars: Bars, start: int, side: str, entry: float, liquidation: float,
+                    stop: float, take: float, entry_ms: int):
+        """``(bar, price, reason)`` of the first trigger at or after bar ``start``, or ``None``."""
+        cfg = self.config
+        # Shorts are handled as longs on negated prices.
+        sign = 1.0 if side == "long" else -1.0
+        liq, stop, take = sign * liquidation, sign * stop, sign * take
+        hard_stop = np.nanmax([liq, stop])
+        stop_reason = "liquidation" if not stop >= liq else "stop_loss"
+        trail = cfg.trailing_stop_pct / 100 if cfg.trailing_stop_pct else None
+        time_bar = len(bars.times)
+        if cfg.time_stop_minutes is not None:
+            time_bar = int(np.searchsorted(bars.times, entry_ms + cfg.time_stop_minutes * 60_000, side="left"))
+        peak = sign * entry
+
+        lo, step = start, SCAN_BARS
+        while lo < min(time_bar, len(bars.times)):
+            hi = min(lo + step, time_bar, len(bars.times))
+            if sign > 0:
+                opens, highs, lows = bars.open[lo:hi], bars.high[lo:hi], bars.low[lo:hi]
+            else:
+                opens, highs, lows = -bars.open[lo:hi], -bars.low[lo:hi], -bars.high[lo:hi]
+            level = np.full(hi - lo, hard_stop)
+            if trail is not None:
+                # Best price up to the previous bar: a bar's own high cannot trail its low.
+                peaks = np.maximum.accumulate(np.concatenate([[peak], highs]))[:-1]
+                level = np.maximum(level, peaks * (1 - trail) if sign > 0 else peaks * (1 + trail))
+                peak = max(peak, highs.max())
+            hit_stop = lows <= level
+            hit = hit_stop | (highs >= take) if take == take else hit_stop
+            if hit.any():
+                i = int(np.argmax(hit))
+                bar = lo + i
+                if hit_stop[i]:
+                    if level[i] > hard_stop:
+                        return bar, sign * min(opens[i], level[i]), "trailing_stop"
+                    if stop_reason == "liquidation":
+                        return bar, liquidation, "liquidation"
+                    return bar, sign * min(opens[i], hard_stop), "stop_loss"
+                return bar, sign * max(opens[i], take), "take_profit"
+            lo, step = hi, step * 2
+        if time_bar < len(bars.times):
+            return time_bar, float(bars.open[time_bar]), "time_stop"
+        return None
+
+    # -- account -----------------------------------------------------------
+
+    def _funding(self, bars: Bars, pos: _Position, exit_ms: int) -> float:
+        cfg = self.config
+        if not cfg.funding_rate:
+            return 0.0
+        first = (pos.entry_ms // FUNDING_INTERVAL_MS + 1) * FUNDING_INTERVAL_MS
+        if first > exit_ms:
+            return 0.0
+        times = np.arange(first, exit_ms + 1, FUNDING_INTERVAL_MS)
+        idx = np.clip(np.searchsorted(bars.times, times, side="right") - 1, 0, len(bars.close) - 1)
+        sign = 1.0 if pos.side == "long" else -1.0
+        return float((pos.quantity * bars.close[idx]).sum() * cfg.funding_rate * sign)
+
+    def run(self, decisions: pd.DataFrame) -> ReplayResult:
+        cfg = self.config
+        slip = cfg.slippage_bp / 1e4
+        cash = cfg.initial_balance
+        used_margin = 0.0
+        positions: Dict[tuple, _Position] = {}
+        triggers: List[tuple] = []  # (bar open ms, position id, exit ms, price, reason)
+        trades: List[tuple] = []
+        balance_times: List[int] = []
+        balance: List[float] = []
+        rejected: Counter = Counter()
+        next_id = 0
+
+        def close(pos: _Position, exit_ms: int, price: float, reason: str) -> None:
+            nonlocal cash, used_margin
+            bars = self.market[pos.symbol]
+            sign = 1.0 if pos.side == "long" else -1.0
+            if reason == "liquidation":
+                pnl, fee = -pos.margin, 0.0
+            else:
+                if reason != "take_profit":
+                    price *= 1 - sign * slip
+                pnl = (price - pos.entry_price) * pos.quantity * sign
+                fee = price * pos.quantity * cfg.taker_fee
+            funding = self._funding(bars, pos, exit_ms)
+            net = pnl - fee - funding
+            cash += net
+            used_margin -= pos.margin
+            del positions[(pos.symbol, pos.side)]
+            trades.append((pos.symbol, pos.side, pos.entry_ms, exit_ms, pos.entry_price, price, pos.quantity,
+                           pos.leverage, net - pos.fees, (exit_ms - pos.entry_ms) / 60_000,
+                           pos.fees + fee, funding, reason, pos.margin))
+            balance_times.append(exit_ms)
+            balance.append(cash)
+
+        def settle(fill_ms: int) -> None:
+            # Triggers in bars that open before the fill bar happened first; one inside the
+            # fill bar comes after a fill at that bar's open.
+            while triggers and triggers[0][0] < fill_ms:
+                _, pos_id, at_ms, price, reason = heapq.heappop(triggers)
+                for pos in positions.values():
+                    if pos.id == pos_id:
+                        close(pos, at_ms, price, reason)
+                        break
+
+        rows = decisions
+        if cfg.executed_only:
+            rows = rows[rows["executed"]]
+        times_ms = to_epoch_ms(rows["timestamp"]).to_numpy()
+        for t_ms, symbol, action, leverage, notional, stop_loss, take_profit in zip(
+            times_ms.tolist(), rows["symbol"], rows["action"], rows["leverage"], rows["notional"],
+            rows["stop_loss"], rows["take_profit"],
+        ):
+            bars = self.market.get(symbol)
+            bar = int(np.searchsorted(bars.times, t_ms, side="left")) if bars is not None else 0
+            if bars is None or bar >= len(bars.times):
+                settle(t_ms)
+                rejected["no_price"] += 1
+                continue
+            settle(int(bars.times[bar]))
+            kind, side = action.split("_", 1)
+            key = (symbol, side)
+            sign = 1.0 if side == "long" else -1.0
+
+            if kind == "close":
+                pos = positions.get(key)
+                if pos is None:
+                    rejected["no_position"] += 1
+                elif not cfg.follow_closes:
+                    rejected["close_ignored"] += 1
+                elif t_ms < pos.min_close_ms:
+                    rejected["min_hold"] += 1
+                else:
+                    close(pos, int(bars.times[bar]), float(bars.open[bar]), "decision")
+                continue
+
+            if key in positions:
+                rejected["duplicate"] += 1
+                continue
+            lev = max(1, min(int(leverage), cfg.max_leverage) if cfg.max_leverage else int(leverage))
+            size = notional * cfg.size_mult
+            entry = float(bars.open[bar]) * (1 + sign * slip)
+            margin = size / lev
+            fee = size * cfg.taker_fee
+            if size <= 0 or margin + fee > cash - used_margin:
+                rejected["insufficient_margin" if size > 0 else "no_size"] += 1
+                continue
+            cash -= fee
+            used_margin += margin
+            entry_ms = int(bars.times[bar])
+            pos = _Position(next_id, symbol, side, size / entry, entry, entry_ms, lev, margin, fee,
+                            entry_ms + int(cfg.min_hold_minutes * 60_000))
+            next_id += 1
+            positions[key] = pos
+            liquidation, stop, take = self._stop_levels(side, entry, lev, stop_loss, take_profit)
+            exit_ = self._first_exit(bars, bar, side, entry, liquidation, stop, take, entry_ms)
+            if exit_ is not None:
+                exit_bar, price, reason = exit_
+                # A trigger inside the bar resolves at that bar's close time.
+                at_ms = int(bars.times[exit_bar]) + (0 if reason == "time_stop" else BAR_MS - 1)
+                heapq.heappush(triggers, (int(bars.times[exit_bar]), pos.id, at_ms, price, reason))
+
+        settle(np.iinfo(np.int64).max)
+        for pos in list(positions.values()):
+            bars = self.market[pos.symbol]
+            close(pos, int(bars.times[-1]), float(bars.close[-1]), "end_of_data")
+
+        trade_table = pd.DataFrame(trades, columns=TRADE_COLUMNS[:8] + ["pnl", "holding_minutes", "fees", "funding",
+                                                                    "exit_reason", "margin"])
+        for column in ("entry_time", "exit_time"):
+            trade_table[column] = pd.to_datetime(trade_table[column], unit="ms", utc=True)
+        trade_table["pnl_pct"] = trade_table["pnl"] / trade_table["margin"] * 100
+        trade_table = trade_table[REPLAY_TRADE_COLUMNS].sort_values("exit_time", kind="stable").reset_index(drop=True)
+        series = pd.Series(
+            [cfg.initial_balance] + balance,
+            index=pd.to_datetime([times_ms[0] if len(times_ms) else 0] + balance_times, unit="ms", utc=True),
+            name="balance",
+        ).sort_index(kind="stable")
+        return ReplayResult(trade_table, series, dict(rejected), cfg)
+
+
+def replay(decisions: pd.DataFrame, market: Dict[str, Bars], config: ReplayConfig | None = None) -> ReplayResult:
+    return Replay(market, config).run(decisions)
+
+
+def config_from_args(args: argparse.Namespace) -> ReplayConfig:
+    names = {f.name for f in fields(ReplayConfig)}
+    return ReplayConfig(**{name: value for name, value in vars(args).items() if name in names and value is not None})
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--initial-balance", dest="initial_balance", type=float, help="Starting balance (default 1000).")
+    parser.add_argument("--fee", dest="taker_fee", type=float, help="Taker fee rate (default 0.0004).")
+    parser.add_argument("--slippage-bp", dest="slippage_bp", type=float, help="Market-fill slippage (default 2bp).")
+    parser.add_argument("--funding-rate", dest="funding_rate", type=float, help="Funding per 8h (default 0.0001).")
+    parser.add_argument("--size-mult", dest="size_mult", type=float, help="Scale every position size.")
+    parser.add_argument("--max-leverage", dest="max_leverage", type=int, help="Cap leverage.")
+    parser.add_argument("--all-intents", dest="executed_only", action="store_false", default=None,
+                        help="Also replay decisions that failed or were rejected live.")
+    parser.add_argument("--ignore-closes", dest="follow_closes", action="store_false", default=None,
+                        help="Ignore the AI's close decisions (exits come from stops only).")
+    parser.add_argument("--no-ai-stops", dest="use_ai_stops", action="store_false", default=None,
+                        help="Ignore the AI's stop_loss/take_profit prices.")
+    parser.add_argument("--stop-loss-pct", dest="stop_loss_pct", type=float, help="Fixed stop, %% from entry.")
+    parser.add_argument("--take-profit-pct", dest="take_profit_pct", type=float, help="Fixed target, %% from entry.")
+    parser.add_argument("--trail-pct", dest="trailing_stop_pct", type=float, help="Trailing stop, %% below the best price.")
+    parser.add_argument("--time-stop", dest="time_stop_minutes", type=float, help="Close after this many minutes.")
+    parser.add_argument("--min-hold", dest="min_hold_minutes", type=float, help="Ignore AI closes before this many minutes.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay logged decisions through a simulated futures account.")
+    parser.add_argument("--trader", required=True, help="Trader id under decision_logs/.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--since", default=None, help="Only files from YYYYMMDD_HHMMSS on.")
+    parser.add_argument("--cache-dir", default="kline_cache", help="Kline cache directory.")
+    parser.add_argument("--offline", action="store_true", help="Use cached klines only, never download.")
+    parser.add_argument("--csv", default=None, help="Also write the replayed trades to this CSV.")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    directory = str(trader_dir(args.trader, args.root))
+    decisions = load_decisions(directory, since=args.since)
+    cache = KlineCache(args.cache_dir, interval="1m", offline=args.offline)
+    market = load_market(cache, decisions)
+    config = config_from_args(args)
+
+    started = time.perf_counter()
+    result = replay(decisions, market, config)
+    elapsed = time.perf_counter() - started
+    cycles = decisions.attrs.get("cycles", 0)
+    print("=" * 80)
+    print(f"🔁 账户回放: {args.trader} ({cycles} 个周期, {len(decisions)} 条开平仓决策, "
+          f"{elapsed * 1000:.0f}ms, {cycles / max(elapsed, 1e-9):,.0f} 周期/秒)")
+    print("=" * 80)
+    if result.trades.empty:
+        print("⏳ 回放没有产生交易")
+        return
+
+    pd.set_option("display.width", 200)
+    summary = result.summary()
+    live = trade_summary(round_trips(load_tables(directory, since=args.since)["actions"]))
+    print("\n📊 回放 vs 实盘:")
+    rows = {key: [summary.get(key), live.get(key)] for key in summary}
+    print(pd.DataFrame(rows, index=["replay", "live"]).T.to_string(float_format=lambda v: f"{v:.3f}"))
+    print("\n🚪 退出方式:")
+    print(result.trades.groupby("exit_reason")["pnl"].agg(["size", "sum", "mean"]).round(3).to_string())
+    if result.rejected:
+        print("\n⛔ 未执行的决策: " + ", ".join(f"{k}={v}" for k, v in sorted(result.rejected.items())))
+
+    if args.csv:
+        result.trades.to_csv(args.csv, index=False)
+        print(f"\n💾 已写入 {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""Single-ingest report runner with a plugin registry.
+
+The ``analyze_*.py`` scripts each re-read every decision log, so a daily
+report pack parses the same files dozens of times. Here the logs are walked
+once into a shared in-memory :class:`Dataset` (cycle/action/position tables,
+round trips, execution attempts, close reasons and, when asked for,
+evaluated predictions), and every analysis is a plugin registered with
+:func:`register`:
+
+* ``needs`` names the dataset sources it reads (``records``,
+  ``predictions``); only sources some selected plugin needs are loaded;
+* ``after`` names plugins whose outputs it receives; independent plugins run
+  concurrently on a thread pool over the same frames (plugins must not
+  mutate them);
+* it returns ``{name: DataFrame | dict | str}``, written to
+  ``<out>/<plugin>/<name>.csv|.json|.md``, with ``<out>/index.json``
+  recording status and timings.
+
+Other modules add plugins by calling :func:`register` on import; load them
+with ``--plugin package.module``.
+
+Usage::
+
+    python -m analytics.reports --trader binance_live_qwen
+    python -m analytics.reports --trader binance_live_qwen --only equity_curve,close_behavior --out reports/today
+    python -m analytics.reports --trader binance_live_qwen --pred-dir prediction_logs --workers 8
+    python -m analytics.reports --list
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .decision_logs import DEFAULT_ROOT, TableCollector, iter_records, trader_dir
+from .execution import AttemptCollector, failure_rates
+from .timeutil import parse_timestamps
+from .trades import max_drawdown_pct, round_trips, trade_summary
+
+ReportOutput = Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class Report:
+    name: str
+    func: Callable[["Dataset", Dict[str, ReportOutput]], ReportOutput]
+    needs: Tuple[str, ...] = ("records",)
+    after: Tuple[str, ...] = ()
+    description: str = ""
+
+
+REPORTS: Dict[str, Report] = {}
+
+
+def register(name: str, needs: Iterable[str] = ("records",), after: Iterable[str] = (), description: str = ""):
+    """Decorator adding ``func(data, upstream) -> {name: output}`` to :data:`REPORTS`."""
+
+    def decorator(func):
+        REPORTS[name] = Report(name, func, tuple(needs), tuple(after), description or (func.__doc__ or "").strip())
+        return func
+
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Shared dataset
+# ---------------------------------------------------------------------------
+
+CLOSE_COLUMNS = ["timestamp", "cycle_number", "symbol", "action", "success", "reasoning"]
+
+# Same categories and precedence as analyze_close_behavior.extract_reason_type; ``(?s)``
+# keeps the substring semantics when the keywords sit on different lines.
+REASON_RULES = [
+    ("止盈触发", r"止盈|take profit"),
+    ("止损触发", r"止损|stop loss"),
+    ("AI预测反转_看多", r"(?s)(?=.*ai预测)(?=.*(?:up|看多|上涨))"),
+    ("AI预测反转_看空", r"(?s)(?=.*ai预测)(?=.*(?:down|看空|下跌))"),
+    ("AI预测中性", r"(?s)(?=.*ai预测)(?=.*(?:neutral|中性))"),
+    ("AI预测其他", r"ai预测"),
+    ("自动止盈/止损", r"消失|unknown"),
+]
+
+
+def reason_type(reasoning: pd.Series) -> pd.Series:
+    """Close-reason category of each reasoning string."""
+    text = reasoning.fillna("").astype(str).str.lower()
+    conditions = [text.str.contains(pattern, regex=True) for _, pattern in REASON_RULES]
+    return pd.Series(np.select(conditions, [label for label, _ in REASON_RULES], "其他"), index=reasoning.index)
+
+
+def _close_rows(record: Dict[str, Any]) -> Iterable[tuple]:
+    # The executed action's reasoning is often empty; fall back to the AI's own.
+    try:
+        parsed = json.loads(record.get("decision_json") or "null")
+    except (TypeError, ValueError):
+        parsed = None
+    intents = {(d.get("symbol"), d.get("action")): d.get("reasoning") for d in parsed or []
+               if isinstance(d, dict)} if isinstance(parsed, list) else {}
+    for decision in record.get("decisions") or []:
+        action = decision.get("action", "")
+        if not action.startswith("close_"):
+            continue
+        timestamp = decision.get("timestamp")
+        if not timestamp or timestamp.startswith("0001-"):
+            timestamp = record.get("timestamp")
+        symbol = decision.get("symbol", "")
+        yield (timestamp, record.get("cycle_number", 0), symbol, action, bool(decision.get("success", False)),
+               decision.get("reasoning") or intents.get((symbol, action)) or "")
+
+
+class Dataset:
+    """Everything the plugins read, built from one pass over the trader's records."""
+
+    def __init__(self, trader: str, root: str = DEFAULT_ROOT, since: str | None = None,
+                 pred_dir: str = "prediction_logs"):
+        self.trader = trader
+        self.directory = trader_dir(trader, root)
+        self.since = since
+        self.pred_dir = pred_dir
+        self.records = 0
+        self.cycles = self.actions = self.positions = self.trades = pd.DataFrame()
+        self.attempts = self.closes = self.predictions = pd.DataFrame()
+
+    def ingest(self, sources: Set[str]) -> None:
+        if "records" in sources:
+            tables, attempts, closes = TableCollector(), AttemptCollector(), []
+            for record in iter_records(self.directory, since=self.since):
+                self.records += 1
+                tables.add(record)
+                attempts.add(record)
+                closes.extend(_close_rows(record))
+            frames = tables.tables()
+            self.cycles, self.actions, self.positions = frames["cycles"], frames["actions"], frames["positions"]
+            self.trades = round_trips(self.actions)
+            self.attempts = attempts.table()
+            self.closes = pd.DataFrame(closes, columns=CLOSE_COLUMNS)
+            self.closes["timestamp"] = parse_timestamps(self.closes["timestamp"])
+            self.closes["reason_type"] = reason_type(self.closes["reasoning"])
+        if "predictions" in sources:
+            from .calibration import load_evaluated
+
+            self.predictions = load_evaluated(self.pred_dir)
+
+
+# ---------------------------------------------------------------------------
+# Built-in plugins
+# ---------------------------------------------------------------------------
+
+HOLDING_BINS = [0, 15, 30, 60, 120, 240, 480, np.inf]
+
+
+@register("equity_curve", description="Account equity, drawdown and return over time.")
+def equity_curve(data: Dataset, upstream: Dict[str, ReportOutput]) -> ReportOutput:
+    curve = data.cycles[["timestamp", "cycle_number", "total_balance"]].dropna().sort_values("timestamp")
+    curve = curve[curve["total_balance"] > 0].reset_index(drop=True)
+    if curve.empty:
+        return {"summary": {"cycles": 0}}
+    balance = curve["total_balance"].to_numpy()
+    curve["drawdown_pct"] = (1 - balance / np.maximum.accumulate(balance)) * 100
+    summary = {
+        "cycles": int(len(curve)),
+        "start": str(curve["timestamp"].iloc[0]),
+        "end": str(curve["timestamp"].iloc[-1]),
+        "start_balance": float(balance[0]),
+        "end_balance": float(balance[-1]),
+        "return_pct": float((balance[-1] / balance[0] - 1) * 100),
+        "max_drawdown_pct": max_drawdown_pct(balance),
+    }
+    return {"equity": curve, "summary": summary}
+
+
+@register("trade_summary", description="Round trips, overall and per symbol/side.")
+def trade_summary_report(data: Dataset, upstream: Dict[str, ReportOutput]) -> ReportOutput:
+    trades = data.trades
+    by_symbol = pd.DataFrame(
+        [{"symbol": symbol, "side": side, **trade_summary(group)}
+         for (symbol, side), group in trades.groupby(["symbol", "side"])]
+    )
+    return {"trades": trades, "by_symbol": by_symbol, "summary": trade_summary(trades)}
+
+
+@register("close_behavior", description="Close reasons by category with the PnL of the trades they closed.")
+def close_behavior(data: Dataset, upstream: Dict[str, ReportOutput]) -> ReportOutput:
+    closes = data.closes[data.closes["success"]]
+    trades = data.trades.assign(action="close_" + data.trades["side"].astype(str))
+    joined = closes.merge(trades[["symbol", "action", "exit_time", "pnl", "holding_minutes"]],
+                          left_on=["symbol", "action", "timestamp"], right_on=["symbol", "action", "exit_time"],
+                          how="left")
+    by_reason = joined.groupby("reason_type").agg(
+        closes=("action", "size"),
+        matched_trades=("pnl", "count"),
+        win_rate=("pnl", lambda s: float((s.dropna() > 0).mean() * 100) if s.notna().any() else np.nan),
+        total_pnl=("pnl", "sum"),
+        avg_holding_minutes=("holding_minutes", "mean"),
+    ).sort_values("closes", ascending=False)
+    return {"by_reason": by_reason.reset_index(), "closes": joined.drop(columns=["exit_time"])}
+
+
+@register("holding_duration", description="Win rate and PnL by holding-time bucket.")
+def holding_duration(data: Dataset, upstream: Dict[str, ReportOutput]) -> ReportOutput:
+    trades = data.trades
+    buckets = pd.cut(trades["holding_minutes"], HOLDING_BINS, right=False)
+    table = trades.groupby(buckets, observed=True).agg(
+        trades=("pnl", "size"),
+        win_rate=("pnl", lambda s: float((s > 0).mean() * 100)),
+        total_pnl=("pnl", "sum"),
+        avg_pnl=("pnl", "mean"),
+        avg_pnl_pct=("pnl_pct", "mean"),
+    )
+    table.index = table.index.astype(str)
+    return {"by_duration": table.rename_axis("holding_minutes").reset_index()}
+
+
+@register("execution", description="Execution failures by category and action, with latency and slippage.")
+def execution_report(data: Dataset, upstream: Dict[str, ReportOutput]) -> ReportOutput:
+    attempts = data.attempts
+    orders = attempts[attempts["source"] == "decision"]
+    return {
+        "by_category": attempts[~attempts["success"]]["category"].value_counts().rename_axis("category")
+        .reset_index(name="failures"),
+        "by_action": failure_rates(attempts, "action").reset_index() if len(orders) else pd.DataFrame(),
+    }
+
+
+@register("prediction_accuracy", needs=("predictions",),
+          description="Hit rate, calibration and per-symbol accuracy of evaluated predictions.")
+def prediction_accuracy(data: Dataset, upstream: Dict[str, ReportOutput]) -> ReportOutput:
+    from .calibration import breakdown_table, calibration_summary
+
+    predictions = data.predictions
+    if predictions.empty:
+        return {"summary": {"count": 0}}
+    summary = calibration_summary(predictions, n_boot=200)
+    reliability = summary.pop("reliability")
+    return {
+        "summary": summary,
+        "reliability": reliability,
+        "by_symbol": breakdown_table(predictions, "symbol", n_boot=200).reset_index(),
+        "by_direction": breakdown_table(predictions, "direction", n_boot=200).reset_index(),
+    }
+
+
+@register("overview", needs=(), after=("equity_curve", "trade_summary", "close_behavior", "execution"),
+          description="One-page Markdown digest of the other reports.")
+def overview(data: Dataset, upstream: Dict[str, ReportOutput]) -> ReportOutput:
+    equity = upstream.get("equity_curve", {}).get("summary", {})
+    trades = upstream.get("trade_summary", {}).get("summary", {})
+    lines = [f"# {data.trader} 日报", "", f"- 周期数: {data.records}"]
+    if equity.get("cycles"):
+        lines.append(f"- 净值: {equity['start_balance']:.2f} → {equity['end_balance']:.2f} "
+                     f"({equity['return_pct']:+.2f}%), 最大回撤 {equity['max_drawdown_pct']:.2f}%")
+    if trades.get("trades"):
+        lines.append(f"- 交易: {trades['trades']} 笔, 胜率 {trades['win_rate']:.1f}%, "
+                     f"总盈亏 {trades['total_pnl']:+.2f} USDT")
+    reasons = upstream.get("close_behavior", {}).get("by_reason")
+    if reasons is not None and len(reasons):
+        lines += ["", "## 平仓原因", ""]
+        lines += [f"- {row.reason_type}: {row.closes} 次, 盈亏 {row.total_pnl:+.2f}" for row in reasons.itertuples()]
+    failures = upstream.get("execution", {}).get("by_category")
+    if failures is not None and len(failures):
+        lines += ["", "## 执行失败", ""]
+        lines += [f"- {row.category}: {row.failures}" for row in failures.itertuples()]
+    return {"overview": "\n".join(lines) + "\n"}
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+
+def resolve(names: Iterable[str]) -> List[str]:
+    """``names`` plus everything they run after, in registry order."""
+    selected: Set[str] = set()
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name not in REPORTS:
+            raise KeyError(f"unknown report {name!r}, expected one of {sorted(REPORTS)}")
+        if name not in selected:
+            selected.add(name)
+            stack.extend(REPORTS[name].after)
+    return [name for name in REPORTS if name in selected]
+
+
+def write_output(out_dir: Path, name: str, output: ReportOutput) -> List[str]:
+    directory = out_dir / name
+    directory.mkdir(parents=True, exist_ok=True)
+    written = []
+    for key, value in output.items():
+        if isinstance(value, pd.DataFrame):
+            path = directory / f"{key}.csv"
+            value.to_csv(path, index=False)
+        elif isinstance(value, str):
+            path = directory / f"{key}.md"
+            path.write_text(value, encoding="utf-8")
+        else:
+            path = directory / f"{key}.json"
+            path.write_text(json.dumps(value, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+        written.append(str(path.relative_to(out_dir)))
+    return written
+
+
+def run_reports(data: Dataset, names: Iterable[str], out_dir: str | Path,
+                workers: int | None = None) -> Dict[str, Dict[str, Any]]:
+    """Run ``names`` (and their ``after`` dependencies) and write their outputs; returns the index."""
+    out_dir = Path(out_dir)
+    order = resolve(names)
+    outputs: Dict[str, ReportOutput] = {}
+    index: Dict[str, Dict[str, Any]] = {}
+    remaining = list(order)
+    running: Dict[Future, Tuple[str, float]] = {}
+
+    def call(report: Report, upstream: Dict[str, ReportOutput]) -> ReportOutput:
+        return report.func(data, upstream)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while remaining or running:
+            for name in list(remaining):
+                report = REPORTS[name]
+                if any(dep not in index for dep in report.after):
+                    continue
+                remaining.remove(name)
+                failed = [dep for dep in report.after if index[dep]["status"] != "ok"]
+                if failed:
+                    index[name] = {"status": "skipped", "error": f"依赖失败: {', '.join(failed)}"}
+                    continue
+                upstream = {dep: outputs[dep] for dep in report.after}
+                running[pool.submit(call, report, upstream)] = (name, time.perf_counter())
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, started = running.pop(future)
+                seconds = time.perf_counter() - started
+                try:
+                    outputs[name] = future.result()
+                    files = write_output(out_dir, name, outputs[name])
+                    index[name] = {"status": "ok", "seconds": round(seconds, 3), "files": files}
+                except Exception as exc:  # one broken plugin must not sink the pack
+                    index[name] = {"status": "error", "seconds": round(seconds, 3), "error": repr(exc)}
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / "index.json").write_text(
+        json.dumps({name: index[name] for name in order}, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    return {name: index[name] for name in order}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingest decision logs once and run the registered reports.")
+    parser.add_argument("--trader", help="Trader id under decision_logs/.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--since", default=None, help="Only files from YYYYMMDD_HHMMSS on.")
+    parser.add_argument("--pred-dir", default="prediction_logs", help="Prediction log directory.")
+    parser.add_argument("--only", default=None, help="Comma-separated reports to run (default all).")
+    parser.add_argument("--out", default=None, help="Output directory (default reports/<trader>_<YYYYMMDD>).")
+    parser.add_argument("--workers", type=int, default=None, help="Plugin threads (default: executor default).")
+    parser.add_argument("--plugin", action="append", default=[], help="Module registering extra reports.")
+    parser.add_argument("--list", action="store_true", help="List registered reports and exit.")
+    args = parser.parse_args()
+
+    for module in args.plugin:
+        importlib.import_module(module)
+    if args.list or not args.trader:
+        print("📋 已注册的报告:")
+        for report in REPORTS.values():
+            after = f" (依赖: {', '.join(report.after)})" if report.after else ""
+            print(f"  - {report.name}: {report.description}{after}")
+        if not args.list:
+            parser.error("--trader is required")
+        return
+
+    names = args.only.split(",") if args.only else list(REPORTS)
+    try:
+        order = resolve(names)
+    except KeyError as exc:
+        parser.error(str(exc.args[0]))
+    out_dir = Path(args.out or f"reports/{args.trader}_{datetime.now():%Y%m%d}")
+    print("=" * 80)
+    print(f"📑 报告生成: {args.trader} → {out_dir}")
+    print("=" * 80)
+
+    data = Dataset(args.trader, args.root, args.since, args.pred_dir)
+    started = time.perf_counter()
+    data.ingest({source for name in order for source in REPORTS[name].needs})
+    print(f"📥 一次性读取 {data.records} 条决策记录, {len(data.trades)} 笔交易, "
+          f"{len(data.predictions)} 条预测 ({time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    index = run_reports(data, order, out_dir, args.workers)
+    for name, entry in index.items():
+        if entry["status"] == "ok":
+            print(f"  ✅ {name:<20} {entry['seconds']:.2f}s  {', '.join(entry['files'])}")
+        else:
+            print(f"  ❌ {name:<20} {entry['status']}: {entry['error']}")
+    print(f"\n💾 {len(index)} 个报告, {time.perf_counter() - started:.1f}s, 索引: {out_dir / 'index.json'}")
+
+
+if __name__ == "__main__":
+    # Go through the package module so --plugin modules register into the same REPORTS.
+    importlib.import_module("analytics.reports").main()
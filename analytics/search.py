@@ -0,0 +1,349 @@
+"""Full-text search over decision-cycle reasoning (``cot_trace``) and prompts.
+
+``view_ai_reasoning.py``, ``compare_ai_reasoning.py`` and
+``analyze_open_conditions.find_open_decision`` find cycles by parsing every
+decision file and doing substring checks. This module keeps an inverted
+index per trader instead, updated incrementally from the last indexed file:
+
+* ASCII words (``solusdt``, ``rsi``, ``macd``) are single lower-cased terms;
+  pure numbers are not indexed;
+* Chinese text is split into overlapping character bigrams, so ``RSI超买``
+  becomes ``rsi``, ``超买`` and ``超买后`` becomes ``超买``, ``买后``;
+* executed decisions add filter terms, so ``symbol:SOLUSDT action:close``
+  restricts hits to cycles that closed SOLUSDT.
+
+Every query word must occur (AND); hits are ranked with BM25, CoT matches
+weighted above prompt matches. Quoted phrases (and Chinese words longer
+than one bigram) are additionally checked against the text when the top
+hits are read back for their snippets.
+
+Usage::
+
+    python -m analytics.search --trader binance_live_qwen 'symbol:SOLUSDT action:close RSI超买'
+    python -m analytics.search --trader binance_live_qwen '"市场综述" 突破' --limit 5
+    python -m analytics.search --trader binance_live_qwen --field prompt 'funding'
+    python -m analytics.search --trader binance_live_qwen --cycle 1234
+    python -m analytics.search --trader binance_live_qwen --at '2025-11-08 20:06'
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import pickle
+import re
+import shlex
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from .decision_logs import (
+    DEFAULT_ROOT,
+    find_cycle,
+    iter_new_records,
+    locate,
+    parse_filename,
+    read_record,
+    records_between,
+    trader_dir,
+)
+
+DEFAULT_INDEX_DIR = "search_index"
+FIELDS = ("cot", "prompt")
+FIELD_SOURCES = {"cot": "cot_trace", "prompt": "input_prompt"}
+FIELD_WEIGHTS = {"cot": 1.0, "prompt": 0.5}
+FILTER_KEYS = ("symbol", "action")
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_CHARS = 40
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]*[a-z][a-z0-9_]*|[一-鿿]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """ASCII words and Chinese character bigrams (a lone Chinese character stays a unigram)."""
+    tokens: List[str] = []
+    for run in _TOKEN_RE.findall(text.lower()):
+        if run[0] < "一":
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def filter_terms(record: Dict[str, Any]) -> set[str]:
+    """``symbol:``/``action:`` terms for the cycle's executed decisions."""
+    terms = set()
+    for decision in record.get("decisions") or []:
+        symbol = (decision.get("symbol") or "").lower()
+        action = (decision.get("action") or "").lower()
+        for act in {action, action.split("_", 1)[0]} - {""}:
+            terms.add(f"action:{act}")
+            if symbol:
+                terms.add(f"action:{act}@{symbol}")
+        if symbol:
+            terms.add(f"symbol:{symbol}")
+    return terms
+
+
+@dataclass
+class Postings:
+    docs: array = field(default_factory=lambda: array("I"))
+    freqs: array = field(default_factory=lambda: array("H"))
+
+
+@dataclass
+class Query:
+    terms: List[str]
+    phrases: List[str]
+    filters: List[str]
+
+    @classmethod
+    def parse(cls, text: str) -> "Query":
+        """Split a query string into words, quoted phrases and ``symbol:``/``action:`` filters."""
+        terms: List[str] = []
+        phrases: List[str] = []
+        filters: Dict[str, str] = {}
+        for part in shlex.split(text):
+            key, sep, value = part.partition(":")
+            if sep and key.lower() in FILTER_KEYS and value:
+                filters[key.lower()] = value.lower()
+                continue
+            if " " in part or (len(part) > 2 and re.search(r"[一-鿿]", part)):
+                phrases.append(part)
+            terms.extend(tokenize(part))
+        if "symbol" in filters and "action" in filters:
+            required = [f"action:{filters['action']}@{filters['symbol']}"]
+        else:
+            required = [f"{key}:{value}" for key, value in filters.items()]
+        return cls(list(dict.fromkeys(terms)), phrases, required)
+
+
+@dataclass
+class Hit:
+    cycle_number: int
+    file_key: str
+    file_name: str
+    score: float
+    snippet: str
+
+
+class SearchIndex:
+    """Inverted index of one trader's decision files, grown incrementally."""
+
+    def __init__(self) -> None:
+        self.files: List[str] = []
+        self.cycles = array("I")
+        self.lengths = {name: array("I") for name in FIELDS}
+        self.postings: Dict[str, Dict[str, Postings]] = {name: {} for name in FIELDS}
+        self.filters: Dict[str, array] = {}
+        self.last_file_key = ""
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    # -- building ----------------------------------------------------------
+
+    def add(self, file_name: str, record: Dict[str, Any]) -> None:
+        doc = len(self.files)
+        self.files.append(file_name)
+        self.cycles.append(int(record.get("cycle_number", 0) or 0))
+        for name in FIELDS:
+            counts = Counter(tokenize(record.get(FIELD_SOURCES[name]) or ""))
+            self.lengths[name].append(sum(counts.values()))
+            table = self.postings[name]
+            for term, tf in counts.items():
+                postings = table.get(term)
+                if postings is None:
+                    postings = table[term] = Postings()
+                postings.docs.append(doc)
+                postings.freqs.append(min(tf, 65535))
+        for term in filter_terms(record):
+            self.filters.setdefault(term, array("I")).append(doc)
+
+    def update(self, directory: str | Path) -> int:
+        """Index decision files newer than the last indexed one; returns how many were added."""
+        added = 0
+        for path, key, record in iter_new_records(directory, self.last_file_key):
+            self.add(path.name, record)
+            self.last_file_key = key
+            added += 1
+        return added
+
+    # -- querying ----------------------------------------------------------
+
+    def candidates(self, query: Query, fields: Iterable[str] = FIELDS) -> tuple[np.ndarray, np.ndarray]:
+        """Documents containing every query term (in any of ``fields``) and every filter, with BM25 scores."""
+        n_docs = len(self.files)
+        scores = np.zeros(n_docs, dtype=np.float64)
+        required = np.ones(n_docs, dtype=bool)
+        for term in query.filters:
+            mask = np.zeros(n_docs, dtype=bool)
+            mask[np.frombuffer(self.filters.get(term, array("I")), dtype=np.uint32)] = True
+            required &= mask
+
+        for term in query.terms:
+            present = np.zeros(n_docs, dtype=bool)
+            for name in fields:
+                postings = self.postings[name].get(term)
+                if postings is None:
+                    continue
+                docs = np.frombuffer(postings.docs, dtype=np.uint32)
+                tf = np.frombuffer(postings.freqs, dtype=np.uint16).astype(np.float64)
+                lengths = np.frombuffer(self.lengths[name], dtype=np.uint32)
+                average = max(lengths.mean(), 1.0)
+                idf = math.log(1.0 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[docs] / average)
+                scores[docs] += FIELD_WEIGHTS[name] * idf * tf * (BM25_K1 + 1) / (tf + norm)
+                present[docs] = True
+            required &= present
+
+        docs = np.flatnonzero(required)
+        # Best score first; later cycles win ties (e.g. filter-only queries).
+        order = np.lexsort((-docs, -scores[docs]))
+        return docs[order], scores[docs][order]
+
+    def search(
+        self,
+        query: Query,
+        directory: str | Path,
+        limit: int = 10,
+        fields: Iterable[str] = FIELDS,
+        max_reads: int = 500,
+    ) -> List[Hit]:
+        """Top ``limit`` hits with snippets; phrases are verified on at most ``max_reads`` candidates."""
+        fields = tuple(fields)
+        docs, scores = self.candidates(query, fields)
+        needles = [p.lower() for p in query.phrases] or [t for t in query.terms if t]
+        hits: List[Hit] = []
+        for doc, score in zip(docs[:max_reads], scores[:max_reads]):
+            file_name = self.files[doc]
+            path = locate(directory, file_name)
+            if path is None:
+                continue
+            try:
+                record = read_record(path)
+            except (OSError, ValueError):
+                continue
+            texts = [record.get(FIELD_SOURCES[name]) or "" for name in fields]
+            lowered = [text.lower() for text in texts]
+            if query.phrases and not all(any(p.lower() in text for text in lowered) for p in query.phrases):
+                continue
+            hits.append(Hit(int(self.cycles[doc]), parse_filename(file_name)[0], file_name, float(score),
+                            _snippet(texts, lowered, needles)))
+            if len(hits) >= limit:
+                break
+        return hits
+
+    # -- persistence -------------------------------------------------------
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(self, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "SearchIndex":
+        with open(path, "rb") as fh:
+            return pickle.load(fh)
+
+
+def _snippet(texts: List[str], lowered: List[str], needles: List[str]) -> str:
+    for text, low in zip(texts, lowered):
+        for needle in needles:
+            at = low.find(needle)
+            if at >= 0:
+                start = max(at - SNIPPET_CHARS, 0)
+                end = min(at + len(needle) + SNIPPET_CHARS, len(text))
+                body = " ".join(text[start:end].split())
+                return f"{'…' if start else ''}{body}{'…' if end < len(text) else ''}"
+    for text in texts:
+        if text:
+            return " ".join(text[: 2 * SNIPPET_CHARS].split()) + "…"
+    return ""
+
+
+def open_index(trader: str, root: str | Path = DEFAULT_ROOT, index_dir: str | Path = DEFAULT_INDEX_DIR,
+               update: bool = True) -> tuple[SearchIndex, int]:
+    """Load the trader's index (or start one), index new files and save; returns ``(index, added)``."""
+    path = Path(index_dir) / f"{trader}.pkl"
+    index = SearchIndex.load(path) if path.exists() else SearchIndex()
+    added = 0
+    if update:
+        added = index.update(trader_dir(trader, root))
+        if added:
+            index.save(path)
+    return index, added
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Search decision-cycle reasoning and prompts.")
+    parser.add_argument("query", nargs="?", default="", help='Words, "quoted phrases", symbol:X, action:Y.')
+    parser.add_argument("--trader", required=True, help="Trader id under decision_logs/.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR, help="Where indexes are kept (default search_index).")
+    parser.add_argument("--field", choices=("all",) + FIELDS, default="all", help="Search cot, prompt or both.")
+    parser.add_argument("--limit", type=int, default=10, help="How many hits to show (default 10).")
+    parser.add_argument("--no-update", action="store_true", help="Query the existing index without indexing new files.")
+    parser.add_argument("--cycle", type=int, default=None, help="Print the reasoning of this cycle number.")
+    parser.add_argument("--at", default=None, help="Print the reasoning of cycles within --window of this UTC time.")
+    parser.add_argument("--window", type=float, default=3.0, help="Minutes either side of --at (default 3).")
+    args = parser.parse_args()
+
+    if args.cycle is not None or args.at:
+        directory = trader_dir(args.trader, args.root)
+        started = time.perf_counter()
+        if args.cycle is not None:
+            records = []
+            for path in find_cycle(directory, args.cycle):
+                try:
+                    records.append(read_record(path))
+                except (OSError, ValueError) as exc:
+                    print(f"⚠️  读取失败 {path.name}: {exc}")
+        else:
+            at, window = pd.Timestamp(args.at), pd.Timedelta(minutes=args.window)
+            records = records_between(directory, at - window, at + window)
+        print("=" * 80)
+        print(f"🧠 推理回看: {args.trader} ({len(records)} 个周期, {(time.perf_counter() - started) * 1000:.0f}ms)")
+        print("=" * 80)
+        for record in records:
+            print(f"\n  #{record.get('cycle_number', 0):<6d} {record.get('timestamp', '')}")
+            print(record.get("cot_trace") or "(无推理)")
+        return
+
+    started = time.perf_counter()
+    index, added = open_index(args.trader, args.root, args.index_dir, update=not args.no_update)
+    print("=" * 80)
+    print(f"🔎 推理检索: {args.trader} ({len(index)} 个周期已索引, 本次新增 {added}, "
+          f"{(time.perf_counter() - started) * 1000:.0f}ms)")
+    print("=" * 80)
+    if not args.query:
+        return
+
+    query = Query.parse(args.query)
+    fields = FIELDS if args.field == "all" else (args.field,)
+    started = time.perf_counter()
+    hits = index.search(query, trader_dir(args.trader, args.root), args.limit, fields)
+    elapsed = (time.perf_counter() - started) * 1000
+    if not hits:
+        print(f"⏳ 没有匹配的周期 ({elapsed:.1f}ms)")
+        return
+    print(f"\n📄 {len(hits)} 条结果 ({elapsed:.1f}ms):")
+    for hit in hits:
+        print(f"\n  #{hit.cycle_number:<6d} {hit.file_key}  score={hit.score:.2f}")
+        print(f"     {hit.snippet}")
+
+
+if __name__ == "__main__":
+    main()
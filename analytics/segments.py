@@ -0,0 +1,350 @@
+"""Packed segments for closed decision-log periods.
+
+A busy trader writes a ``decision_*.json`` every three minutes, so
+``decision_logs/<trader>/`` grows by ~15k files a month and every listing,
+glob and backup pays for them. ``compact_directory`` rolls the files of
+closed days into one append-only segment per month (or per day), inside
+``<trader dir>/.segments/`` (the Go logger skips directories):
+
+* ``YYYYMM.seg`` the original JSON documents, byte for byte, back to back;
+* ``YYYYMM.idx`` one fixed-size row per document (:data:`INDEX_DTYPE`):
+  file time key, record timestamp, cycle number, offset and length.
+
+The Go side only reads loose files: ``DecisionLogger.GetLatestRecords``
+serves the trader's performance analysis (fed into the prompt) and the
+``/api/decisions``, ``/api/equity-history`` and ``/api/performance``
+endpoints, reading up to :data:`GO_READ_WINDOW` records. The
+newest ``GO_READ_WINDOW`` files (about three weeks at one cycle every three
+minutes) are therefore never packed, whatever ``--keep-days`` says.
+
+Segments are read through ``mmap`` without unpacking.
+``decision_logs.iter_decision_files`` lists segment members next to loose
+files as :class:`SegmentEntry` objects, which carry the original file name
+and ``read_bytes()``, so every loader reads both transparently. Loose files
+are only deleted once their bytes and index rows are on disk, and a file
+present in both places is read from the loose copy. ``find_entry``,
+``entries_for_cycle`` and ``entries_between`` answer lookups by file name,
+cycle and timestamp from the index rows without listing every member.
+
+Usage::
+
+    python -m analytics.segments --trader binance_live_qwen
+    python -m analytics.segments --trader binance_live_qwen --keep-days 7 --period day
+    python -m analytics.segments --trader binance_live_qwen --expand
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .decision_logs import (
+    DEFAULT_ROOT,
+    SEGMENT_DIRNAME,
+    iter_decision_files,
+    list_traders,
+    parse_filename,
+    trader_dir,
+)
+
+PERIOD_KEY_LENGTH = {"month": 6, "day": 8}
+# Largest GetLatestRecords(n) in the Go code (api/server.go equity history).
+GO_READ_WINDOW = 10_000
+
+INDEX_DTYPE = np.dtype(
+    [
+        ("time_key", "<i8"),  # YYYYMMDDHHMMSS from the file name
+        ("timestamp_ms", "<i8"),  # record timestamp, epoch ms (0 when unparseable)
+        ("cycle", "<u4"),
+        ("offset", "<u8"),
+        ("length", "<u4"),
+    ]
+)
+
+
+def _file_name(time_key: int, cycle: int) -> str:
+    key = f"{time_key:014d}"
+    return f"decision_{key[:8]}_{key[8:]}_cycle{cycle}.json"
+
+
+def _time_key(name: str) -> int:
+    return int(parse_filename(name)[0].replace("_", ""))
+
+
+class Segment:
+    """One ``.seg``/``.idx`` pair, memory-mapped for reading."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.index_path = self.path.with_suffix(".idx")
+        self.trader_dir = self.path.parent.parent
+        self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        self._data: mmap.mmap | None = None
+        self._size = -1
+        self.reload()
+
+    def reload(self) -> None:
+        size = self.index_path.stat().st_size if self.index_path.exists() else 0
+        if size == self._size:
+            return
+        self._size = size
+        # A torn trailing row from an interrupted append is ignored.
+        rows = size // INDEX_DTYPE.itemsize
+        self.index = np.fromfile(self.index_path, dtype=INDEX_DTYPE, count=rows) if rows else self.index[:0]
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        if self.path.exists() and self.path.stat().st_size:
+            with open(self.path, "rb") as fh:
+                self._data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def read(self, row: int) -> bytes:
+        offset, length = int(self.index["offset"][row]), int(self.index["length"][row])
+        return self._data[offset : offset + length]
+
+    def entries(self) -> List["SegmentEntry"]:
+        keys, cycles = self.index["time_key"].tolist(), self.index["cycle"].tolist()
+        return [SegmentEntry(_file_name(k, c), self, row) for row, (k, c) in enumerate(zip(keys, cycles))]
+
+    def entry(self, row: int) -> "SegmentEntry":
+        return SegmentEntry(_file_name(int(self.index["time_key"][row]), int(self.index["cycle"][row])), self, int(row))
+
+    def rows_for_name(self, name: str) -> np.ndarray:
+        return np.flatnonzero(self.index["time_key"] == _time_key(name))
+
+    def rows_for_cycle(self, cycle: int) -> np.ndarray:
+        return np.flatnonzero(self.index["cycle"] == cycle)
+
+    def rows_between(self, start_ms: int, end_ms: int) -> np.ndarray:
+        """Rows whose record timestamp lies in ``[start_ms, end_ms)``, in time order."""
+        order = np.argsort(self.index["timestamp_ms"], kind="stable")
+        stamps = self.index["timestamp_ms"][order]
+        lo, hi = np.searchsorted(stamps, [start_ms, end_ms], side="left")
+        return order[lo:hi]
+
+
+@dataclass(frozen=True)
+class SegmentEntry:
+    """A decision document inside a segment; stands in for its original ``Path``."""
+
+    name: str
+    segment: Segment = field(compare=False, hash=False, repr=False)
+    row: int = field(compare=False, hash=False)
+
+    @property
+    def parent(self) -> Path:
+        return self.segment.trader_dir
+
+    def read_bytes(self) -> bytes:
+        return self.segment.read(self.row)
+
+
+_OPEN: Dict[Path, Segment] = {}
+
+
+def open_segment(path: str | Path) -> Segment:
+    """Process-wide cached segment, refreshed when its index grew."""
+    path = Path(path)
+    segment = _OPEN.get(path)
+    if segment is None:
+        segment = _OPEN[path] = Segment(path)
+    else:
+        segment.reload()
+    return segment
+
+
+def segment_paths(log_dir: str | Path) -> List[Path]:
+    directory = Path(log_dir) / SEGMENT_DIRNAME
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob("*.seg"))
+
+
+def segment_entries(log_dir: str | Path) -> List[SegmentEntry]:
+    """Every document in the trader's segments."""
+    entries: List[SegmentEntry] = []
+    for path in segment_paths(log_dir):
+        entries.extend(open_segment(path).entries())
+    return entries
+
+
+def find_entry(log_dir: str | Path, name: str) -> SegmentEntry | None:
+    """The packed document called ``name``, looked up in its period's index only."""
+    parsed = parse_filename(name)
+    if parsed is None:
+        return None
+    for path in segment_paths(log_dir):
+        if not parsed[0].startswith(path.stem):
+            continue
+        segment = open_segment(path)
+        for row in segment.rows_for_name(name):
+            entry = segment.entry(row)
+            if entry.name == name:
+                return entry
+    return None
+
+
+def entries_for_cycle(log_dir: str | Path, cycle: int) -> List[SegmentEntry]:
+    """Packed documents whose record has ``cycle_number == cycle``."""
+    entries: List[SegmentEntry] = []
+    for path in segment_paths(log_dir):
+        segment = open_segment(path)
+        entries.extend(segment.entry(row) for row in segment.rows_for_cycle(cycle))
+    return entries
+
+
+def entries_between(log_dir: str | Path, start_ms: int, end_ms: int) -> List[SegmentEntry]:
+    """Packed documents whose record timestamp lies in ``[start_ms, end_ms)``, in time order."""
+    entries: List[SegmentEntry] = []
+    for path in segment_paths(log_dir):
+        segment = open_segment(path)
+        entries.extend(segment.entry(row) for row in segment.rows_between(start_ms, end_ms))
+    return entries
+
+
+def _epoch_ms(stamps: List[str | None]) -> np.ndarray:
+    import pandas as pd
+
+    from .timeutil import parse_timestamps, to_epoch_ms
+
+    return to_epoch_ms(parse_timestamps(stamps).fillna(pd.Timestamp(0, tz="UTC"))).to_numpy()
+
+
+def _append(segment_path: Path, documents: List[Tuple[Path, bytes, int, str | None]]) -> None:
+    """Append documents to a segment: data first, then index rows, each synced."""
+    segment_path.parent.mkdir(parents=True, exist_ok=True)
+    index_path = segment_path.with_suffix(".idx")
+    # Trim a torn index row so new rows stay aligned.
+    if index_path.exists() and index_path.stat().st_size % INDEX_DTYPE.itemsize:
+        os.truncate(index_path, index_path.stat().st_size // INDEX_DTYPE.itemsize * INDEX_DTYPE.itemsize)
+    offset = segment_path.stat().st_size if segment_path.exists() else 0
+
+    rows = np.zeros(len(documents), dtype=INDEX_DTYPE)
+    rows["time_key"] = [_time_key(path.name) for path, _, _, _ in documents]
+    rows["timestamp_ms"] = _epoch_ms([stamp for _, _, _, stamp in documents])
+    rows["cycle"] = [cycle for _, _, cycle, _ in documents]
+    lengths = np.array([len(data) for _, data, _, _ in documents], dtype=np.int64)
+    rows["length"] = lengths
+    rows["offset"] = offset + np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+    with open(segment_path, "ab") as fh:
+        fh.write(b"".join(data for _, data, _, _ in documents))
+        fh.flush()
+        os.fsync(fh.fileno())
+    with open(index_path, "ab") as fh:
+        fh.write(rows.tobytes())
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def compact_directory(log_dir: str | Path, keep_days: int = 1, period: str = "month",
+                      dry_run: bool = False, keep_files: int = GO_READ_WINDOW) -> Dict[str, int]:
+    """Roll loose files into segments; files packed per segment.
+
+    A file is packed only if its day is older than ``keep_days`` and it is
+    not among the newest ``keep_files`` loose files, which the Go logger
+    still reads.
+    """
+    log_dir = Path(log_dir)
+    # Today is always kept loose: the Go logger may still be writing it.
+    cutoff = (datetime.now() - timedelta(days=max(keep_days, 1) - 1)).strftime("%Y%m%d")
+    key_length = PERIOD_KEY_LENGTH[period]
+
+    loose = iter_decision_files(log_dir, include_segments=False)
+    candidates = loose[: max(len(loose) - max(keep_files, 0), 0)]
+    groups: Dict[str, List[Path]] = {}
+    for path in candidates:
+        key = parse_filename(path.name)[0]
+        if key[:8] < cutoff:
+            groups.setdefault(key[: key_length], []).append(path)
+
+    packed: Dict[str, int] = {}
+    for key, paths in sorted(groups.items()):
+        segment_path = log_dir / SEGMENT_DIRNAME / f"{key}.seg"
+        present = {entry.name for entry in open_segment(segment_path).entries()} if segment_path.exists() else set()
+        documents = []
+        duplicates = []
+        for path in paths:
+            if path.name in present:
+                # Packed by an earlier run that stopped before deleting it.
+                duplicates.append(path)
+                continue
+            data = path.read_bytes()
+            try:
+                record = json.loads(data)
+            except ValueError:
+                print(f"⚠️  跳过无法解析的文件 {path.name}")
+                continue
+            documents.append((path, data, int(record.get("cycle_number", 0) or 0), record.get("timestamp")))
+        packed[key] = len(documents)
+        if dry_run:
+            continue
+        if documents:
+            _append(segment_path, documents)
+        for path in duplicates + [path for path, _, _, _ in documents]:
+            path.unlink(missing_ok=True)
+    return packed
+
+
+def expand_directory(log_dir: str | Path) -> int:
+    """Write every segment document back as a loose file and remove the segments."""
+    log_dir = Path(log_dir)
+    written = 0
+    for segment_path in segment_paths(log_dir):
+        segment = open_segment(segment_path)
+        for entry in segment.entries():
+            target = log_dir / entry.name
+            if not target.exists():
+                tmp_path = target.with_name(target.name + ".tmp")
+                tmp_path.write_bytes(entry.read_bytes())
+                os.replace(tmp_path, target)
+                written += 1
+        _OPEN.pop(segment_path, None)
+        segment_path.unlink()
+        segment.index_path.unlink(missing_ok=True)
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pack closed days of decision logs into segments.")
+    parser.add_argument("--trader", action="append", help="Trader id(s) under decision_logs/ (default all).")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--keep-days", type=int, default=1, help="Days kept loose, today included (default 1).")
+    parser.add_argument("--period", choices=sorted(PERIOD_KEY_LENGTH), default="month", help="One segment per month or day.")
+    parser.add_argument("--keep-files", type=int, default=GO_READ_WINDOW,
+                        help=f"Newest loose files never packed; the Go logger reads up to {GO_READ_WINDOW} "
+                             f"(default {GO_READ_WINDOW}, lower values hide history from the web UI).")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be packed.")
+    parser.add_argument("--expand", action="store_true", help="Unpack all segments back into loose files.")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("📦 决策日志分段压缩")
+    print("=" * 80)
+    for trader in args.trader or list_traders(args.root):
+        log_dir = trader_dir(trader, args.root)
+        if args.expand:
+            print(f"♻️  {trader}: 已还原 {expand_directory(log_dir)} 个文件")
+            continue
+        packed = compact_directory(log_dir, args.keep_days, args.period, args.dry_run, args.keep_files)
+        if not any(packed.values()):
+            print(f"⏳ {trader}: 没有需要打包的文件")
+            continue
+        verb = "将打包" if args.dry_run else "已打包"
+        details = ", ".join(f"{key}: {count}" for key, count in packed.items() if count)
+        print(f"✅ {trader}: {verb} {sum(packed.values())} 个文件 ({details})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Embedded SQLite store of the decision history for ad hoc SQL.
+
+Questions such as "every ``close_short`` on ETHUSDT with positive PnL last
+week" used to mean another script looping over every file. ``DecisionStore``
+keeps one SQLite database fed incrementally from ``decision_logs``:
+
+* ``cycles``: one row per decision file (account state, counts, success);
+* ``decisions``: executed actions with their reasoning;
+* ``positions``: position snapshots per cycle;
+* ``trades``: round trips (:func:`analytics.trades.round_trips`), rebuilt
+  per trader from ``decisions`` after each update;
+* ``predictions``: the ``prediction_logs`` records, upserted by id.
+
+Each trader's newest ingested file is remembered in ``ingest_state``, so an
+update only parses newer files, and every batch commits together with that
+marker. Timestamps are UTC text (``YYYY-MM-DD HH:MM:SS``), comparable with
+SQLite's ``datetime('now', '-7 days')``. Decisions, positions, predictions
+and trades are indexed on ``(symbol, timestamp)`` and decisions also on
+``(action, timestamp)``.
+
+Usage::
+
+    python -m analytics.store --trader binance_live_qwen --trader binance_live_deepseek
+    python -m analytics.store --no-update --sql "SELECT * FROM trades WHERE symbol = 'ETHUSDT' AND side = 'short' AND pnl > 0 AND exit_time >= datetime('now', '-7 days')"
+    python -m analytics.store --no-update --sql "SELECT action, COUNT(*) FROM decisions GROUP BY action" --csv actions.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from .decision_logs import (
+    CYCLE_COLUMNS,
+    DEFAULT_ROOT,
+    TableCollector,
+    iter_new_records,
+    list_traders,
+    trader_dir,
+)
+from .predictions import load_predictions
+from .trades import TRADE_COLUMNS, round_trips
+
+DEFAULT_DB = "decision_store.sqlite"
+# Files per transaction; an interrupted update resumes after the last commit.
+BATCH_FILES = 2000
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_state (
+    trader TEXT PRIMARY KEY,
+    last_file_key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cycles (
+    trader TEXT NOT NULL,
+    file TEXT NOT NULL,
+    timestamp TEXT,
+    cycle_number INTEGER,
+    total_balance REAL,
+    available_balance REAL,
+    unrealized_profit REAL,
+    margin_used_pct REAL,
+    position_count INTEGER,
+    n_decisions INTEGER,
+    success INTEGER,
+    PRIMARY KEY (trader, file)
+);
+CREATE TABLE IF NOT EXISTS decisions (
+    trader TEXT NOT NULL,
+    timestamp TEXT,
+    cycle_number INTEGER,
+    action TEXT,
+    symbol TEXT,
+    quantity REAL,
+    leverage REAL,
+    price REAL,
+    order_id INTEGER,
+    success INTEGER,
+    error TEXT,
+    reasoning TEXT
+);
+CREATE TABLE IF NOT EXISTS positions (
+    trader TEXT NOT NULL,
+    timestamp TEXT,
+    cycle_number INTEGER,
+    symbol TEXT,
+    side TEXT,
+    position_amt REAL,
+    entry_price REAL,
+    mark_price REAL,
+    unrealized_profit REAL,
+    leverage REAL,
+    liquidation_price REAL
+);
+CREATE TABLE IF NOT EXISTS trades (
+    trader TEXT NOT NULL,
+    symbol TEXT,
+    side TEXT,
+    entry_time TEXT,
+    exit_time TEXT,
+    entry_price REAL,
+    exit_price REAL,
+    quantity REAL,
+    leverage REAL,
+    pnl REAL,
+    pnl_pct REAL,
+    holding_minutes REAL
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    id TEXT PRIMARY KEY,
+    symbol TEXT,
+    timestamp TEXT,
+    target_time TEXT,
+    direction TEXT,
+    probability REAL,
+    expected_move REAL,
+    timeframe TEXT,
+    confidence TEXT,
+    risk_level TEXT,
+    entry_price REAL,
+    evaluated INTEGER,
+    actual_move REAL,
+    actual_high REAL,
+    actual_low REAL,
+    is_correct INTEGER,
+    accuracy REAL
+);
+CREATE INDEX IF NOT EXISTS idx_cycles_time ON cycles (trader, timestamp);
+CREATE INDEX IF NOT EXISTS idx_decisions_symbol_time ON decisions (symbol, timestamp);
+CREATE INDEX IF NOT EXISTS idx_decisions_action_time ON decisions (action, timestamp);
+CREATE INDEX IF NOT EXISTS idx_decisions_trader_cycle ON decisions (trader, cycle_number);
+CREATE INDEX IF NOT EXISTS idx_positions_symbol_time ON positions (symbol, timestamp);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol_time ON trades (symbol, exit_time);
+CREATE INDEX IF NOT EXISTS idx_trades_trader ON trades (trader);
+CREATE INDEX IF NOT EXISTS idx_predictions_symbol_time ON predictions (symbol, timestamp);
+"""
+
+DECISION_COLUMNS = ["timestamp", "cycle_number", "action", "symbol", "quantity", "leverage", "price", "order_id",
+                    "success", "error", "reasoning"]
+POSITION_COLUMNS = ["timestamp", "cycle_number", "symbol", "side", "position_amt", "entry_price", "mark_price",
+                    "unrealized_profit", "leverage", "liquidation_price"]
+PREDICTION_COLUMNS = ["id", "symbol", "timestamp", "target_time", "direction", "probability", "expected_move",
+                      "timeframe", "confidence", "risk_level", "entry_price", "evaluated", "actual_move",
+                      "actual_high", "actual_low", "is_correct", "accuracy"]
+
+
+def _sql_frame(df: pd.DataFrame, columns: List[str]) -> List[tuple]:
+    """Rows ready for ``executemany``: UTC text timestamps, NULL for missing values."""
+    df = df[columns].copy()
+    for column in columns:
+        if isinstance(df[column].dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime(TIME_FORMAT)
+        elif pd.api.types.is_bool_dtype(df[column]):
+            df[column] = df[column].astype(int)
+    df = df.astype(object).where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None))
+
+
+def _insert(conn: sqlite3.Connection, table: str, columns: List[str], rows: List[tuple]) -> None:
+    if rows:
+        placeholders = ", ".join("?" * len(columns))
+        conn.executemany(f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+
+class DecisionStore:
+    """One SQLite database holding every trader's decision history."""
+
+    def __init__(self, path: str | Path = DEFAULT_DB):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "DecisionStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def last_file_key(self, trader: str) -> str:
+        row = self.conn.execute("SELECT last_file_key FROM ingest_state WHERE trader = ?", (trader,)).fetchone()
+        return row[0] if row else ""
+
+    def update(self, trader: str, root: str | Path = DEFAULT_ROOT) -> int:
+        """Ingest the trader's files newer than the last stored one; returns how many were added.
+
+        Unreadable files are handled by ``iter_new_records``: older ones are
+        skipped, a trailing run is left for the next update.
+        """
+        batch: List[tuple] = []
+        added = 0
+        for path, key, record in iter_new_records(trader_dir(trader, root), self.last_file_key(trader)):
+            batch.append((path.name, key, record))
+            if len(batch) >= BATCH_FILES:
+                self._write_batch(trader, batch)
+                added += len(batch)
+                batch = []
+        if batch:
+            self._write_batch(trader, batch)
+            added += len(batch)
+        if added:
+            self.rebuild_trades(trader)
+        return added
+
+    def _write_batch(self, trader: str, batch: List[tuple]) -> None:
+        collector = TableCollector()
+        reasoning: List[str] = []
+        for _, _, record in batch:
+            collector.add(record)
+            # Same order as the collector's action rows: one per decisions[] entry.
+            reasoning.extend(d.get("reasoning") or "" for d in record.get("decisions") or [])
+        tables = collector.tables()
+
+        cycles = tables["cycles"].assign(trader=trader, file=[name for name, _, _ in batch])
+        actions = tables["actions"].assign(trader=trader, reasoning=reasoning)
+        positions = tables["positions"].reset_index().assign(trader=trader)
+        with self.conn:
+            _insert(self.conn, "cycles", ["trader", "file"] + CYCLE_COLUMNS,
+                    _sql_frame(cycles, ["trader", "file"] + CYCLE_COLUMNS))
+            _insert(self.conn, "decisions", ["trader"] + DECISION_COLUMNS,
+                    _sql_frame(actions, ["trader"] + DECISION_COLUMNS))
+            _insert(self.conn, "positions", ["trader"] + POSITION_COLUMNS,
+                    _sql_frame(positions, ["trader"] + POSITION_COLUMNS))
+            self.conn.execute("INSERT OR REPLACE INTO ingest_state (trader, last_file_key) VALUES (?, ?)",
+                              (trader, batch[-1][1]))
+
+    def rebuild_trades(self, trader: str) -> int:
+        """Re-pair the trader's round trips from the stored decisions."""
+        actions = pd.read_sql_query(
+            "SELECT timestamp, cycle_number, action, symbol, quantity, leverage, price, success "
+            "FROM decisions WHERE trader = ?", self.conn, params=(trader,),
+        )
+        actions["timestamp"] = pd.to_datetime(actions["timestamp"], utc=True)
+        actions["success"] = actions["success"].astype(bool)
+        trades = round_trips(actions).assign(trader=trader)
+        with self.conn:
+            self.conn.execute("DELETE FROM trades WHERE trader = ?", (trader,))
+            _insert(self.conn, "trades", ["trader"] + TRADE_COLUMNS, _sql_frame(trades, ["trader"] + TRADE_COLUMNS))
+        return len(trades)
+
+    def update_predictions(self, pred_dir: str | Path = "prediction_logs") -> int:
+        """Upsert every prediction record (evaluation results change after the fact)."""
+        predictions = load_predictions(pred_dir)
+        with self.conn:
+            _insert(self.conn, "predictions", PREDICTION_COLUMNS, _sql_frame(predictions, PREDICTION_COLUMNS))
+        return len(predictions)
+
+    def query(self, sql: str, params: tuple | Dict[str, Any] = ()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def counts(self) -> Dict[str, int]:
+        tables = ["cycles", "decisions", "positions", "trades", "predictions"]
+        return {table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Keep decision history in SQLite and run SQL against it.")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"Database file (default {DEFAULT_DB}).")
+    parser.add_argument("--trader", action="append", help="Trader id(s) under decision_logs/ (default all).")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--pred-dir", default="prediction_logs", help="Prediction log directory.")
+    parser.add_argument("--no-update", action="store_true", help="Query without ingesting new files first.")
+    parser.add_argument("--sql", default=None, help="SQL to run after updating.")
+    parser.add_argument("--csv", default=None, help="Write the query result to this CSV.")
+    args = parser.parse_args()
+
+    pd.set_option("display.width", 200)
+    with DecisionStore(args.db) as store:
+        if not args.no_update:
+            print("=" * 80)
+            print(f"🗄️  决策历史库: {store.path}")
+            print("=" * 80)
+            for trader in args.trader or list_traders(args.root):
+                started = time.perf_counter()
+                added = store.update(trader, args.root)
+                status = f"新增 {added} 个文件" if added else "已是最新"
+                print(f"✅ {trader}: {status} ({time.perf_counter() - started:.1f}s)")
+            if Path(args.pred_dir).is_dir():
+                print(f"🔮 预测记录: {store.update_predictions(args.pred_dir)} 条")
+            print("📊 " + ", ".join(f"{table} {count}" for table, count in store.counts().items()))
+
+        if args.sql:
+            started = time.perf_counter()
+            try:
+                result = store.query(args.sql)
+            except (sqlite3.Error, pd.errors.DatabaseError) as exc:
+                print(f"❌ SQL 错误: {exc}")
+                return
+            elapsed = (time.perf_counter() - started) * 1000
+            print(result.to_string(index=False) if len(result) else "(无结果)")
+            print(f"\n⏱️  {len(result)} 行, {elapsed:.1f}ms")
+            if args.csv:
+                result.to_csv(args.csv, index=False)
+                print(f"💾 已写入 {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
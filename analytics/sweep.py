@@ -0,0 +1,215 @@
+"""Parallel parameter sweep over exit-rule variants of the account replay.
+
+``analyze_close_behavior.py`` classifies why the AI closed (RSI overbought,
+regime conflict, stop loss, ...), but trying other thresholds means editing
+scripts. Here a grid of exit rules is replayed with
+:func:`analytics.replay.replay` on the same decisions and klines:
+
+* ``rsi_level``: follow a close only when the 3-minute RSI7 at the decision
+  confirms it (>= level for closing longs, <= 100 - level for shorts;
+  0 disables the gate);
+* ``min_hold``: ignore closes earlier than this many minutes;
+* ``trail_pct`` / ``stop_pct``: trailing and fixed stops (``none`` disables).
+
+The bar arrays every variant needs are packed once into a
+``multiprocessing.shared_memory`` block, and each worker of the process
+pool maps them without copying. Results are ranked by ``--rank-by``.
+
+Usage::
+
+    python -m analytics.sweep --trader binance_live_qwen
+    python -m analytics.sweep --trader binance_live_qwen --rsi-levels 0,70,75,80 --hold-grid 0,15,30,60 \\
+        --trail-grid none,0.5,1,2 --workers 8 --csv sweep.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from multiprocessing import shared_memory
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .decision_logs import DEFAULT_ROOT, trader_dir
+from .klines import KlineCache
+from .replay import Bars, ReplayConfig, add_config_arguments, config_from_args, load_decisions, load_market, replay
+from .timeutil import to_epoch_ms
+
+RSI_PERIOD = 7
+RSI_BAR_MS = 3 * 60_000  # the prompt's intraday series are 3-minute bars
+GRID_AXES = ("rsi_level", "min_hold", "trail_pct", "stop_pct")
+RESULT_COLUMNS = ["trades", "total_pnl", "return_pct", "max_drawdown_pct", "win_rate", "profit_factor", "fees",
+                  "rejected"]
+
+# Worker-process state, set once by _attach.
+_MARKET: Dict[str, Bars] = {}
+_DECISIONS: pd.DataFrame | None = None
+_BASE: ReplayConfig | None = None
+_SHM: shared_memory.SharedMemory | None = None
+
+
+def rsi_at(bars: Bars, times_ms: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """Wilder RSI of 3-minute closes, from the last bucket completed before each time."""
+    bucket = bars.times // RSI_BAR_MS
+    last = np.flatnonzero(np.diff(bucket, append=bucket[-1] + 1))
+    closes = pd.Series(bars.close[last])
+    change = closes.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = (100 - 100 / (1 + gain / loss)).to_numpy()
+    ends = (bucket[last] + 1) * RSI_BAR_MS
+    idx = np.searchsorted(ends, times_ms, side="right") - 1
+    return np.where(idx >= 0, rsi[np.maximum(idx, 0)], np.nan)
+
+
+def attach_rsi(decisions: pd.DataFrame, market: Dict[str, Bars]) -> pd.DataFrame:
+    """``decisions`` with an ``rsi`` column (3m RSI7 at decision time, NaN without bars)."""
+    decisions = decisions.copy()
+    decisions["rsi"] = np.nan
+    for symbol, group in decisions.groupby("symbol"):
+        if symbol in market:
+            decisions.loc[group.index, "rsi"] = rsi_at(market[symbol], to_epoch_ms(group["timestamp"]).to_numpy())
+    return decisions
+
+
+def gate_closes(decisions: pd.DataFrame, level: float) -> pd.DataFrame:
+    """Drop AI closes the RSI does not confirm (``level`` 0 keeps all)."""
+    if not level:
+        return decisions
+    rsi = decisions["rsi"]
+    confirmed = ((decisions["action"] == "close_long") & (rsi >= level)) | (
+        (decisions["action"] == "close_short") & (rsi <= 100 - level)
+    )
+    return decisions[~decisions["action"].str.startswith("close_") | confirmed]
+
+
+def pack_market(market: Dict[str, Bars]) -> Tuple[shared_memory.SharedMemory, List[tuple]]:
+    """Copy all bar arrays into one shared block; returns it and the ``(symbol, offset, length)`` layout."""
+    total = sum(len(bars.times) for bars in market.values())
+    shm = shared_memory.SharedMemory(create=True, size=max(1, total * 5 * 8))
+    block = np.ndarray((5, total), dtype=np.float64, buffer=shm.buf)
+    layout = []
+    offset = 0
+    for symbol, bars in market.items():
+        n = len(bars.times)
+        for row, values in enumerate((bars.times, bars.open, bars.high, bars.low, bars.close)):
+            block[row, offset : offset + n] = values
+        layout.append((symbol, offset, n))
+        offset += n
+    return shm, layout
+
+
+def unpack_market(shm: shared_memory.SharedMemory, layout: Sequence[tuple]) -> Dict[str, Bars]:
+    total = sum(n for _, _, n in layout)
+    block = np.ndarray((5, total), dtype=np.float64, buffer=shm.buf)
+    market = {}
+    for symbol, offset, n in layout:
+        view = block[:, offset : offset + n]
+        # Epoch milliseconds are exact in float64.
+        market[symbol] = Bars(view[0].astype(np.int64), view[1], view[2], view[3], view[4])
+    return market
+
+
+def _attach(name: str, layout: Sequence[tuple], decisions: pd.DataFrame, base: ReplayConfig) -> None:
+    global _MARKET, _DECISIONS, _BASE, _SHM
+    _SHM = shared_memory.SharedMemory(name=name)
+    _MARKET = unpack_market(_SHM, layout)
+    _DECISIONS = decisions
+    _BASE = base
+
+
+def _evaluate(params: Tuple[float, float, float | None, float | None]) -> Dict[str, float]:
+    rsi_level, min_hold, trail_pct, stop_pct = params
+    config = replace(_BASE, min_hold_minutes=min_hold, trailing_stop_pct=trail_pct,
+                     stop_loss_pct=stop_pct if stop_pct is not None else _BASE.stop_loss_pct)
+    summary = replay(gate_closes(_DECISIONS, rsi_level), _MARKET, config).summary()
+    result = dict(zip(GRID_AXES, params))
+    result.update({column: summary[column] for column in RESULT_COLUMNS})
+    return result
+
+
+def run_sweep(decisions: pd.DataFrame, market: Dict[str, Bars], grid: Dict[str, Sequence], base: ReplayConfig,
+              workers: int | None = None) -> pd.DataFrame:
+    """Replay every combination of ``grid`` (keys from :data:`GRID_AXES`) in a process pool."""
+    combos = list(itertools.product(*(grid.get(axis, [None]) for axis in GRID_AXES)))
+    decisions = attach_rsi(decisions, market)
+    shm, layout = pack_market(market)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(shm.name, layout, decisions, base)) as pool:
+            chunksize = max(1, len(combos) // ((workers or os.cpu_count() or 1) * 4))
+            rows = list(pool.map(_evaluate, combos, chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+    return pd.DataFrame(rows, columns=list(GRID_AXES) + RESULT_COLUMNS)
+
+
+def _axis(text: str) -> List[float | None]:
+    return [None if item.strip().lower() == "none" else float(item) for item in text.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sweep exit-rule variants of the account replay in parallel.")
+    parser.add_argument("--trader", required=True, help="Trader id under decision_logs/.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--since", default=None, help="Only files from YYYYMMDD_HHMMSS on.")
+    parser.add_argument("--cache-dir", default="kline_cache", help="Kline cache directory.")
+    parser.add_argument("--offline", action="store_true", help="Use cached klines only, never download.")
+    parser.add_argument("--rsi-levels", default="0,70,75,80", help="RSI close gates (0 = follow every close).")
+    parser.add_argument("--hold-grid", default="0,15,30,60", help="Minimum hold minutes.")
+    parser.add_argument("--trail-grid", default="none,0.5,1,2", help="Trailing stop %% (none = off).")
+    parser.add_argument("--stop-grid", default="none", help="Fixed stop %% overriding the AI stop (none = AI stop).")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--rank-by", default="return_pct", choices=RESULT_COLUMNS, help="Ranking column.")
+    parser.add_argument("--top", type=int, default=20, help="How many variants to list.")
+    parser.add_argument("--csv", default=None, help="Also write every variant to this CSV.")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    decisions = load_decisions(str(trader_dir(args.trader, args.root)), since=args.since)
+    market = load_market(KlineCache(args.cache_dir, interval="1m", offline=args.offline), decisions)
+    grid = {
+        "rsi_level": [level or 0.0 for level in _axis(args.rsi_levels)],
+        "min_hold": [hold or 0.0 for hold in _axis(args.hold_grid)],
+        "trail_pct": _axis(args.trail_grid),
+        "stop_pct": _axis(args.stop_grid),
+    }
+    combos = int(np.prod([len(values) for values in grid.values()]))
+
+    started = time.perf_counter()
+    results = run_sweep(decisions, market, grid, config_from_args(args), args.workers)
+    elapsed = time.perf_counter() - started
+    print("=" * 80)
+    print(f"🧪 平仓规则参数扫描: {args.trader} ({combos} 组参数, {len(decisions)} 条决策, {elapsed:.1f}s)")
+    print("=" * 80)
+    if results.empty:
+        print("⏳ 没有结果")
+        return
+
+    pd.set_option("display.width", 200)
+    ascending = args.rank_by in ("max_drawdown_pct", "fees", "rejected")
+    ranked = results.sort_values(args.rank_by, ascending=ascending, kind="stable").reset_index(drop=True)
+    print(f"\n🏆 按 {args.rank_by} 排名前 {args.top}:")
+    print(ranked.head(args.top).to_string(float_format=lambda v: f"{v:.3f}"))
+    baseline = results[(results["rsi_level"] == 0) & (results["min_hold"] == 0)
+                       & results["trail_pct"].isna() & results["stop_pct"].isna()]
+    if not baseline.empty:
+        row = baseline.iloc[0]
+        print(f"\n📌 基准 (原始平仓规则): 收益 {row['return_pct']:.2f}%, 回撤 {row['max_drawdown_pct']:.2f}%, "
+              f"{int(row['trades'])} 笔交易")
+
+    if args.csv:
+        ranked.to_csv(args.csv, index=False)
+        print(f"\n💾 已写入 {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""Timestamp helpers shared by the analytics modules."""
+
+from __future__ import annotations
+
+import pandas as pd
+
+_EPOCH = pd.Timestamp(0, tz="UTC")
+_MS = pd.Timedelta(milliseconds=1)
+
+
+def parse_timestamps(values) -> pd.Series:
+    """Parse Go RFC3339 timestamps (any offset, up to nanoseconds) to UTC."""
+    return pd.to_datetime(pd.Series(values), utc=True, format="ISO8601", errors="coerce")
+
+
+def to_epoch_ms(values: pd.Series) -> pd.Series:
+    """UTC datetimes to integer epoch milliseconds, independent of the datetime unit."""
+    return ((values - _EPOCH) // _MS).astype("int64")
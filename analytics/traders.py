@@ -0,0 +1,227 @@
+"""Side-by-side comparison of every trader under ``decision_logs``.
+
+Each trader directory is ingested in its own worker process
+(``ProcessPoolExecutor`` with one task per child, so a worker's memory is
+returned to the OS as soon as its trader is done). Workers ship back only
+the slim cycle/action tables from :func:`analytics.decision_logs.load_tables`
+and the derived trades; prompts and CoT traces never leave the worker.
+
+The parent then builds three aligned tables:
+
+* equity: every trader's balance on one shared time grid (forward-filled),
+  plus the same curves as percent return from each trader's start;
+* trades: per-trader round-trip statistics next to account statistics;
+* predictions: how each trader's opens line up with the most recent AI
+  prediction for the same symbol.
+
+Usage::
+
+    python -m analytics.traders
+    python -m analytics.traders --trader binance_live_qwen --trader binance_live_deepseek --grid 1h --out-dir reports/
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from .decision_logs import DEFAULT_ROOT, list_traders, load_tables
+from .predictions import load_predictions
+from .trades import max_drawdown_pct, round_trips, trade_summary
+
+DEFAULT_GRID = "15min"
+# Predictions older than this are not considered "current" for an open.
+PREDICTION_TOLERANCE = pd.Timedelta(hours=24)
+
+
+def default_workers() -> int:
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def ingest_trader(directory: str, since: str | None = None) -> Dict[str, pd.DataFrame]:
+    """Worker entry point: tables for one trader directory."""
+    tables = load_tables(directory, since=since)
+    tables["trades"] = round_trips(tables["actions"])
+    return tables
+
+
+def ingest_all(
+    root: str | Path = DEFAULT_ROOT,
+    traders: Iterable[str] | None = None,
+    workers: int | None = None,
+    since: str | None = None,
+) -> Dict[str, Dict[str, pd.DataFrame]]:
+    """Ingest the selected traders in parallel; returns ``{trader_id: tables}``."""
+    root = Path(root)
+    selected = list(traders) if traders else list_traders(root)
+    if not selected:
+        return {}
+
+    workers = workers or default_workers()
+    results: Dict[str, Dict[str, pd.DataFrame]] = {}
+    if workers == 1 or len(selected) == 1:
+        for trader in selected:
+            results[trader] = ingest_trader(str(root / trader), since)
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(selected)), max_tasks_per_child=1) as pool:
+        futures = {trader: pool.submit(ingest_trader, str(root / trader), since) for trader in selected}
+        for trader, future in futures.items():
+            results[trader] = future.result()
+    return results
+
+
+def equity_table(ingested: Dict[str, Dict[str, pd.DataFrame]], grid: str = DEFAULT_GRID) -> pd.DataFrame:
+    """Balances of all traders resampled onto one grid, one column per trader."""
+    series = {}
+    for trader, tables in ingested.items():
+        cycles = tables["cycles"].dropna(subset=["timestamp", "total_balance"])
+        if cycles.empty:
+            continue
+        balance = cycles.set_index("timestamp")["total_balance"].sort_index()
+        series[trader] = balance.resample(grid).last()
+    if not series:
+        return pd.DataFrame()
+    # Forward-fill inside each trader's own lifetime only.
+    frame = pd.DataFrame(series)
+    return frame.apply(lambda column: column.ffill().where(column.bfill().notna()))
+
+
+def returns_table(equity: pd.DataFrame) -> pd.DataFrame:
+    """Equity curves as percent return from each trader's first balance."""
+    first = equity.apply(lambda column: column.dropna().iloc[0] if column.notna().any() else np.nan)
+    return (equity / first - 1) * 100
+
+
+def comparison_table(ingested: Dict[str, Dict[str, pd.DataFrame]]) -> pd.DataFrame:
+    """One row per trader: account, cycle and round-trip statistics."""
+    rows = []
+    for trader, tables in ingested.items():
+        cycles = tables["cycles"].dropna(subset=["timestamp"]).sort_values("timestamp")
+        balance = cycles["total_balance"].dropna()
+        row = {
+            "trader": trader,
+            "first_cycle": cycles["timestamp"].min(),
+            "last_cycle": cycles["timestamp"].max(),
+            "cycles": int(len(cycles)),
+            "failed_cycles_pct": float((~cycles["success"]).mean() * 100) if len(cycles) else np.nan,
+            "start_balance": float(balance.iloc[0]) if len(balance) else np.nan,
+            "end_balance": float(balance.iloc[-1]) if len(balance) else np.nan,
+            "max_drawdown_pct": max_drawdown_pct(balance.to_numpy()),
+            "avg_margin_used_pct": float(cycles["margin_used_pct"].mean()),
+        }
+        row["return_pct"] = (
+            (row["end_balance"] / row["start_balance"] - 1) * 100 if row["start_balance"] else np.nan
+        )
+        actions = tables["actions"]
+        opens = actions[actions["success"] & actions["action"].str.startswith("open_")]
+        row["open_short_pct"] = float((opens["action"] == "open_short").mean() * 100) if len(opens) else np.nan
+        row.update(trade_summary(tables["trades"]))
+        rows.append(row)
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).set_index("trader").sort_values("return_pct", ascending=False)
+
+
+def prediction_alignment(
+    ingested: Dict[str, Dict[str, pd.DataFrame]],
+    predictions: pd.DataFrame,
+    tolerance: pd.Timedelta = PREDICTION_TOLERANCE,
+) -> pd.DataFrame:
+    """Per trader: share of opens that had a recent prediction and agreed with it.
+
+    ``followed_hit_rate`` is the direction hit rate of the predictions the
+    trader agreed with, over those already evaluated.
+    """
+    predictions = predictions.dropna(subset=["timestamp"]).sort_values("timestamp")
+    predictions = predictions[["symbol", "timestamp", "direction", "probability", "evaluated", "is_correct"]]
+    rows = []
+    for trader, tables in ingested.items():
+        actions = tables["actions"]
+        opens = actions[actions["success"] & actions["action"].str.startswith("open_")]
+        opens = opens.dropna(subset=["timestamp"]).sort_values("timestamp")
+        if opens.empty:
+            rows.append({"trader": trader, "opens": 0})
+            continue
+        matched = pd.merge_asof(
+            opens[["symbol", "timestamp", "action"]],
+            predictions.rename(columns={"timestamp": "predicted_at"}),
+            left_on="timestamp",
+            right_on="predicted_at",
+            by="symbol",
+            direction="backward",
+            tolerance=tolerance,
+        )
+        has_prediction = matched["direction"].notna()
+        expected = matched["action"].map({"open_long": "up", "open_short": "down"})
+        agrees = has_prediction & (matched["direction"] == expected)
+        followed = matched[agrees & matched["evaluated"].fillna(False).astype(bool)]
+        rows.append(
+            {
+                "trader": trader,
+                "opens": int(len(matched)),
+                "with_prediction_pct": float(has_prediction.mean() * 100),
+                "agree_pct": float(agrees[has_prediction].mean() * 100) if has_prediction.any() else np.nan,
+                "avg_probability": float(matched.loc[has_prediction, "probability"].mean()),
+                "followed_evaluated": int(len(followed)),
+                "followed_hit_rate": float(followed["is_correct"].astype(bool).mean() * 100)
+                if len(followed) else np.nan,
+            }
+        )
+    return pd.DataFrame(rows).set_index("trader")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare every trader in decision_logs side by side.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--trader", action="append", help="Trader id to include (repeatable, default all).")
+    parser.add_argument("--since", default=None, help="Only files from YYYYMMDD_HHMMSS on.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default min(4, CPUs)).")
+    parser.add_argument("--grid", default=DEFAULT_GRID, help="Equity grid for alignment (default 15min).")
+    parser.add_argument("--pred-dir", default="prediction_logs", help="Prediction log directory.")
+    parser.add_argument("--out-dir", default=None, help="Also write the tables as CSV into this directory.")
+    args = parser.parse_args()
+
+    ingested = ingest_all(args.root, args.trader, workers=args.workers, since=args.since)
+    print("=" * 80)
+    print(f"👥 多交易员对比 ({len(ingested)} 个交易员)")
+    print("=" * 80)
+    if not ingested:
+        print(f"⏳ {args.root} 下没有交易员目录")
+        return
+
+    comparison = comparison_table(ingested)
+    equity = equity_table(ingested, args.grid)
+    returns = returns_table(equity) if not equity.empty else equity
+    alignment = prediction_alignment(ingested, load_predictions(args.pred_dir))
+
+    pd.set_option("display.width", 200)
+    print("\n📊 账户与交易统计:")
+    print(comparison.drop(columns=["first_cycle", "last_cycle"]).round(2).to_string())
+    print("\n🤖 开仓与AI预测的一致性:")
+    print(alignment.round(2).to_string())
+    if not returns.empty:
+        print(f"\n📈 收益率曲线 (%, 每日末值, 网格 {args.grid}):")
+        print(returns.resample("1D").last().round(2).to_string())
+
+    if args.out_dir:
+        out = Path(args.out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        comparison.to_csv(out / "trader_comparison.csv")
+        equity.to_csv(out / "trader_equity.csv")
+        returns.to_csv(out / "trader_returns.csv")
+        alignment.to_csv(out / "trader_prediction_alignment.csv")
+        pd.concat(
+            {trader: tables["trades"] for trader, tables in ingested.items()}, names=["trader", "n"]
+        ).to_csv(out / "trader_trades.csv")
+        print(f"\n💾 表格已写入 {out}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Round-trip trades reconstructed from the decision action table.
+
+The Go engine holds at most one position per symbol and side, so every
+successful ``close_*`` belongs to the latest ``open_*`` of the same symbol
+and side before it. Pairing is done with ``pandas.merge_asof`` instead of
+walking cycles with per-symbol dicts.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+TRADE_COLUMNS = [
+    "symbol",
+    "side",
+    "entry_time",
+    "exit_time",
+    "entry_price",
+    "exit_price",
+    "quantity",
+    "leverage",
+    "pnl",
+    "pnl_pct",
+    "holding_minutes",
+]
+
+
+def round_trips(actions: pd.DataFrame) -> pd.DataFrame:
+    """One row per closed trade, from an ``actions`` table (see ``decision_logs.load_tables``)."""
+    executed = actions[actions["success"] & actions["action"].isin(
+        ["open_long", "open_short", "close_long", "close_short"]
+    )].copy()
+    if executed.empty:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+
+    executed["side"] = executed["action"].str.split("_").str[1]
+    is_open = executed["action"].str.startswith("open_")
+    opens = executed[is_open].rename(
+        columns={"timestamp": "entry_time", "price": "entry_price", "quantity": "open_quantity"}
+    )[["symbol", "side", "entry_time", "entry_price", "open_quantity", "leverage"]]
+    closes = executed[~is_open].rename(
+        columns={"timestamp": "exit_time", "price": "exit_price", "quantity": "close_quantity"}
+    )[["symbol", "side", "exit_time", "exit_price", "close_quantity"]]
+
+    opens = opens.dropna(subset=["entry_time"]).sort_values("entry_time")
+    closes = closes.dropna(subset=["exit_time"]).sort_values("exit_time")
+    paired = pd.merge_asof(
+        closes,
+        opens,
+        left_on="exit_time",
+        right_on="entry_time",
+        by=["symbol", "side"],
+        direction="backward",
+    ).dropna(subset=["entry_time"])
+    # A second close against the same open (partial fills, retries) is not a new trade.
+    paired = paired.drop_duplicates(subset=["symbol", "side", "entry_time"], keep="first")
+
+    # Close orders often log quantity 0 (close all); fall back to the open size.
+    quantity = paired["close_quantity"].where(paired["close_quantity"] > 0, paired["open_quantity"])
+    sign = np.where(paired["side"] == "long", 1.0, -1.0)
+    move = (paired["exit_price"] - paired["entry_price"]) * sign
+    paired["quantity"] = quantity
+    paired["pnl"] = move * quantity
+    leverage = paired["leverage"].where(paired["leverage"] > 0, 1.0)
+    paired["pnl_pct"] = move / paired["entry_price"] * leverage * 100
+    paired["holding_minutes"] = (paired["exit_time"] - paired["entry_time"]).dt.total_seconds() / 60
+    return paired[TRADE_COLUMNS].sort_values("entry_time").reset_index(drop=True)
+
+
+def trade_summary(trades: pd.DataFrame) -> dict:
+    """Count, win rate, total/average PnL and profit factor of a trade table."""
+    if trades.empty:
+        return {"trades": 0, "win_rate": np.nan, "total_pnl": 0.0, "avg_pnl": np.nan,
+                "profit_factor": np.nan, "avg_holding_minutes": np.nan}
+    pnl = trades["pnl"]
+    gains = pnl[pnl > 0].sum()
+    losses = -pnl[pnl < 0].sum()
+    return {
+        "trades": int(len(trades)),
+        "win_rate": float((pnl > 0).mean() * 100),
+        "total_pnl": float(pnl.sum()),
+        "avg_pnl": float(pnl.mean()),
+        "profit_factor": float(gains / losses) if losses > 0 else np.inf,
+        "avg_holding_minutes": float(trades["holding_minutes"].mean()),
+    }
+
+
+def max_drawdown_pct(balance: np.ndarray) -> float:
+    """Largest peak-to-trough fall of a balance series, in percent of the peak."""
+    balance = np.asarray(balance, dtype=float)
+    if len(balance) == 0:
+        return np.nan
+    peak = np.maximum.accumulate(balance)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = np.where(peak > 0, (peak - balance) / peak * 100, 0.0)
+    return float(drawdown.max())
@@ -0,0 +1,255 @@
+"""Before/after (A/B) comparison over any number of named time windows.
+
+Replaces the hardcoded periods in ``analyze_optimization_24h*.py``: a
+trader's cycle, action and trade tables plus the prediction table are loaded
+once and sorted by time, so every window is a contiguous slice found with
+``searchsorted``. The same metric set is computed for each slice and every
+window is tested against a baseline window:
+
+* proportions (win rate, prediction hit rate, short share of opens) with a
+  two-proportion z-test;
+* means (PnL per trade, balance return per cycle) with a permutation test
+  whose shuffles are drawn as one index matrix per chunk.
+
+Usage::
+
+    python -m analytics.windows --trader binance_live_qwen \\
+        --window before=2025-11-10..2025-11-11 \\
+        --window after=2025-11-11T12:00..2025-11-12T12:00
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .decision_logs import DEFAULT_ROOT, load_tables, trader_dir
+from .predictions import load_predictions
+from .trades import max_drawdown_pct, round_trips
+
+DEFAULT_TZ = "Asia/Shanghai"
+ACTIONS = ("open_long", "open_short", "close_long", "close_short")
+
+
+@dataclass
+class Window:
+    """A named half-open time range ``[start, end)``."""
+
+    name: str
+    start: pd.Timestamp
+    end: pd.Timestamp
+
+    @classmethod
+    def parse(cls, spec: str, tz: str = DEFAULT_TZ) -> "Window":
+        """``name=START..END``; naive times are taken in ``tz`` (the log files' local time)."""
+        name, sep, span = spec.partition("=")
+        start, dots, end = span.partition("..")
+        if not sep or not dots or not name:
+            raise ValueError(f"窗口格式应为 name=START..END, 实际为 {spec!r}")
+        return cls(name, _to_utc(start, tz), _to_utc(end, tz))
+
+
+def _to_utc(value: str, tz: str) -> pd.Timestamp:
+    stamp = pd.Timestamp(value.strip())
+    if stamp.tzinfo is None:
+        stamp = stamp.tz_localize(tz)
+    return stamp.tz_convert("UTC")
+
+
+def _slice(table: pd.DataFrame, column: str, window: Window) -> pd.DataFrame:
+    """Rows of a table sorted by ``column`` that fall inside ``window``."""
+    lo, hi = table[column].searchsorted([window.start, window.end], side="left")
+    return table.iloc[lo:hi]
+
+
+class WindowData:
+    """A trader's tables sorted once by time, ready to be sliced per window."""
+
+    def __init__(self, cycles: pd.DataFrame, actions: pd.DataFrame, trades: pd.DataFrame, predictions: pd.DataFrame):
+        self.cycles = cycles.dropna(subset=["timestamp"]).sort_values("timestamp").reset_index(drop=True)
+        balance = self.cycles["total_balance"].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.cycles["cycle_return_bp"] = np.concatenate([[np.nan], balance[1:] / balance[:-1] - 1]) * 1e4
+        self.actions = actions.dropna(subset=["timestamp"]).sort_values("timestamp").reset_index(drop=True)
+        # Trades count in the window they were closed in.
+        self.trades = trades.dropna(subset=["exit_time"]).sort_values("exit_time").reset_index(drop=True)
+        self.predictions = predictions.dropna(subset=["timestamp"]).sort_values("timestamp").reset_index(drop=True)
+
+    @classmethod
+    def load(cls, trader: str, root: str = DEFAULT_ROOT, pred_dir: str = "prediction_logs") -> "WindowData":
+        tables = load_tables(trader_dir(trader, root))
+        return cls(tables["cycles"], tables["actions"], round_trips(tables["actions"]), load_predictions(pred_dir))
+
+    def slices(self, window: Window) -> Dict[str, pd.DataFrame]:
+        return {
+            "cycles": _slice(self.cycles, "timestamp", window),
+            "actions": _slice(self.actions, "timestamp", window),
+            "trades": _slice(self.trades, "exit_time", window),
+            "predictions": _slice(self.predictions, "timestamp", window),
+        }
+
+
+def window_metrics(parts: Dict[str, pd.DataFrame]) -> Dict[str, float]:
+    """The standard metric set for one window slice."""
+    cycles, actions, trades, predictions = parts["cycles"], parts["actions"], parts["trades"], parts["predictions"]
+    balance = cycles["total_balance"].dropna().to_numpy(dtype=float)
+    executed = actions[actions["success"]]
+    mix = executed["action"].value_counts()
+    opens = int(mix.get("open_long", 0) + mix.get("open_short", 0))
+    evaluated = predictions[predictions["evaluated"]]
+    pnl = trades["pnl"].to_numpy(dtype=float)
+
+    metrics: Dict[str, float] = {
+        "cycles": len(cycles),
+        "failed_cycles_pct": float((~cycles["success"]).mean() * 100) if len(cycles) else np.nan,
+        "return_pct": float((balance[-1] / balance[0] - 1) * 100) if len(balance) > 1 and balance[0] else np.nan,
+        "max_drawdown_pct": max_drawdown_pct(balance),
+        "avg_margin_used_pct": float(cycles["margin_used_pct"].mean()) if len(cycles) else np.nan,
+        "trades": len(trades),
+        "win_rate": float((pnl > 0).mean() * 100) if len(pnl) else np.nan,
+        "total_pnl": float(pnl.sum()),
+        "avg_pnl": float(pnl.mean()) if len(pnl) else np.nan,
+        "avg_holding_minutes": float(trades["holding_minutes"].mean()) if len(trades) else np.nan,
+        "failed_actions": int((~actions["success"]).sum()),
+        "open_short_pct": float(mix.get("open_short", 0) / opens * 100) if opens else np.nan,
+        "predictions": len(predictions),
+        "predictions_evaluated": len(evaluated),
+        "prediction_hit_rate": float(evaluated["is_correct"].astype(bool).mean() * 100) if len(evaluated) else np.nan,
+        "prediction_accuracy": float(evaluated["accuracy"].mean()) if len(evaluated) else np.nan,
+    }
+    for action in ACTIONS:
+        metrics[action] = int(mix.get(action, 0))
+    return metrics
+
+
+def two_proportion_test(k1: int, n1: int, k2: int, n2: int) -> tuple[float, float]:
+    """Difference ``p2 - p1`` and its two-sided pooled z-test p-value."""
+    if n1 == 0 or n2 == 0:
+        return float("nan"), float("nan")
+    p1, p2 = k1 / n1, k2 / n2
+    pooled = (k1 + k2) / (n1 + n2)
+    se = math.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n2))
+    if se == 0:
+        return p2 - p1, 1.0
+    z = (p2 - p1) / se
+    return p2 - p1, math.erfc(abs(z) / math.sqrt(2))
+
+
+def permutation_test(
+    a: np.ndarray,
+    b: np.ndarray,
+    n_perm: int = 5000,
+    seed: int = 0,
+    chunk: int = 256,
+) -> tuple[float, float]:
+    """Difference of means ``mean(b) - mean(a)`` and its two-sided permutation p-value."""
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    a, b = a[~np.isnan(a)], b[~np.isnan(b)]
+    if len(a) == 0 or len(b) == 0:
+        return float("nan"), float("nan")
+    observed = b.mean() - a.mean()
+    pooled = np.concatenate([a, b])
+    n, n_b = len(pooled), len(b)
+    total = pooled.sum()
+
+    rng = np.random.default_rng(seed)
+    extreme = 0
+    for start in range(0, n_perm, chunk):
+        size = min(chunk, n_perm - start)
+        # Each row is one relabelling: the first n_b shuffled positions form group b.
+        order = np.argsort(rng.random((size, n)), axis=1)[:, :n_b]
+        sum_b = pooled[order].sum(axis=1)
+        diffs = sum_b / n_b - (total - sum_b) / (n - n_b)
+        extreme += int((np.abs(diffs) >= abs(observed) - 1e-12).sum())
+    return float(observed), (extreme + 1) / (n_perm + 1)
+
+
+def compare_windows(
+    data: WindowData,
+    windows: Sequence[Window],
+    baseline: str | None = None,
+    n_perm: int = 5000,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Metrics per window (columns) and significance of each window vs the baseline."""
+    parts = {window.name: data.slices(window) for window in windows}
+    metrics = pd.DataFrame({name: window_metrics(part) for name, part in parts.items()})
+
+    base_name = baseline or windows[0].name
+    base = parts[base_name]
+    rows: List[Dict[str, object]] = []
+    for name, part in parts.items():
+        if name == base_name:
+            continue
+        tests = {
+            "win_rate": _proportion(base["trades"]["pnl"] > 0, part["trades"]["pnl"] > 0),
+            "prediction_hit_rate": _proportion(
+                _evaluated_correct(base["predictions"]), _evaluated_correct(part["predictions"])
+            ),
+            "open_short_share": _proportion(_opens_short(base["actions"]), _opens_short(part["actions"])),
+            "avg_pnl": permutation_test(base["trades"]["pnl"], part["trades"]["pnl"], n_perm),
+            "cycle_return_bp": permutation_test(
+                base["cycles"]["cycle_return_bp"], part["cycles"]["cycle_return_bp"], n_perm
+            ),
+        }
+        for metric, (diff, p_value) in tests.items():
+            rows.append({"window": name, "vs": base_name, "metric": metric, "diff": diff, "p_value": p_value})
+    return metrics, pd.DataFrame(rows)
+
+
+def _proportion(base: pd.Series, other: pd.Series) -> tuple[float, float]:
+    return two_proportion_test(int(base.sum()), len(base), int(other.sum()), len(other))
+
+
+def _evaluated_correct(predictions: pd.DataFrame) -> pd.Series:
+    return predictions.loc[predictions["evaluated"], "is_correct"].astype(bool)
+
+
+def _opens_short(actions: pd.DataFrame) -> pd.Series:
+    opens = actions[actions["success"] & actions["action"].str.startswith("open_")]
+    return opens["action"] == "open_short"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare a trader's metrics across named time windows.")
+    parser.add_argument("--trader", required=True, help="Trader id under decision_logs/.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Decision log root (default decision_logs).")
+    parser.add_argument("--pred-dir", default="prediction_logs", help="Prediction log directory.")
+    parser.add_argument("--window", action="append", required=True,
+                        help="name=START..END, repeatable; naive times use --tz.")
+    parser.add_argument("--baseline", default=None, help="Window the others are tested against (default: first).")
+    parser.add_argument("--tz", default=DEFAULT_TZ, help=f"Time zone for naive window bounds (default {DEFAULT_TZ}).")
+    parser.add_argument("--permutations", type=int, default=5000, help="Permutations per test (default 5000).")
+    args = parser.parse_args()
+
+    windows = [Window.parse(spec, args.tz) for spec in args.window]
+    names = [window.name for window in windows]
+    if len(set(names)) != len(names):
+        parser.error("窗口名称不能重复")
+    if args.baseline and args.baseline not in names:
+        parser.error(f"基准窗口 {args.baseline!r} 不在 {names} 中")
+
+    data = WindowData.load(args.trader, args.root, args.pred_dir)
+    metrics, tests = compare_windows(data, windows, args.baseline, args.permutations)
+
+    pd.set_option("display.width", 200)
+    print("=" * 80)
+    print(f"🪟 时间窗口对比: {args.trader}")
+    print("=" * 80)
+    for window in windows:
+        print(f"  {window.name:12s} {window.start.tz_convert(args.tz)} → {window.end.tz_convert(args.tz)}")
+    print("\n📊 指标:")
+    print(metrics.round(2).to_string())
+    if not tests.empty:
+        print("\n🧪 显著性检验 (p < 0.05 标记为 ✅):")
+        tests["significant"] = np.where(tests["p_value"] < 0.05, "✅", "")
+        print(tests.round(4).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
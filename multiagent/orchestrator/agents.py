@@ -5,7 +5,7 @@ from __future__ import annotations
 from crewai import Agent
 
 
-def create_regime_agent(llm) -> Agent:
+def create_regime_agent(llm, verbose: bool = True) -> Agent:
     return Agent(
         name="RegimeAgent",
         role="Quantitative Market Regime Analyst",
@@ -16,11 +16,11 @@ def create_regime_agent(llm) -> Agent:
         ),
         llm=llm,
         allow_delegation=False,
-        verbose=True,
+        verbose=verbose,
     )
 
 
-def create_position_manager_agent(llm) -> Agent:
+def create_position_manager_agent(llm, verbose: bool = True) -> Agent:
     return Agent(
         name="PositionManagerAgent",
         role="Holdings Risk Controller",
@@ -31,11 +31,11 @@ def create_position_manager_agent(llm) -> Agent:
         ),
         llm=llm,
         allow_delegation=False,
-        verbose=True,
+        verbose=verbose,
     )
 
 
-def create_scanner_agent(llm) -> Agent:
+def create_scanner_agent(llm, verbose: bool = True) -> Agent:
     return Agent(
         name="ScannerAgent",
         role="Opportunity Hunter",
@@ -46,5 +46,5 @@ def create_scanner_agent(llm) -> Agent:
         ),
         llm=llm,
         allow_delegation=False,
-        verbose=True,
+        verbose=verbose,
     )
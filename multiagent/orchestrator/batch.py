@@ -0,0 +1,132 @@
+"""Batch replay of recorded context snapshots through the multi-agent cycle."""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, TextIO, Tuple
+
+from .context_adapter import load_trading_context
+from .orchestrator import run_multiagent_cycle
+
+
+def iter_context_snapshots(source: str | Path) -> Iterator[Tuple[str, Dict[str, Any] | Exception]]:
+    """Yield ``(snapshot_id, context)`` pairs from a directory or a JSONL file.
+
+    Directories are scanned for ``*.json`` files in name order (the Go engine
+    names dumps by timestamp, so this is chronological). JSONL files yield one
+    context per non-empty line, identified as ``<file>:<line>``. A snapshot
+    that cannot be read or parsed yields the exception in place of the
+    context, so one bad dump does not end the iteration.
+    """
+    path = Path(source).expanduser()
+    if path.is_dir():
+        for file_path in sorted(path.glob("*.json")):
+            try:
+                context = load_trading_context(file_path)
+            except (OSError, ValueError) as exc:
+                context = exc
+            yield file_path.stem, context
+        return
+
+    with path.open("r", encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                context = json.loads(line)
+            except ValueError as exc:
+                context = exc
+            yield f"{path.name}:{line_no}", context
+
+
+def _run_snapshot(
+    snapshot_id: str,
+    context: Dict[str, Any],
+    cycle_kwargs: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Run one cycle and wrap its decisions (or failure) in a JSONL record."""
+    timings: Dict[str, float] = {}
+    record: Dict[str, Any] = {"snapshot": snapshot_id}
+    started = time.perf_counter()
+    try:
+        record["decisions"] = run_multiagent_cycle(context, timings=timings, **cycle_kwargs)
+    except Exception as exc:  # noqa: BLE001 - one bad snapshot must not stop the batch
+        record["error"] = f"{type(exc).__name__}: {exc}"
+    timings.setdefault("total", time.perf_counter() - started)
+    record["timings"] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+    return record
+
+
+def _error_record(snapshot_id: str, exc: Exception) -> Dict[str, Any]:
+    return {"snapshot": snapshot_id, "error": f"{type(exc).__name__}: {exc}", "timings": {}}
+
+
+def _write_record(out: TextIO, record: Dict[str, Any]) -> None:
+    out.write(json.dumps(record, ensure_ascii=False))
+    out.write("\n")
+    out.flush()
+
+
+def run_batch(
+    source: str | Path,
+    output: str = "-",
+    concurrency: int = 4,
+    **cycle_kwargs: Any,
+) -> Dict[str, int]:
+    """Replay every snapshot in ``source`` with at most ``concurrency`` cycles in flight.
+
+    ``cycle_kwargs`` (``model_name``, ``llm``, ``stream``, ``policy``,
+    ``payload_encoding``...) are passed to every ``run_multiagent_cycle`` call.
+    Records are streamed to ``output`` (``-`` for stdout) as soon as each
+    cycle finishes, so completion order rather than input order is used.
+    CrewAI's traces go to stdout too, so they are turned off unless
+    ``verbose=True`` is passed explicitly. Snapshots that fail to parse are
+    written as error records. Returns a small summary with processed and
+    failed counts.
+    """
+    concurrency = max(1, concurrency)
+    cycle_kwargs.setdefault("verbose", False)
+    summary = {"processed": 0, "failed": 0}
+    out: TextIO = sys.stdout if output == "-" else open(output, "w", encoding="utf-8")
+
+    def _emit(record: Dict[str, Any]) -> None:
+        summary["processed"] += 1
+        if "error" in record:
+            summary["failed"] += 1
+        _write_record(out, record)
+
+    def _drain(done: set[Future]) -> None:
+        for future in done:
+            _emit(future.result())
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            pending: set[Future] = set()
+            for snapshot_id, context in iter_context_snapshots(source):
+                if isinstance(context, Exception):
+                    _emit(_error_record(snapshot_id, context))
+                    continue
+                # Keep the number of loaded-but-unfinished snapshots bounded so
+                # replaying thousands of dumps does not hold them all in memory.
+                if len(pending) >= concurrency * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _drain(done)
+                pending.add(pool.submit(_run_snapshot, snapshot_id, context, cycle_kwargs))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _drain(done)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(
+        f"batch complete: {summary['processed']} snapshots, {summary['failed']} failed",
+        file=sys.stderr,
+    )
+    return summary
@@ -0,0 +1,256 @@
+"""Offline latency benchmark for ``run_multiagent_cycle``.
+
+Cycles run against :class:`orchestrator.fake_llm.FakeOpenAIServer`, so the
+numbers measure orchestration overhead (CrewAI, HTTP client, payload
+building and JSON parsing) plus whatever latency the fake server is told to
+simulate, without paying for real model calls. Every cycle must be
+answered by the primary model: a step that falls back to a repair retry, the
+fallback model or the rule engine would be timed as a fast LLM stage, so such
+cycles are counted in ``degraded_cycles`` and fail the command.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from .context_adapter import (
+    DEFAULT_PRECISION,
+    PAYLOAD_ENCODINGS,
+    load_trading_context,
+    measure_payload_tokens,
+)
+from .fake_llm import FakeOpenAIServer, fake_chat_llm
+from .orchestrator import run_multiagent_cycle
+
+SAMPLE_CONTEXT = Path(__file__).resolve().parent.parent / "sample_context.json"
+STAGES = ("regime", "position", "scanner")
+
+
+def synthetic_context(n_candidates: int, n_positions: int = 3, seed: int = 0) -> Dict[str, Any]:
+    """Build a deterministic context with ``n_candidates`` coins and market data for each."""
+    rng = random.Random(seed)
+
+    def market(price: float) -> Dict[str, Any]:
+        atr = price * rng.uniform(0.005, 0.05)
+        return {
+            "current_price": round(price, 6),
+            "price_change_1h": round(rng.uniform(-3, 3), 2),
+            "price_change_4h": round(rng.uniform(-8, 8), 2),
+            "funding_rate": round(rng.uniform(-0.03, 0.03), 4),
+            "intraday": {"rsi7": round(rng.uniform(15, 85), 1)},
+            "longer_term": {
+                "ema20": round(price * rng.uniform(0.95, 1.05), 6),
+                "ema50": round(price * rng.uniform(0.9, 1.1), 6),
+                "ema200": round(price * rng.uniform(0.8, 1.2), 6),
+                "atr14": round(atr, 6),
+                "atr14_pct": f"{atr / price * 100:.2f}%",
+                "macd": round(rng.uniform(-1, 1), 3),
+            },
+        }
+
+    market_data = {"BTCUSDT": market(108000.0), "ETHUSDT": market(3900.0)}
+    symbols = [f"SYN{i:03d}USDT" for i in range(n_candidates)]
+    for symbol in symbols:
+        market_data[symbol] = market(rng.uniform(0.05, 500))
+
+    positions = []
+    for symbol in symbols[:n_positions]:
+        mark = market_data[symbol]["current_price"]
+        entry = mark * rng.uniform(0.97, 1.03)
+        side = rng.choice(("long", "short"))
+        pnl_pct = (mark - entry) / entry * 100 * (1 if side == "long" else -1)
+        positions.append(
+            {
+                "symbol": symbol,
+                "side": side,
+                "entry_price": round(entry, 6),
+                "mark_price": mark,
+                "unrealized_pnl_pct": round(pnl_pct, 2),
+                "leverage": 3,
+                "holding_minutes": rng.randint(5, 240),
+            }
+        )
+
+    return {
+        "account": {
+            "total_equity": 10000,
+            "available_balance": 7500,
+            "position_count": len(positions),
+        },
+        "positions": positions,
+        "candidate_coins": [
+            {"symbol": symbol, "sources": rng.sample(["ai500", "oi_top"], rng.randint(1, 2))}
+            for symbol in symbols
+        ],
+        "market_data": market_data,
+        "performance": {"sharpe_ratio": round(rng.uniform(-1, 1), 2)},
+        "leverage_config": {"btc_eth": 5, "alt": 3},
+    }
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of ``values`` (``q`` in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered), max(1, math.ceil(q / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def benchmark_context(
+    context: Dict[str, Any],
+    llm,
+    iterations: int,
+    concurrency: int = 1,
+    stream: bool = False,
+    payload_encoding: str = "text",
+    precision: int = DEFAULT_PRECISION,
+) -> Dict[str, Any]:
+    """Run ``iterations`` cycles and summarise per-stage p50/p95, throughput and payload tokens.
+
+    ``step_sources`` counts who answered each stage; ``degraded_cycles`` is
+    the number of cycles in which any stage was not answered by the primary
+    model on its first attempt.
+    """
+    samples: List[Dict[str, float]] = []
+    sources: List[Dict[str, str]] = []
+
+    def one_cycle(_: int) -> tuple[Dict[str, float], Dict[str, str]]:
+        timings: Dict[str, float] = {}
+        # CrewAI traces would be printed inside the timed region.
+        result = run_multiagent_cycle(
+            context,
+            timings=timings,
+            llm=llm,
+            stream=stream,
+            payload_encoding=payload_encoding,
+            precision=precision,
+            verbose=False,
+        )
+        return timings, result.get("step_sources", {})
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for timings, step_sources in pool.map(one_cycle, range(iterations)):
+            samples.append(timings)
+            sources.append(step_sources)
+    elapsed = time.perf_counter() - started
+
+    keys = ["total"]
+    for stage in STAGES:
+        keys += [stage, f"{stage}.payload", f"{stage}.llm", f"{stage}.parse"]
+
+    latency = {}
+    for key in keys:
+        values = [sample[key] for sample in samples if key in sample]
+        latency[key] = {
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+        }
+
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "stream": stream,
+        "payload_encoding": payload_encoding,
+        "payload_tokens": measure_payload_tokens(context, precision=precision),
+        "elapsed_s": round(elapsed, 3),
+        "cycles_per_s": round(iterations / elapsed, 3) if elapsed else 0.0,
+        "latency": latency,
+        "step_sources": {stage: dict(Counter(cycle.get(stage, "missing") for cycle in sources)) for stage in STAGES},
+        "degraded_cycles": sum(any(cycle.get(stage) != "llm" for stage in STAGES) for cycle in sources),
+    }
+
+
+def _print_report(label: str, report: Dict[str, Any]) -> None:
+    print(
+        f"\n== {label}: {report['iterations']} cycles, concurrency {report['concurrency']}, "
+        f"{report['cycles_per_s']} cycles/s =="
+    )
+    for encoding, tokens in report["payload_tokens"].items():
+        print(f"payload tokens [{encoding}]: position={tokens['position']} scanner={tokens['scanner']}")
+    print(f"{'stage':<18}{'p50 ms':>12}{'p95 ms':>12}")
+    for key, stats in report["latency"].items():
+        print(f"{key:<18}{stats['p50_ms']:>12.3f}{stats['p95_ms']:>12.3f}")
+    if report["degraded_cycles"]:
+        print(
+            f"WARNING: {report['degraded_cycles']} cycles were not served by the primary model "
+            f"on the first attempt; their timings are not LLM timings. sources: {report['step_sources']}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the multi-agent cycle offline.")
+    parser.add_argument(
+        "--sizes",
+        type=str,
+        default="5,20,50",
+        help="Comma-separated candidate counts for synthetic contexts (default 5,20,50).",
+    )
+    parser.add_argument("--iterations", type=int, default=20, help="Cycles per context (default 20).")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent cycles (default 1).")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Simulated per-request LLM latency in seconds (default 0).",
+    )
+    parser.add_argument(
+        "--token-delay",
+        type=float,
+        default=0.0,
+        help="Simulated delay between streamed chunks in seconds (default 0).",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Benchmark the streaming path with early JSON completion.",
+    )
+    parser.add_argument(
+        "--payload-encoding",
+        choices=PAYLOAD_ENCODINGS,
+        default="text",
+        help="Payload encoding used for the timed cycles (token counts cover both).",
+    )
+    parser.add_argument("--precision", type=int, default=DEFAULT_PRECISION)
+    parser.add_argument("--json", type=str, default=None, help="Also write the report to this path.")
+    args = parser.parse_args()
+
+    contexts = {"sample_context": load_trading_context(SAMPLE_CONTEXT)}
+    for size in filter(None, (part.strip() for part in args.sizes.split(","))):
+        contexts[f"synthetic_{size}"] = synthetic_context(int(size))
+
+    results: Dict[str, Any] = {}
+    with FakeOpenAIServer(latency=args.latency, token_delay=args.token_delay) as server:
+        llm = fake_chat_llm(server)
+        for label, context in contexts.items():
+            results[label] = benchmark_context(
+                context,
+                llm,
+                args.iterations,
+                args.concurrency,
+                stream=args.stream,
+                payload_encoding=args.payload_encoding,
+                precision=args.precision,
+            )
+            _print_report(label, results[label])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2, ensure_ascii=False)
+
+    degraded = sum(report["degraded_cycles"] for report in results.values())
+    if degraded:
+        raise SystemExit(f"{degraded} benchmark cycles fell back from the primary model; see the warnings above.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,23 @@
 from __future__ import annotations
 
 import json
+import math
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Sequence
+
+try:  # Optional: exact OpenAI token counts when tiktoken is installed.
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+PAYLOAD_ENCODINGS = ("text", "table")
+DEFAULT_PRECISION = 4
+
+POSITION_COLUMNS = (
+    "symbol", "side", "entry", "mark", "pnl%", "hold_m",
+    "ema20_4h", "ema50_4h", "ema200_4h", "rsi_1h", "macd_4h",
+)
+SCANNER_COLUMNS = ("symbol", "price", "chg1h%", "chg4h%", "atr%", "funding", "sources")
 
 
 def load_trading_context(path: str | Path) -> Dict[str, Any]:
@@ -34,13 +49,47 @@ def build_regime_payload(context: Dict[str, Any]) -> str:
     return "\n".join(lines)
 
 
-def build_position_payload(context: Dict[str, Any], regime_label: str) -> str:
-    """Prepare holdings summary for the position manager."""
+def build_position_payload(
+    context: Dict[str, Any],
+    regime_label: str,
+    encoding: str = "text",
+    precision: int = DEFAULT_PRECISION,
+) -> str:
+    """Prepare holdings summary for the position manager.
+
+    ``encoding="table"`` renders one tab-separated row per position under a
+    single header row, with numbers cut to ``precision`` significant digits.
+    """
     positions = context.get("positions", [])
     if not positions:
         return f"大盘体制: {regime_label}\n当前无持仓。"
 
     market_map = context.get("market_data", {})
+    if encoding == "table":
+        rows = []
+        for pos in positions:
+            data = market_map.get(pos["symbol"], {})
+            intraday = data.get("intraday", {})
+            longer = data.get("longer_term", {})
+            rows.append(
+                (
+                    pos["symbol"],
+                    pos["side"],
+                    pos["entry_price"],
+                    pos["mark_price"],
+                    pos["unrealized_pnl_pct"],
+                    pos.get("holding_minutes"),
+                    longer.get("ema20"),
+                    longer.get("ema50"),
+                    longer.get("ema200"),
+                    intraday.get("rsi7"),
+                    longer.get("macd"),
+                )
+            )
+        return "\n".join(
+            [f"大盘体制: {regime_label}", "## 持仓列表 (TSV)", _render_table(POSITION_COLUMNS, rows, precision)]
+        )
+
     lines = [f"大盘体制: {regime_label}", "## 持仓列表"]
     for pos in positions:
         symbol = pos["symbol"]
@@ -62,8 +111,17 @@ def build_position_payload(context: Dict[str, Any], regime_label: str) -> str:
     return "\n".join(lines)
 
 
-def build_scanner_payload(context: Dict[str, Any], regime_label: str) -> str:
-    """Prepare candidate list and risk data for the scanner agent."""
+def build_scanner_payload(
+    context: Dict[str, Any],
+    regime_label: str,
+    encoding: str = "text",
+    precision: int = DEFAULT_PRECISION,
+) -> str:
+    """Prepare candidate list and risk data for the scanner agent.
+
+    ``encoding="table"`` renders the candidates as a tab-separated table (see
+    :func:`build_position_payload`); the account header stays as text.
+    """
     account = context.get("account", {})
     performance = context.get("performance", {}) or {}
     sharpe = performance.get("sharpe_ratio", "n/a")
@@ -77,9 +135,29 @@ def build_scanner_payload(context: Dict[str, Any], regime_label: str) -> str:
         f"夏普比率: {sharpe}",
         f"杠杆配置: BTC/ETH {context.get('leverage_config', {}).get('btc_eth')}x | "
         f"山寨 {context.get('leverage_config', {}).get('alt')}x",
-        "## 候选币种",
     ]
 
+    if encoding == "table":
+        rows = []
+        for coin in candidate_coins:
+            data = market_map.get(coin["symbol"], {})
+            longer = data.get("longer_term", {})
+            atr_pct = longer.get("atr14_pct") or _safe_pct(longer.get("atr14"), data.get("current_price"))
+            rows.append(
+                (
+                    coin["symbol"],
+                    data.get("current_price"),
+                    data.get("price_change_1h"),
+                    data.get("price_change_4h"),
+                    atr_pct,
+                    data.get("funding_rate"),
+                    "+".join(coin.get("sources", [])),
+                )
+            )
+        lines += ["## 候选币种 (TSV, -表示缺少数据)", _render_table(SCANNER_COLUMNS, rows, precision)]
+        return "\n".join(lines)
+
+    lines.append("## 候选币种")
     for coin in candidate_coins:
         symbol = coin["symbol"]
         data = market_map.get(symbol, {})
@@ -98,6 +176,66 @@ def build_scanner_payload(context: Dict[str, Any], regime_label: str) -> str:
     return "\n".join(lines)
 
 
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count prompt tokens with tiktoken, or estimate when it is not installed.
+
+    The estimate charges one token per non-ASCII character (CJK labels are
+    roughly one token each) and one per four ASCII characters.
+    """
+    if tiktoken is not None:
+        try:
+            encoder = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoder = tiktoken.get_encoding("o200k_base")
+        return len(encoder.encode(text))
+    non_ascii = sum(1 for char in text if ord(char) > 127)
+    return non_ascii + math.ceil((len(text) - non_ascii) / 4)
+
+
+def measure_payload_tokens(
+    context: Dict[str, Any],
+    regime_label: str = "B",
+    precision: int = DEFAULT_PRECISION,
+) -> Dict[str, Dict[str, int]]:
+    """Token counts of the position and scanner payloads under every encoding."""
+    return {
+        encoding: {
+            "position": count_tokens(build_position_payload(context, regime_label, encoding, precision)),
+            "scanner": count_tokens(build_scanner_payload(context, regime_label, encoding, precision)),
+        }
+        for encoding in PAYLOAD_ENCODINGS
+    }
+
+
+def _format_cell(value: Any, precision: int) -> str:
+    """Render a table cell: numbers to ``precision`` significant digits, ``-`` when missing."""
+    if value is None or value == "" or value == "n/a":
+        return "-"
+    if isinstance(value, str):
+        stripped = value.strip().rstrip("%")
+        try:
+            value = float(stripped)
+        except ValueError:
+            return value
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return str(value)
+    if value == 0 or not math.isfinite(value):
+        return "0" if value == 0 else str(value)
+    magnitude = math.floor(math.log10(abs(value)))
+    decimals = max(0, precision - 1 - magnitude)
+    text = f"{round(value, decimals):.{decimals}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return "0" if text in ("-0", "") else text
+
+
+def _render_table(columns: Sequence[str], rows: Sequence[Sequence[Any]], precision: int) -> str:
+    lines = ["\t".join(columns)]
+    for row in rows:
+        lines.append("\t".join(_format_cell(value, precision) for value in row))
+    return "\n".join(lines)
+
+
 def _safe_pct(value: Any, price: Any) -> str:
     """Gracefully compute percentage when possible."""
     try:
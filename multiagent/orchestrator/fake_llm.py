@@ -0,0 +1,283 @@
+"""Deterministic local stand-in for the OpenAI chat API.
+
+The server speaks just enough of ``/v1/chat/completions`` (plain and
+``stream: true``) for ``ChatOpenAI`` and CrewAI to run a full cycle offline.
+Replies are produced by :class:`ScriptedResponder`, which recognises each
+agent by a marker from its prompt and answers with valid JSON derived from
+the payload, so decisions are repeatable and scale with the context size.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+Reply = str | Callable[[str], str]
+
+# Markers taken from prompts.py; each one only appears in its own agent prompt.
+REGIME_MARKER = "判断大盘市场体制"
+POSITION_MARKER = "冷酷的AI风险管理官"
+SCANNER_MARKER = "积极的AI交易猎手"
+
+# Match both the labelled-text and the TSV table payload encodings.
+_POSITION_LINE = re.compile(r"^(?:- )?([A-Z0-9]+)[ \t](long|short)\b", re.MULTILINE)
+_CANDIDATE_LINE = re.compile(r"^(?:- ([A-Z0-9]+):|([A-Z0-9]+)\t)", re.MULTILINE)
+
+
+def _scripted_regime(prompt: str) -> str:
+    return json.dumps({"regime": "B", "reasoning": "scripted: 宽幅震荡"}, ensure_ascii=False)
+
+
+def _scripted_positions(prompt: str) -> str:
+    actions = [
+        {"symbol": symbol, "action": "hold", "reasoning": f"scripted: hold {side}"}
+        for symbol, side in _POSITION_LINE.findall(prompt)
+    ]
+    return json.dumps(actions, ensure_ascii=False)
+
+
+def _scripted_scanner(prompt: str) -> str:
+    actions = [
+        {"symbol": text_symbol or table_symbol, "action": "wait", "reasoning": "scripted: 信号不足"}
+        for text_symbol, table_symbol in _CANDIDATE_LINE.findall(prompt)
+    ]
+    return json.dumps(actions, ensure_ascii=False)
+
+
+DEFAULT_SCRIPT: Tuple[Tuple[str, Reply], ...] = (
+    (REGIME_MARKER, _scripted_regime),
+    (POSITION_MARKER, _scripted_positions),
+    (SCANNER_MARKER, _scripted_scanner),
+)
+
+
+class ScriptedResponder:
+    """Map a chat transcript to a canned reply.
+
+    ``script`` is an ordered sequence of ``(marker, reply)`` rules; the first
+    marker found in the transcript wins. A reply is either a literal string or
+    a callable receiving the transcript. The answer is wrapped in the
+    ``Final Answer:`` envelope CrewAI's agent executor parses.
+    """
+
+    def __init__(
+        self,
+        script: Sequence[Tuple[str, Reply]] = DEFAULT_SCRIPT,
+        fallback: str = "{}",
+        trailer: str = "",
+    ) -> None:
+        self.script = list(script)
+        self.fallback = fallback
+        self.trailer = trailer
+
+    def __call__(self, messages: List[Dict[str, Any]]) -> str:
+        transcript = "\n".join(_message_text(message) for message in messages)
+        answer = self.fallback
+        for marker, reply in self.script:
+            if marker in transcript:
+                answer = reply(transcript) if callable(reply) else reply
+                break
+        return f"Thought: I now can give a great answer\nFinal Answer: {answer}{self.trailer}"
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    server: "FakeOpenAIServer"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - stdlib signature
+        pass
+
+    def do_POST(self) -> None:  # noqa: N802 - stdlib naming
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404, "only /v1/chat/completions is implemented")
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        messages = request.get("messages", [])
+        model = request.get("model", "fake-model")
+        content = self.server.responder(messages)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        completion_id = f"chatcmpl-fake-{self.server.next_id()}"
+        created = int(time.time())
+        if request.get("stream"):
+            self._stream(completion_id, created, model, content)
+            return
+
+        prompt_tokens = sum(_approx_tokens(_message_text(m)) for m in messages)
+        completion_tokens = _approx_tokens(content)
+        self._send_json(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+    def _send_json(self, body: Dict[str, Any]) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, completion_id: str, created: int, model: str, content: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def emit(delta: Dict[str, Any], finish_reason: str | None = None) -> None:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            emit({"role": "assistant", "content": ""})
+            size = self.server.chunk_chars
+            for start in range(0, len(content), size):
+                emit({"content": content[start : start + size]})
+                if self.server.token_delay:
+                    time.sleep(self.server.token_delay)
+            emit({}, finish_reason="stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading early (e.g. its JSON value was complete).
+            self.close_connection = True
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Threaded local HTTP server answering chat completions from a responder.
+
+    ``latency`` adds a fixed delay before every reply and ``token_delay`` a
+    delay between streamed chunks of ``chunk_chars`` characters, so network
+    and generation time can be simulated. Use as a context manager to run it
+    on a background thread::
+
+        with FakeOpenAIServer() as server:
+            llm = fake_chat_llm(server)
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        responder: Callable[[List[Dict[str, Any]]], str] | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        token_delay: float = 0.0,
+        chunk_chars: int = 8,
+    ) -> None:
+        super().__init__((host, port), _ChatHandler)
+        self.responder = responder or ScriptedResponder()
+        self.latency = latency
+        self.token_delay = token_delay
+        self.chunk_chars = max(1, chunk_chars)
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def next_id(self) -> int:
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+def fake_chat_llm(server: FakeOpenAIServer, model_name: str = "fake-model", **kwargs: Any):
+    """Build a ``ChatOpenAI`` client that talks to ``server`` instead of OpenAI."""
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=model_name,
+        temperature=0,
+        base_url=server.base_url,
+        api_key="fake-key",
+        **kwargs,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a deterministic fake OpenAI chat API.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Seconds to wait before answering each request (default 0).",
+    )
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(host=args.host, port=args.port, latency=args.latency)
+    print(f"fake OpenAI API listening on {server.base_url} (set OPENAI_BASE_URL to use it)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Incremental and tolerant JSON extraction for agent replies.
+
+Models often wrap their JSON in chatter (``Final Answer:``, code fences,
+closing remarks). :class:`IncrementalJSONParser` consumes a token stream and
+reports the first complete top-level object or array the moment its closing
+bracket arrives, so the caller can stop reading. :func:`extract_first_json`
+applies the same idea to a finished reply.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, List, Tuple
+
+import orjson
+
+_OPENERS = {"{": "}", "[": "]"}
+_CLOSERS = {"}", "]"}
+_DECODER = json.JSONDecoder()
+
+_NOT_FOUND = object()
+
+
+class IncrementalJSONParser:
+    """Find the first valid top-level JSON object/array in streamed text.
+
+    Call :meth:`feed` with each chunk; it returns ``(True, value)`` once a
+    complete value has been seen and ``(False, None)`` while more input is
+    needed. Bracket candidates that turn out not to be JSON (``[注意]`` in the
+    preamble, say) are discarded and scanning resumes right after them.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._pos = 0
+        self._start = -1
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self.done = False
+        self.value: Any = None
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._text
+
+    def feed(self, chunk: str) -> Tuple[bool, Any]:
+        """Consume ``chunk`` and report whether a complete value is available."""
+        if self.done:
+            return True, self.value
+        self._text += chunk
+        text = self._text
+
+        while self._pos < len(text):
+            char = text[self._pos]
+            self._pos += 1
+
+            if self._start < 0:
+                if char in _OPENERS:
+                    self._start = self._pos - 1
+                    self._stack = [_OPENERS[char]]
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in _OPENERS:
+                self._stack.append(_OPENERS[char])
+            elif char in _CLOSERS:
+                if char != self._stack[-1]:
+                    self._restart()
+                    continue
+                self._stack.pop()
+                if not self._stack:
+                    candidate = text[self._start : self._pos]
+                    try:
+                        self.value = orjson.loads(candidate)
+                    except orjson.JSONDecodeError:
+                        self._restart()
+                        continue
+                    self.done = True
+                    return True, self.value
+
+        return False, None
+
+    def finish(self) -> Any:
+        """Return the parsed value, salvaging from the full text if the stream ended early."""
+        if self.done:
+            return self.value
+        return extract_first_json(self.text)
+
+    def _restart(self) -> None:
+        self._pos = self._start + 1
+        self._start = -1
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+
+
+def extract_first_json(text: str) -> Any:
+    """Return the first decodable JSON object or array embedded in ``text``.
+
+    Raises ``ValueError`` when no candidate position yields valid JSON.
+    """
+    index = 0
+    while True:
+        positions = [pos for pos in (text.find("{", index), text.find("[", index)) if pos >= 0]
+        if not positions:
+            raise ValueError("no JSON object or array found")
+        start = min(positions)
+        value = _decode_at(text, start)
+        if value is not _NOT_FOUND:
+            return value
+        index = start + 1
+
+
+def _decode_at(text: str, start: int) -> Any:
+    try:
+        value, _ = _DECODER.raw_decode(text, start)
+    except ValueError:
+        return _NOT_FOUND
+    return value
@@ -4,29 +4,53 @@ from __future__ import annotations
 
 import argparse
 import json
+import logging
 import os
-from typing import Any, Dict
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Tuple
 
 import orjson
 from crewai import Crew, Process, Task
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 
+from . import rules
 from .agents import (
     create_position_manager_agent,
     create_regime_agent,
     create_scanner_agent,
 )
 from .context_adapter import (
+    DEFAULT_PRECISION,
+    PAYLOAD_ENCODINGS,
     build_position_payload,
     build_regime_payload,
     build_scanner_payload,
     load_trading_context,
 )
+from .json_stream import IncrementalJSONParser, extract_first_json
 from .prompts import (
     POSITION_MANAGER_PROMPT,
     REGIME_AGENT_PROMPT,
     SCANNER_AGENT_PROMPT,
 )
+from .scheduler import (
+    Deadline,
+    RetryPolicy,
+    call_with_timeout,
+    repair_prompt,
+    validate_position_actions,
+    validate_regime,
+    validate_scanner_actions,
+)
+
+logger = logging.getLogger(__name__)
+
+# Share of a step's budget the primary model may use when a fallback model is
+# configured; the remainder is kept for the fallback attempt.
+PRIMARY_TIER_SHARE = 0.7
 
 
 def _default_llm(model_name: str | None = None, temperature: float = 0.2):
@@ -35,7 +59,7 @@ def _default_llm(model_name: str | None = None, temperature: float = 0.2):
     return ChatOpenAI(model=model, temperature=temperature)
 
 
-def _execute_single_task(agent, description: str, expected: str) -> str:
+def _execute_single_task(agent, description: str, expected: str, verbose: bool = True) -> str:
     """Run a standalone CrewAI task and return the raw output string."""
     task = Task(
         description=description,
@@ -47,7 +71,7 @@ def _execute_single_task(agent, description: str, expected: str) -> str:
         agents=[agent],
         tasks=[task],
         process=Process.sequential,
-        verbose=True,
+        verbose=verbose,
     )
     result = crew.kickoff()
     if getattr(task, "output", None) and getattr(task.output, "raw_output", None):
@@ -55,60 +79,253 @@ def _execute_single_task(agent, description: str, expected: str) -> str:
     return result
 
 
+def _stream_single_task(llm, agent, description: str, expected: str) -> Any:
+    """Stream the agent's reply straight from the LLM and return its first JSON value.
+
+    The stream is abandoned as soon as the top-level object or array closes,
+    so trailing chatter never has to be generated or downloaded. The agent's
+    role, goal and backstory form the system message, as CrewAI would send.
+    """
+    messages = [
+        SystemMessage(content=f"You are {agent.role}. {agent.backstory}\nYour personal goal is: {agent.goal}"),
+        HumanMessage(content=f"{description}\n\n{expected}"),
+    ]
+    parser = IncrementalJSONParser()
+    stream = llm.stream(messages)
+    try:
+        for chunk in stream:
+            done, value = parser.feed(chunk.content or "")
+            if done:
+                return value
+    finally:
+        stream.close()
+
+    try:
+        return parser.finish()
+    except ValueError as exc:
+        raise ValueError(f"Agent返回的不是合法JSON: {parser.text}") from exc
+
+
 def _parse_json_payload(raw_output: str) -> Any:
-    """Parse JSON output from an agent, raising a helpful error otherwise."""
+    """Parse JSON output from an agent, raising a helpful error otherwise.
+
+    Clean JSON takes the ``orjson`` fast path; otherwise the first valid
+    object or array is salvaged from the surrounding text.
+    """
     try:
         return orjson.loads(raw_output)
-    except orjson.JSONDecodeError as exc:
-        raise ValueError(f"Agent返回的不是合法JSON: {raw_output}") from exc
+    except (orjson.JSONDecodeError, TypeError):
+        text = raw_output if isinstance(raw_output, str) else str(raw_output)
+    try:
+        return extract_first_json(text)
+    except ValueError as exc:
+        raise ValueError(f"Agent返回的不是合法JSON: {text}") from exc
+
+
+@contextmanager
+def _stage_timer(timings: Dict[str, float] | None, stage: str) -> Iterator[None]:
+    """Add the wall-clock seconds spent in ``stage`` when timings are requested."""
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+@dataclass
+class _AgentStep:
+    """Everything needed to run, check and replace one agent's answer."""
+
+    stage: str
+    create_agent: Callable[..., Any]
+    prompt: str
+    build_payload: Callable[[], str]
+    expected: str
+    validate: Callable[[Any], None]
+    fallback: Callable[[], Any]
+
+
+def _call_agent(
+    step: _AgentStep,
+    llm,
+    description: str,
+    timeout: float,
+    timings: Dict[str, float] | None,
+    stream: bool,
+    verbose: bool = True,
+) -> Any:
+    """One bounded LLM call for ``step``, returning the parsed JSON value."""
+    agent = step.create_agent(llm, verbose=verbose)
+
+    def call() -> Any:
+        if stream:
+            return _stream_single_task(llm, agent, description=description, expected=step.expected)
+        return _execute_single_task(agent, description=description, expected=step.expected, verbose=verbose)
+
+    with _stage_timer(timings, f"{step.stage}.llm"):
+        result = call_with_timeout(call, timeout)
+    if stream:
+        return result
+    with _stage_timer(timings, f"{step.stage}.parse"):
+        return _parse_json_payload(result)
+
+
+def _run_agent_step(
+    step: _AgentStep,
+    tiers: List[Tuple[str, Any, int]],
+    deadline: Deadline,
+    timings: Dict[str, float] | None,
+    stream: bool = False,
+    verbose: bool = True,
+) -> Tuple[Any, str]:
+    """Run ``step`` through the model tiers and return ``(value, source)``.
+
+    Each tier is ``(source, llm, attempts)``; failed attempts are retried with
+    a repair prompt while the tier's share of ``deadline`` lasts. When no
+    tier produces a valid reply the rule-engine fallback answers with source
+    ``rules``. Sub-timings are accumulated as ``<stage>.payload``,
+    ``<stage>.llm`` and ``<stage>.parse`` (streamed replies are parsed inside
+    ``.llm``).
+    """
+    with _stage_timer(timings, step.stage):
+        with _stage_timer(timings, f"{step.stage}.payload"):
+            payload = step.build_payload()
+        description = f"{step.prompt}\n\n{payload}"
+
+        error: str | None = None
+        for index, (source, llm, attempts) in enumerate(tiers):
+            is_last_tier = index == len(tiers) - 1
+            tier_deadline = Deadline(
+                deadline.remaining() * (1.0 if is_last_tier else PRIMARY_TIER_SHARE)
+            )
+            for attempt in range(attempts):
+                if tier_deadline.expired():
+                    break
+                prompt = description if error is None else repair_prompt(description, error)
+                try:
+                    value = _call_agent(
+                        step, llm, prompt, tier_deadline.remaining(), timings, stream, verbose
+                    )
+                    step.validate(value)
+                except Exception as exc:  # noqa: BLE001 - any failure moves on to retry/fallback
+                    error = str(exc) if isinstance(exc, ValueError) else f"{type(exc).__name__}: {exc}"
+                    logger.warning("%s 第%d次调用(%s)失败: %s", step.stage, attempt + 1, source, error)
+                    continue
+                return value, source if attempt == 0 else f"{source}_repair"
+
+        logger.warning("%s 未在时限内得到有效结果，改用规则引擎", step.stage)
+        return step.fallback(), "rules"
 
 
 def run_multiagent_cycle(
     context: Dict[str, Any],
     model_name: str | None = None,
     dry_run: bool = False,
+    timings: Dict[str, float] | None = None,
+    llm=None,
+    stream: bool = False,
+    policy: RetryPolicy | None = None,
+    payload_encoding: str = "text",
+    precision: int = DEFAULT_PRECISION,
+    verbose: bool = True,
 ) -> Dict[str, Any]:
-    """Execute the three-agent workflow and return structured decisions."""
-    llm = _default_llm(model_name)
+    """Execute the three-agent workflow and return structured decisions.
+
+    When ``timings`` is given it is filled with the seconds spent in each
+    stage (``regime``, ``position``, ``scanner``), their payload/llm/parse
+    breakdown and the cycle ``total``. Pass ``llm`` to reuse a pre-built
+    chat model (e.g. one pointed at :mod:`orchestrator.fake_llm`) instead of
+    instantiating the default one. ``stream=True`` streams each reply from
+    the LLM and stops reading once its JSON value is complete.
+
+    ``policy`` bounds the whole cycle by a deadline derived from the Go scan
+    interval; invalid or late replies are repaired, retried on the fallback
+    model and finally answered by :mod:`orchestrator.rules`. The origin of
+    each answer is reported under ``step_sources``.
+
+    ``payload_encoding="table"`` sends positions and candidates as compact
+    TSV tables with ``precision`` significant digits instead of labelled
+    lines, which keeps prompts small as the candidate list grows.
+
+    ``verbose=False`` silences CrewAI's agent and crew traces, which are
+    printed to stdout.
+    """
+    cycle_started = time.perf_counter()
+    policy = policy or RetryPolicy()
+    deadline = Deadline(policy.deadline_seconds)
+    llm = llm or _default_llm(model_name)
 
-    regime_agent = create_regime_agent(llm)
-    position_agent = create_position_manager_agent(llm)
-    scanner_agent = create_scanner_agent(llm)
+    tiers: List[Tuple[str, Any, int]] = [("llm", llm, max(1, policy.max_attempts))]
+    if policy.fallback_model:
+        tiers.append(("fallback_model", _default_llm(policy.fallback_model), 1))
+
+    def run_step(step: _AgentStep, steps_left: int) -> Tuple[Any, str]:
+        return _run_agent_step(step, tiers, deadline.share(steps_left), timings, stream, verbose)
 
     # Step 1: Regime analysis
-    regime_payload = build_regime_payload(context)
-    regime_raw = _execute_single_task(
-        regime_agent,
-        description=f"{REGIME_AGENT_PROMPT}\n\n{regime_payload}",
-        expected="只返回一个JSON对象，包含regime与reasoning。",
+    regime_json, regime_source = run_step(
+        _AgentStep(
+            stage="regime",
+            create_agent=create_regime_agent,
+            prompt=REGIME_AGENT_PROMPT,
+            build_payload=lambda: build_regime_payload(context),
+            expected="只返回一个JSON对象，包含regime与reasoning。",
+            validate=validate_regime,
+            fallback=lambda: rules.classify_regime(context),
+        ),
+        steps_left=3,
     )
-    regime_json = _parse_json_payload(regime_raw)
     regime_label = regime_json.get("regime", "unknown")
 
     # Step 2: Position management
-    position_payload = build_position_payload(context, regime_label)
-    position_raw = _execute_single_task(
-        position_agent,
-        description=f"{POSITION_MANAGER_PROMPT}\n\n{position_payload}",
-        expected="JSON数组，每个元素包含 symbol, action, reasoning。",
+    position_json, position_source = run_step(
+        _AgentStep(
+            stage="position",
+            create_agent=create_position_manager_agent,
+            prompt=POSITION_MANAGER_PROMPT,
+            build_payload=lambda: build_position_payload(
+                context, regime_label, payload_encoding, precision
+            ),
+            expected="JSON数组，每个元素包含 symbol, action, reasoning。",
+            validate=validate_position_actions,
+            fallback=lambda: rules.manage_positions(context, regime_label),
+        ),
+        steps_left=2,
     )
-    position_json = _parse_json_payload(position_raw)
 
     # Step 3: Opportunity scanning (skip when dry-run triggered earlier)
-    scanner_payload = build_scanner_payload(context, regime_label)
-    scanner_raw = _execute_single_task(
-        scanner_agent,
-        description=f"{SCANNER_AGENT_PROMPT}\n\n{scanner_payload}",
-        expected="JSON数组，action只能是 open_*/wait。",
+    scanner_json, scanner_source = run_step(
+        _AgentStep(
+            stage="scanner",
+            create_agent=create_scanner_agent,
+            prompt=SCANNER_AGENT_PROMPT,
+            build_payload=lambda: build_scanner_payload(
+                context, regime_label, payload_encoding, precision
+            ),
+            expected="JSON数组，action只能是 open_*/wait。",
+            validate=validate_scanner_actions,
+            fallback=lambda: rules.scan_opportunities(context, regime_label),
+        ),
+        steps_left=1,
     )
-    scanner_json = _parse_json_payload(scanner_raw)
 
     combined = {
         "regime": regime_json,
         "position_actions": position_json,
         "new_opportunities": scanner_json,
+        "step_sources": {
+            "regime": regime_source,
+            "position": position_source,
+            "scanner": scanner_source,
+        },
     }
 
+    if timings is not None:
+        timings["total"] = time.perf_counter() - cycle_started
+
     if dry_run:
         print(json.dumps(combined, indent=2, ensure_ascii=False))
 
@@ -117,12 +334,17 @@ def run_multiagent_cycle(
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run the CrewAI multi-agent pipeline.")
-    parser.add_argument(
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
         "--context",
         type=str,
-        required=True,
         help="Path to the JSON context snapshot exported from the Go engine.",
     )
+    source.add_argument(
+        "--batch",
+        type=str,
+        help="Directory of *.json snapshots or a JSONL file to replay in batch mode.",
+    )
     parser.add_argument(
         "--model",
         type=str,
@@ -134,10 +356,89 @@ def main() -> None:
         action="store_true",
         help="Print combined output to stdout (recommended for testing).",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream agent replies and stop reading once the JSON value is complete.",
+    )
+    parser.add_argument(
+        "--payload-encoding",
+        choices=PAYLOAD_ENCODINGS,
+        default="text",
+        help="Render positions/candidates as labelled text (default) or compact TSV tables.",
+    )
+    parser.add_argument(
+        "--precision",
+        type=int,
+        default=DEFAULT_PRECISION,
+        help=f"Significant digits for numbers in table encoding (default {DEFAULT_PRECISION}).",
+    )
+    parser.add_argument(
+        "--scan-interval",
+        type=float,
+        default=None,
+        help=(
+            "Go engine scan interval in minutes; the cycle deadline is 80%% of it "
+            "(defaults to env CREWAI_SCAN_INTERVAL_MINUTES or 3)."
+        ),
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=2,
+        help="Primary-model attempts per step, including repair retries (default 2).",
+    )
+    parser.add_argument(
+        "--fallback-model",
+        type=str,
+        default=None,
+        help="Cheaper/faster model tried once before the rule engine (defaults to env CREWAI_FALLBACK_MODEL).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Batch mode: number of snapshots processed concurrently (default 4).",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="-",
+        help="Batch mode: JSONL output path, '-' for stdout (default).",
+    )
     args = parser.parse_args()
 
+    policy = RetryPolicy(max_attempts=args.max_attempts)
+    if args.scan_interval is not None:
+        policy = RetryPolicy.for_scan_interval(args.scan_interval, max_attempts=args.max_attempts)
+    if args.fallback_model:
+        policy.fallback_model = args.fallback_model
+
+    if args.batch:
+        from .batch import run_batch
+
+        run_batch(
+            args.batch,
+            output=args.output,
+            concurrency=args.concurrency,
+            model_name=args.model,
+            stream=args.stream,
+            policy=policy,
+            payload_encoding=args.payload_encoding,
+            precision=args.precision,
+        )
+        return
+
     context = load_trading_context(args.context)
-    run_multiagent_cycle(context, model_name=args.model, dry_run=args.dry_run)
+    run_multiagent_cycle(
+        context,
+        model_name=args.model,
+        dry_run=args.dry_run,
+        stream=args.stream,
+        policy=policy,
+        payload_encoding=args.payload_encoding,
+        precision=args.precision,
+    )
 
 
 if __name__ == "__main__":
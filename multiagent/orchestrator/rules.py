@@ -0,0 +1,95 @@
+"""Deterministic rule engine used when the agents cannot answer in time.
+
+Each function mirrors the quantitative part of the matching prompt in
+``prompts.py`` and returns the same JSON shape the agent would. The scanner
+fallback never opens positions: without the model's signal review the safe
+answer is ``wait``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+RULES_TAG = "[rules]"
+
+
+def _to_float(value: Any) -> float | None:
+    """Convert numbers and ``"1.23%"`` strings to float, ``None`` when impossible."""
+    if isinstance(value, str):
+        value = value.strip().rstrip("%")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _atr_pct(data: Dict[str, Any]) -> float | None:
+    longer = data.get("longer_term", {}) or {}
+    pct = _to_float(longer.get("atr14_pct"))
+    if pct is not None:
+        return pct
+    atr = _to_float(longer.get("atr14"))
+    price = _to_float(data.get("current_price"))
+    if atr is None or not price:
+        return None
+    return atr / price * 100
+
+
+def classify_regime(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Classify the market regime from BTC 4h data using the regime prompt's rules."""
+    data = context.get("market_data", {}).get("BTCUSDT", {}) or {}
+    longer = data.get("longer_term", {}) or {}
+    price = _to_float(data.get("current_price"))
+    ema50 = _to_float(longer.get("ema50"))
+    ema200 = _to_float(longer.get("ema200"))
+    atr_pct = _atr_pct(data)
+
+    if None in (price, ema50, ema200, atr_pct):
+        return {"regime": "B", "reasoning": f"{RULES_TAG} BTC 4h数据不完整，按(B)震荡保守处理"}
+
+    evidence = f"BTC 4h ATR%={atr_pct:.2f}%, Price={price}, EMA50={ema50}, EMA200={ema200}"
+    if atr_pct < 1.0:
+        regime = "C"
+    elif price > ema50 > ema200:
+        regime = "A1"
+    elif price < ema50 < ema200:
+        regime = "A2"
+    else:
+        regime = "B"
+    return {"regime": regime, "reasoning": f"{RULES_TAG} {evidence}"}
+
+
+def manage_positions(context: Dict[str, Any], regime_label: str) -> List[Dict[str, Any]]:
+    """Apply the position manager's stop-loss and regime-conflict rules; hold otherwise."""
+    market_map = context.get("market_data", {})
+    actions: List[Dict[str, Any]] = []
+    for pos in context.get("positions", []) or []:
+        symbol = pos.get("symbol", "")
+        side = pos.get("side", "")
+        rsi = _to_float((market_map.get(symbol, {}).get("intraday", {}) or {}).get("rsi7"))
+
+        if side == "short" and rsi is not None and rsi > 75:
+            action, reason = "close_short", "RSI > 75 极端超买，强制平仓止损"
+        elif side == "long" and rsi is not None and rsi < 25:
+            action, reason = "close_long", "RSI < 25 极端超卖，强制平仓止损"
+        elif side == "long" and "A2" in regime_label:
+            action, reason = "close_long", "逆大盘(A2)体制持有多单，强制平仓"
+        elif side == "short" and "A1" in regime_label:
+            action, reason = "close_short", "逆大盘(A1)体制持有空单，强制平仓"
+        else:
+            action, reason = "hold", "规则1和2未触发，维持持仓"
+
+        actions.append({"symbol": symbol, "action": action, "reasoning": f"{RULES_TAG} {reason}"})
+    return actions
+
+
+def scan_opportunities(context: Dict[str, Any], regime_label: str) -> List[Dict[str, Any]]:
+    """Return ``wait`` for every candidate; the rule engine never opens new trades."""
+    return [
+        {
+            "symbol": coin.get("symbol", ""),
+            "action": "wait",
+            "reasoning": f"{RULES_TAG} Agent未在时限内给出有效结果，规则引擎不开新仓",
+        }
+        for coin in context.get("candidate_coins", []) or []
+    ]
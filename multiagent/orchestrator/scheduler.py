@@ -0,0 +1,144 @@
+"""Retry, deadline and validation helpers for the agent steps.
+
+A cycle has to finish before the Go engine starts the next scan, so every
+step runs against a shrinking :class:`Deadline`. Invalid replies are retried
+with a repair prompt quoting the validation error; once the attempts or the
+budget run out the orchestrator drops to a fallback model and finally to the
+local rule engine in :mod:`orchestrator.rules`.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+# Mirrors scan_interval_minutes in config.json (the Go default is 3 minutes).
+DEFAULT_SCAN_INTERVAL_MINUTES = 3.0
+# Fraction of the scan interval the agents may use; the rest is left for the
+# Go side to execute the resulting orders before the next cycle.
+DEADLINE_FRACTION = 0.8
+
+POSITION_ACTIONS = {"hold", "close_long", "close_short"}
+SCANNER_ACTIONS = {"open_long", "open_short", "wait"}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+@dataclass
+class RetryPolicy:
+    """How hard a cycle tries before falling back.
+
+    ``max_attempts`` counts calls to the primary model per step (the first
+    call plus repairs). ``fallback_model`` gets one further attempt if set.
+    """
+
+    deadline_seconds: float = field(
+        default_factory=lambda: _env_float("CREWAI_SCAN_INTERVAL_MINUTES", DEFAULT_SCAN_INTERVAL_MINUTES)
+        * 60
+        * DEADLINE_FRACTION
+    )
+    max_attempts: int = 2
+    fallback_model: str | None = field(default_factory=lambda: os.environ.get("CREWAI_FALLBACK_MODEL"))
+
+    @classmethod
+    def for_scan_interval(cls, minutes: float, **kwargs: Any) -> "RetryPolicy":
+        return cls(deadline_seconds=minutes * 60 * DEADLINE_FRACTION, **kwargs)
+
+
+class Deadline:
+    """A point in time after which no more LLM calls should be started."""
+
+    def __init__(self, seconds: float) -> None:
+        self.expires_at = time.monotonic() + max(0.0, seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def share(self, parts: int) -> "Deadline":
+        """A sub-deadline holding an equal share of what is left among ``parts`` steps."""
+        return Deadline(self.remaining() / max(1, parts))
+
+
+def call_with_timeout(fn: Callable[[], T], timeout: float) -> T:
+    """Run ``fn`` on a daemon thread and wait at most ``timeout`` seconds.
+
+    Blocking HTTP calls cannot be cancelled, so on timeout the worker is left
+    to finish in the background and ``TimeoutError`` is raised immediately.
+    """
+    outcome: Dict[str, Any] = {}
+
+    def target() -> None:
+        try:
+            outcome["value"] = fn()
+        except BaseException as exc:  # noqa: BLE001 - re-raised in the caller
+            outcome["error"] = exc
+
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"Agent调用超时 ({timeout:.1f}s)")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
+
+
+def repair_prompt(description: str, error: str, limit: int = 600) -> str:
+    """Append the previous validation error so the model can correct its reply."""
+    if len(error) > limit:
+        error = error[:limit] + "..."
+    return (
+        f"{description}\n\n"
+        "# 上一次输出无效\n"
+        f"校验错误: {error}\n"
+        "请修正后重新输出，只返回符合上述格式的JSON，不得包含任何其他文本。"
+    )
+
+
+def validate_regime(value: Any) -> None:
+    if not isinstance(value, dict):
+        raise ValueError(f"体制结果必须是JSON对象，实际为 {type(value).__name__}")
+    regime = value.get("regime")
+    if not isinstance(regime, str) or not regime.strip():
+        raise ValueError("体制结果缺少非空字符串字段 regime")
+
+
+def _validate_action_list(value: Any, allowed: set[str], label: str) -> None:
+    if not isinstance(value, list):
+        raise ValueError(f"{label}结果必须是JSON数组，实际为 {type(value).__name__}")
+    for index, item in enumerate(value):
+        if not isinstance(item, dict):
+            raise ValueError(f"{label}第{index}项不是JSON对象")
+        if not isinstance(item.get("symbol"), str) or not item["symbol"]:
+            raise ValueError(f"{label}第{index}项缺少 symbol")
+        if item.get("action") not in allowed:
+            raise ValueError(
+                f"{label}第{index}项 action={item.get('action')!r} 不在允许范围 {sorted(allowed)}"
+            )
+
+
+def validate_position_actions(value: Any) -> None:
+    _validate_action_list(value, POSITION_ACTIONS, "持仓决策")
+
+
+def validate_scanner_actions(value: Any) -> None:
+    _validate_action_list(value, SCANNER_ACTIONS, "开仓决策")
+    for index, item in enumerate(value):
+        if not item["action"].startswith("open_"):
+            continue
+        for key in ("leverage", "stop_loss", "take_profit"):
+            if not isinstance(item.get(key), (int, float)):
+                raise ValueError(f"开仓决策第{index}项 {item['symbol']} 缺少数值字段 {key}")